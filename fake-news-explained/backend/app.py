@@ -3,17 +3,292 @@ Fake News Explained - Flask REST API
 Main application entry point for the fake news detection service.
 """
 
-from flask import Flask, request, jsonify
+import os
+import time
+
+from flask import Flask, Request, Response, current_app, g, request, jsonify
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+
+import nlp_logic
+from utils import AnalysisContext, clean_text, iter_clean_text
+from pipeline import run_pipeline
+from classifier import get_model
+from ruleset import get_ruleset, route_ruleset
+from cache import make_cache_key, create_cache_from_env
+from streaming import StreamingAnalyzer, iter_decoded_chunks
+from metrics import metrics
+from jobs import QueueFull, create_job_queue_from_env
+from incremental import RevisionMismatch, create_document_store_from_env
+from neardup import create_index_from_env
+from serialization import encode_result, encode_batch, parse_fields
+from source_catalog import parse_region
+from fetcher import FetchError, create_fetcher_from_env, parse_url
+
+
+class AnalysisRequest(Request):
+    """Request whose body size limit depends on the endpoint."""
+    
+    @property
+    def max_content_length(self):
+        # /analyze/stream reads long documents in chunks, so it has its own limit
+        if self.endpoint == 'analyze_streamed':
+            return current_app.config['MAX_STREAM_LENGTH']
+        return super().max_content_length
 
-from utils import clean_text
-from nlp_logic import calculate_trust_score
-from explanation_engine import generate_explanations, create_summary
-from source_suggester import get_suggested_sources, get_source_names
 
 app = Flask(__name__)
+app.request_class = AnalysisRequest
 CORS(app)  # Enable CORS for React frontend
 
+# Maximum number of texts accepted by /analyze/batch
+app.config['MAX_BATCH_SIZE'] = int(os.environ.get('MAX_BATCH_SIZE', 100))
+
+# Maximum number of URLs accepted by /analyze/url
+app.config['MAX_URL_BATCH_SIZE'] = int(os.environ.get('MAX_URL_BATCH_SIZE', 20))
+
+# Maximum request body sizes in bytes, 0 for no limit
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 1024 * 1024)) or None
+app.config['MAX_STREAM_LENGTH'] = int(os.environ.get('MAX_STREAM_LENGTH', 64 * 1024 * 1024)) or None
+
+
+# Result cache in front of the pipeline (None when disabled)
+result_cache = create_cache_from_env()
+
+# Index of analyzed texts for reusing near-duplicate results (None when disabled)
+near_duplicates = create_index_from_env()
+
+# Background queue for /jobs (None when disabled)
+job_queue = create_job_queue_from_env()
+
+# Documents under live editing for /documents (None when disabled)
+document_store = create_document_store_from_env()
+
+# Pooled HTTP client and page cache for /analyze/url
+page_fetcher = create_fetcher_from_env()
+
+
+def analyze_text(text, trace=False, region=None):
+    """
+    Run the full analysis pipeline on one text.
+    
+    Args:
+        text (str): Raw news text
+        trace (bool): Attach the scoring trace (bypasses the caches)
+        region (str): Preferred region of the suggested sources, or None
+        
+    Returns:
+        dict: Analysis result in the /analyze response shape, plus
+              'duplicates' when the near-duplicate index is enabled
+    """
+    return analyze_cleaned(timed_clean(text), trace=trace, region=region)
+
+
+def timed_clean(text):
+    """Clean a text, recording the cleaning time."""
+    started = time.perf_counter()
+    cleaned_text = clean_text(text)
+    metrics.observe('fakenews_stage_duration_seconds', time.perf_counter() - started, stage='cleaning')
+    return cleaned_text
+
+
+def analyze_cleaned(cleaned_text, trace=False, region=None, fake_probability=None):
+    """
+    Analyze an already cleaned text, through the caches.
+    
+    Args:
+        cleaned_text (str): Output of utils.clean_text
+        trace (bool): Attach the scoring trace (bypasses the caches)
+        region (str): Preferred region of the suggested sources, or None
+        fake_probability (float): Model verdict already computed for a batch
+        
+    Returns:
+        dict: Analysis result, as for analyze_text
+    """
+    # Pin the ruleset for the text's language, so the cache key matches the
+    # rules applied
+    context = AnalysisContext(cleaned_text)
+    ruleset, _ = route_ruleset(context.language)
+    
+    # Results differ by language, source region and model, so each is cached on its own
+    model = get_model()
+    variant = '/'.join(part for part in (ruleset.version, context.language, region,
+                                         model.key if model else None) if part)
+    
+    # Serve repeated submissions from the cache
+    cache_key = None
+    if result_cache is not None and not trace:
+        cache_key = make_cache_key(cleaned_text, variant)
+        cached = result_cache.get(cache_key)
+        metrics.inc('fakenews_cache_lookups_total', result='miss' if cached is None else 'hit')
+        if cached is not None:
+            metrics.inc('fakenews_labels_total', label=cached['label'])
+            result = dict(cached)
+            # Copies indexed since the result was cached are looked up again
+            result.pop('duplicates', None)
+            if near_duplicates is not None and 'duplicates' in cached:
+                result['duplicates'] = refresh_duplicates(cached['duplicates'], cleaned_text, variant)
+            return result
+    
+    # Look for a reworded copy of a text analyzed earlier
+    signature = None
+    matches = []
+    if near_duplicates is not None and not trace:
+        signature = near_duplicates.signature(cleaned_text)
+        if signature is not None:
+            matches = near_duplicates.find(signature, variant)
+    
+    # Its sources are reused only if this text gets the same penalties and
+    # label; the text itself is always scored and explained
+    original = near_duplicates.get(matches[0][1]) if matches else None
+    similar = (original['penalties'], original['result']) if original is not None else None
+    
+    stats = {}
+    result = run_pipeline(context, trace=trace, stats=stats, ruleset=ruleset, region=region,
+                          fake_probability=fake_probability, similar=similar)
+    
+    for stage, seconds in stats['stages'].items():
+        metrics.observe('fakenews_stage_duration_seconds', seconds, stage=stage)
+    for issue_type in stats['issue_types']:
+        metrics.inc('fakenews_issues_total', type=issue_type)
+    if stats['reused']:
+        metrics.inc('fakenews_cache_lookups_total', result='near_duplicate')
+    metrics.inc('fakenews_labels_total', label=result['label'])
+    
+    if signature is not None:
+        entry_id = make_cache_key(cleaned_text, variant)[:16]
+        cluster = near_duplicates.add(entry_id, signature, result, variant, matches, stats['penalties'])
+        result = dict(result)
+        result['duplicates'] = describe_duplicates(entry_id, cluster, matches[0][1] if stats['reused'] else None,
+                                                   matches)
+    
+    if cache_key is not None:
+        result_cache.set(cache_key, result)
+    
+    return result
+
+
+def describe_duplicates(entry_id, cluster, reused_from, matches):
+    """Build the 'duplicates' field of a result from near-duplicate index lookups."""
+    return {
+        'id': entry_id,
+        'cluster': cluster,
+        'reused_from': reused_from,
+        'matches': [{'id': match_id, 'similarity': round(similarity, 3)}
+                    for similarity, match_id in matches if match_id != entry_id]
+    }
+
+
+def refresh_duplicates(duplicates, cleaned_text, variant):
+    """
+    Bring the 'duplicates' field of a cached result up to date.
+    
+    Args:
+        duplicates (dict): Field as stored with the result
+        cleaned_text (str): Text of the result
+        variant (str): Ruleset version and options the result was produced with
+        
+    Returns:
+        dict: The field with the text's current cluster and matches
+    """
+    entry = near_duplicates.get(duplicates['id'])
+    signature = entry['signature'] if entry is not None else near_duplicates.signature(cleaned_text)
+    matches = near_duplicates.find(signature, variant) if signature is not None else []
+    cluster = entry['cluster'] if entry is not None else duplicates['cluster']
+    return describe_duplicates(duplicates['id'], cluster, duplicates['reused_from'], matches)
+
+
+def batch_fake_probabilities(cleaned_texts):
+    """
+    Score many cleaned texts with the optional model in one call.
+    
+    Args:
+        cleaned_texts (dict): Key -> cleaned text
+        
+    Returns:
+        dict: Key -> model probability that the text is fake (empty
+              without a model)
+    """
+    model = get_model()
+    if model is None or not cleaned_texts:
+        return {}
+    started = time.perf_counter()
+    batch = model.fake_probabilities([cleaned_text.lower() for cleaned_text in cleaned_texts.values()])
+    metrics.observe('fakenews_stage_duration_seconds', time.perf_counter() - started, stage='model')
+    return dict(zip(cleaned_texts, batch))
+
+
+def timed_jsonify(payload):
+    """jsonify a response, recording the serialization time."""
+    started = time.perf_counter()
+    response = jsonify(payload)
+    metrics.observe('fakenews_stage_duration_seconds', time.perf_counter() - started, stage='serialization')
+    return response
+
+
+def timed_response(encode, *args):
+    """Build a JSON response with encode(*args), recording the serialization time."""
+    started = time.perf_counter()
+    body = encode(*args)
+    metrics.observe('fakenews_stage_duration_seconds', time.perf_counter() - started, stage='serialization')
+    return Response(body, mimetype='application/json')
+
+
+def invalid_fields(error):
+    """Error response for a malformed fields parameter."""
+    return jsonify({
+        'error': 'Invalid fields',
+        'message': str(error)
+    }), 400
+
+
+def invalid_region(error):
+    """Error response for a malformed region parameter."""
+    return jsonify({
+        'error': 'Invalid region',
+        'message': str(error)
+    }), 400
+
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started, for the duration metric."""
+    g.request_started = time.perf_counter()
+
+
+@app.before_request
+def check_request_size():
+    """Reject oversized bodies before anything reads or parses them."""
+    limit = request.max_content_length
+    if limit is not None and request.content_length is not None and request.content_length > limit:
+        raise RequestEntityTooLarge()
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    """JSON error for bodies above the size limit."""
+    message = f'Request bodies may be at most {request.max_content_length} bytes'
+    if request.endpoint != 'analyze_streamed':
+        message += '; send long documents to /analyze/stream'
+    return jsonify({
+        'error': 'Request too large',
+        'message': message
+    }), 413
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record duration, size and errors for every request."""
+    endpoint = request.endpoint or 'unknown'
+    started = g.get('request_started')
+    if started is not None:
+        metrics.observe('fakenews_request_duration_seconds', time.perf_counter() - started, endpoint=endpoint)
+    if request.content_length:
+        metrics.observe('fakenews_request_size_bytes', request.content_length, endpoint=endpoint)
+    if response.status_code >= 400:
+        metrics.inc('fakenews_errors_total', endpoint=endpoint, status=response.status_code)
+    return response
+
 
 @app.route('/', methods=['GET'])
 def home():
@@ -35,6 +310,15 @@ def analyze():
         "text": "The news article text to analyze..."
     }
     
+    Pass "debug": "trace" in the body (or ?debug=trace) to include the
+    step-by-step scoring trace in the response.
+    
+    Pass "fields": ["label", "trust_score", ...] in the body (or
+    ?fields=label,trust_score) to return only those analysis fields.
+    
+    Pass "region": "us" in the body (or ?region=us) to prefer verification
+    sources from that region.
+    
     Returns:
     {
         "label": "Likely Fake | Unverified | Likely Real",
@@ -42,7 +326,10 @@ def analyze():
         "explanations": [{"sentence": "...", "reason": "..."}],
         "sources": ["Source Name", ...],
         "sources_detailed": [{"name": "...", "url": "...", "description": "..."}],
-        "summary": "Brief summary of analysis"
+        "summary": "Brief summary of analysis",
+        "language": "Detected language code (und if undetermined)",
+        "ruleset_version": "Version of the rules that produced the result",
+        "model": {"fake_probability": 0-1, ...}   (when MODEL_PATH is set)
     }
     """
     try:
@@ -64,35 +351,259 @@ def analyze():
                 'message': 'Please provide non-empty news text to analyze'
             }), 400
         
-        # Clean the text
-        cleaned_text = clean_text(text)
+        # Opt-in scoring trace
+        trace = request.args.get('debug') == 'trace' or data.get('debug') == 'trace'
         
-        # Calculate trust score and get issues
-        analysis = calculate_trust_score(cleaned_text)
-        trust_score = analysis['score']
-        label = analysis['label']
-        issues = analysis['issues']
+        # Optional subset of the response fields
+        try:
+            fields = parse_fields(request.args.get('fields', data.get('fields')))
+        except ValueError as e:
+            return invalid_fields(e)
         
-        # Generate explanations
-        explanations = generate_explanations(cleaned_text, issues)
+        # Optional preferred region of the sources
+        try:
+            region = parse_region(request.args.get('region', data.get('region')))
+        except ValueError as e:
+            return invalid_region(e)
         
-        # Get suggested sources
-        sources_detailed = get_suggested_sources(cleaned_text, label)
-        sources = get_source_names(sources_detailed)
+        # Return analysis results
+        return timed_response(encode_result, analyze_text(text, trace=trace, region=region), fields)
+    
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({
+            'error': 'Analysis failed',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Analyze many news texts in one request.
+    
+    Expected JSON body:
+    {
+        "texts": ["First article...", "Second article..."]
+    }
+    or, with caller-supplied ids:
+    {
+        "items": [{"id": "a1", "text": "First article..."}, ...]
+    }
+    
+    Returns:
+    {
+        "results": [{"id": ..., <same fields as /analyze>} | {"id": ..., "error": "...", "message": "..."}],
+        "count": <number of items>
+    }
+    Results are returned in input order. "fields" selects the analysis
+    fields and "region" the source region of every result, as for /analyze.
+    """
+    data = request.get_json(silent=True)
+    
+    if not data or not isinstance(data.get('items', data.get('texts')), list):
+        return jsonify({
+            'error': 'Missing required field: texts',
+            'message': 'Please provide a list of texts (or items with id and text) to analyze'
+        }), 400
+    
+    if 'items' in data:
+        items = [item if isinstance(item, dict) else {'text': item} for item in data['items']]
+    else:
+        items = [{'id': index, 'text': text} for index, text in enumerate(data['texts'])]
+    
+    try:
+        fields = parse_fields(request.args.get('fields', data.get('fields')))
+    except ValueError as e:
+        return invalid_fields(e)
+    
+    try:
+        region = parse_region(request.args.get('region', data.get('region')))
+    except ValueError as e:
+        return invalid_region(e)
+    
+    max_batch_size = app.config['MAX_BATCH_SIZE']
+    if len(items) > max_batch_size:
+        return jsonify({
+            'error': 'Batch too large',
+            'message': f'A batch may contain at most {max_batch_size} texts'
+        }), 413
+    
+    # Clean every text first, so the optional model scores the batch at once
+    cleaned_texts = {}
+    for index, item in enumerate(items):
+        text = item.get('text')
+        if isinstance(text, str) and text.strip():
+            cleaned_texts[index] = timed_clean(text)
+    
+    fake_probabilities = batch_fake_probabilities(cleaned_texts)
+    
+    results = []
+    for index, item in enumerate(items):
+        item_id = item.get('id', index)
         
-        # Create summary
-        summary = create_summary(trust_score, label, explanations)
+        if index not in cleaned_texts:
+            results.append({
+                'id': item_id,
+                'error': 'Empty text provided',
+                'message': 'Please provide non-empty news text to analyze'
+            })
+            continue
         
-        # Return analysis results
+        try:
+            result = analyze_cleaned(cleaned_texts[index], region=region,
+                                     fake_probability=fake_probabilities.get(index))
+        except Exception as e:
+            results.append({
+                'id': item_id,
+                'error': 'Analysis failed',
+                'message': str(e)
+            })
+            continue
+        
+        results.append({'id': item_id, **result})
+    
+    return timed_response(encode_batch, results, fields)
+
+
+@app.route('/analyze/url', methods=['POST'])
+def analyze_url():
+    """
+    Fetch news articles by URL and analyze their main text.
+    
+    Expected JSON body:
+    {
+        "url": "https://example.com/article"
+    }
+    or, for several articles fetched concurrently:
+    {
+        "urls": ["https://example.com/a", "https://example.com/b"]
+    }
+    
+    Returns, for one URL, the same fields as /analyze plus "url" and the
+    page "title". For several URLs:
+    {
+        "results": [{"url": ..., "title": ..., <same fields as /analyze>} | {"url": ..., "error": "...", "message": "..."}],
+        "count": <number of URLs>
+    }
+    Results are returned in input order. "fields" and "region" work as
+    for /analyze.
+    """
+    data = request.get_json(silent=True)
+    
+    if not isinstance(data, dict) or not ('url' in data or isinstance(data.get('urls'), list)):
         return jsonify({
-            'label': label,
-            'trust_score': trust_score,
-            'explanations': explanations,
-            'sources': sources,
-            'sources_detailed': sources_detailed,
-            'summary': summary
-        })
+            'error': 'Missing required field: url',
+            'message': 'Please provide a url (or a list of urls) to analyze'
+        }), 400
+    
+    single = not isinstance(data.get('urls'), list)
+    requested = [data['url']] if single else data['urls']
+    
+    try:
+        fields = parse_fields(request.args.get('fields', data.get('fields')))
+    except ValueError as e:
+        return invalid_fields(e)
+    
+    try:
+        region = parse_region(request.args.get('region', data.get('region')))
+    except ValueError as e:
+        return invalid_region(e)
+    
+    max_urls = app.config['MAX_URL_BATCH_SIZE']
+    if len(requested) > max_urls:
+        return jsonify({
+            'error': 'Batch too large',
+            'message': f'A request may contain at most {max_urls} URLs'
+        }), 413
     
+    # Per-URL outcome: (HTTP status, error) for failures
+    errors = {}
+    urls = {}
+    for index, value in enumerate(requested):
+        try:
+            urls[index] = parse_url(value)
+        except ValueError as e:
+            errors[index] = (400, {'error': 'Invalid URL', 'message': str(e)})
+    
+    # Fetch every page at once, then clean them all so the optional model
+    # scores the batch in one call
+    started = time.perf_counter()
+    pages = dict(zip(urls, page_fetcher.fetch_all(list(urls.values()))))
+    metrics.observe('fakenews_stage_duration_seconds', time.perf_counter() - started, stage='fetch')
+    
+    cleaned_texts = {}
+    for index, page in pages.items():
+        if isinstance(page, FetchError):
+            metrics.inc('fakenews_page_fetches_total', result='error')
+            errors[index] = (502, {'error': 'Fetch failed', 'message': str(page)})
+            continue
+        metrics.inc('fakenews_page_fetches_total', result='not_modified' if page['not_modified'] else 'fetched')
+        cleaned_text = timed_clean(page['text'])
+        if not cleaned_text:
+            errors[index] = (422, {'error': 'No article text', 'message': f"No article text found at {page['url']}"})
+            continue
+        cleaned_texts[index] = cleaned_text
+    
+    fake_probabilities = batch_fake_probabilities(cleaned_texts)
+    
+    results = []
+    for index, value in enumerate(requested):
+        if index not in errors:
+            try:
+                result = analyze_cleaned(cleaned_texts[index], region=region,
+                                         fake_probability=fake_probabilities.get(index))
+            except Exception as e:
+                errors[index] = (500, {'error': 'Analysis failed', 'message': str(e)})
+            else:
+                results.append({'url': value, 'title': pages[index]['title'], **result})
+                continue
+        status, error = errors[index]
+        if single:
+            return jsonify(error), status
+        results.append({'url': value, **error})
+    
+    if single:
+        return timed_response(encode_result, results[0], fields)
+    return timed_response(encode_batch, results, fields)
+
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_streamed():
+    """
+    Analyze a very long document sent as the raw request body.
+    
+    The body (plain UTF-8 text, e.g. a transcript) is read and analyzed
+    in chunks, sentence by sentence, so memory use does not grow with the
+    document size. Returns the same fields as /analyze (?fields= selects
+    a subset, ?region= the source region).
+    """
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return invalid_fields(e)
+    
+    try:
+        region = parse_region(request.args.get('region'))
+    except ValueError as e:
+        return invalid_region(e)
+    
+    try:
+        analyzer = StreamingAnalyzer(region=region)
+        for piece in iter_clean_text(iter_decoded_chunks(request.stream)):
+            analyzer.feed(piece)
+        
+        if not analyzer.length:
+            return jsonify({
+                'error': 'Empty text provided',
+                'message': 'Please provide non-empty news text to analyze'
+            }), 400
+        
+        return timed_response(encode_result, analyzer.finish(), fields)
+    
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         return jsonify({
             'error': 'Analysis failed',
@@ -100,15 +611,246 @@ def analyze():
         }), 500
 
 
+def jobs_disabled():
+    """Build the 503 response for /jobs when no job queue is configured."""
+    return jsonify({
+        'error': 'Jobs disabled',
+        'message': 'Background jobs are not enabled on this server (see JOB_BACKEND)'
+    }), 503
+
+
+def documents_disabled():
+    """Build the 503 response for /documents when live analysis is disabled."""
+    return jsonify({
+        'error': 'Live documents disabled',
+        'message': 'Live document analysis is not enabled on this server (see LIVE_DOCUMENTS)'
+    }), 503
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a news text for background analysis.
+    
+    Expected JSON body: same as /analyze.
+    
+    Returns (202):
+    {
+        "job_id": "...",
+        "status": "queued",
+        "status_url": "/jobs/<job_id>"
+    }
+    Returns 429 when the queue is full; retry after a short wait.
+    """
+    if job_queue is None:
+        return jobs_disabled()
+    
+    data = request.get_json(silent=True)
+    
+    if not data or 'text' not in data:
+        return jsonify({
+            'error': 'Missing required field: text',
+            'message': 'Please provide news text to analyze'
+        }), 400
+    
+    text = data['text']
+    if not isinstance(text, str) or not text.strip():
+        return jsonify({
+            'error': 'Empty text provided',
+            'message': 'Please provide non-empty news text to analyze'
+        }), 400
+    
+    trace = request.args.get('debug') == 'trace' or data.get('debug') == 'trace'
+    
+    try:
+        region = parse_region(request.args.get('region', data.get('region')))
+    except ValueError as e:
+        return invalid_region(e)
+    
+    try:
+        job_id = job_queue.submit(analyze_text, text, trace=trace, region=region)
+    except QueueFull as e:
+        response = jsonify({
+            'error': 'Too many queued jobs',
+            'message': str(e)
+        })
+        response.headers['Retry-After'] = '5'
+        return response, 429
+    
+    status_url = f'/jobs/{job_id}'
+    response = jsonify({'job_id': job_id, 'status': 'queued', 'status_url': status_url})
+    response.headers['Location'] = status_url
+    return response, 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Get the status of a background job.
+    
+    Returns:
+    {
+        "job_id": "...",
+        "status": "queued | running | done | failed",
+        "result": {<same fields as /analyze>},   (when done)
+        "error": "..."                           (when failed)
+    }
+    Finished jobs expire after JOB_RESULT_TTL seconds (404 afterwards).
+    """
+    if job_queue is None:
+        return jobs_disabled()
+    
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'error': 'Job not found',
+            'message': 'Unknown job id, or its result has expired'
+        }), 404
+    
+    response = {'job_id': job.pop('id'), **job}
+    return timed_jsonify(response)
+
+
+@app.route('/documents', methods=['POST'])
+def create_document():
+    """
+    Start live analysis of a document being edited.
+    
+    Expected JSON body:
+    {
+        "text": "Current editor contents (may be empty)"
+    }
+    
+    Returns:
+    {
+        "document_id": "...",
+        "revision": 0,
+        <same fields as /analyze>
+    }
+    """
+    if document_store is None:
+        return documents_disabled()
+    
+    data = request.get_json(silent=True)
+    
+    if not data or not isinstance(data.get('text'), str):
+        return jsonify({
+            'error': 'Missing required field: text',
+            'message': 'Please provide the document text'
+        }), 400
+    
+    document_id, document = document_store.create(data['text'])
+    return timed_response(encode_result, {'document_id': document_id, 'revision': document.revision,
+                                          **document.result()}), 201
+
+
+@app.route('/documents/<document_id>', methods=['PATCH'])
+def edit_document(document_id):
+    """
+    Apply edits to a live document and return the updated analysis.
+    
+    Only the sentences touched by the edits are re-analyzed.
+    
+    Expected JSON body:
+    {
+        "revision": 3,
+        "edits": [{"start": 120, "end": 125, "text": "replacement"}]
+    }
+    Offsets refer to the text at the given revision; edits are applied in
+    order, each against the result of the previous one.
+    
+    Returns the same fields as POST /documents with the new revision.
+    Returns 409 if the revision is outdated and 404 if the document has
+    expired; the client should then resend the full text to POST /documents.
+    """
+    if document_store is None:
+        return documents_disabled()
+    
+    data = request.get_json(silent=True)
+    
+    if not data or not isinstance(data.get('edits'), list) or not isinstance(data.get('revision'), int):
+        return jsonify({
+            'error': 'Missing required fields: revision, edits',
+            'message': 'Please provide the base revision and a list of edits'
+        }), 400
+    
+    try:
+        document = document_store.edit(document_id, data['revision'], data['edits'])
+    except RevisionMismatch as e:
+        return jsonify({
+            'error': 'Revision mismatch',
+            'message': str(e)
+        }), 409
+    except ValueError as e:
+        return jsonify({
+            'error': 'Invalid edit',
+            'message': str(e)
+        }), 400
+    
+    if document is None:
+        return jsonify({
+            'error': 'Document not found',
+            'message': 'Unknown document id, or it has expired'
+        }), 404
+    
+    return timed_response(encode_result, {'document_id': document_id, 'revision': document.revision,
+                                          **document.result()})
+
+
+@app.route('/documents/<document_id>', methods=['DELETE'])
+def delete_document(document_id):
+    """Stop live analysis of a document."""
+    if document_store is None:
+        return documents_disabled()
+    if not document_store.delete(document_id):
+        return jsonify({
+            'error': 'Document not found',
+            'message': 'Unknown document id, or it has expired'
+        }), 404
+    return '', 204
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint for monitoring."""
-    return jsonify({'status': 'healthy'})
+    response = {'status': 'healthy', 'ruleset_version': get_ruleset().version}
+    if result_cache is not None:
+        response['cache'] = result_cache.stats()
+    if near_duplicates is not None:
+        response['near_duplicates'] = near_duplicates.stats()
+    model = get_model()
+    if model is not None:
+        response['model'] = model.describe()
+    if job_queue is not None:
+        response['jobs'] = job_queue.stats()
+    return jsonify(response)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Prometheus metrics: per-stage latency histograms, request sizes,
+    issue and label counts, cache lookups and errors. Set METRICS_DIR to
+    a shared directory to aggregate across gunicorn workers.
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 
 if __name__ == '__main__':
+    # Resolve NLP data now so missing resources are reported at startup
+    nlp_logic.preload()
+    
     print("Starting Fake News Explained API...")
     print("API running at: http://localhost:5000")
     print("POST /analyze - Analyze news text")
+    print("POST /analyze/batch - Analyze a list of news texts")
+    print("POST /analyze/url - Fetch news pages by URL and analyze them")
+    print("POST /analyze/stream - Analyze a long document sent as plain text")
+    print("POST /jobs - Queue a news text for background analysis")
+    print("GET /jobs/<id> - Job status and result")
+    print("POST /documents - Start live analysis of an edited document")
+    print("PATCH /documents/<id> - Apply edits and get the updated analysis")
     print("GET /health - Health check")
+    print("GET /metrics - Prometheus metrics")
+    print("Development server; for production run: gunicorn wsgi:app")
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,260 @@
+"""
+Benchmark suite for the analysis pipeline.
+
+Generates synthetic articles of controlled length and indicator density,
+times every pipeline stage plus end-to-end /analyze through Flask's test
+client, and writes the results as JSON so runs can be compared.
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --output new.json --compare bench.json
+    python benchmark.py --lengths 100 5000 --densities 0 0.1 --repeat 50
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+import nlp_logic
+import explanation_engine
+import source_suggester
+from utils import clean_text
+from ruleset import get_ruleset
+
+
+# Neutral words used to pad synthetic articles
+FILLER_WORDS = (
+    "the city council met on tuesday to review the annual budget and residents "
+    "spoke about road repairs near the school while officials said the report "
+    "would be published next month after a public consultation with local groups"
+).split()
+
+DEFAULT_LENGTHS = [50, 500, 5000]
+DEFAULT_DENSITIES = [0.0, 0.05, 0.2]
+DEFAULT_REPEAT = 20
+
+# Slowdown ratio above which --compare reports a regression
+REGRESSION_THRESHOLD = 1.2
+
+
+def indicator_phrases():
+    """Collect sample indicator phrases from the current lexicons."""
+    ruleset = get_ruleset()
+    phrases = list(ruleset.entries('clickbait'))
+    phrases += ruleset.entries('emotional_language')
+    phrases += ruleset.entries('missing_sources')
+    phrases += [p for p in ruleset.entries('urgency') if p.replace("'", '').replace(' ', '').isalpha()]
+    phrases += ["100% safe", "never again", "miracle cure", "scientists shocked", "EXPOSED!",
+                "ALL diseases", "90% of doctors", "government hiding", "wake up", "DEADLY"]
+    return phrases
+
+
+def generate_article(n_words, density, seed=0):
+    """
+    Generate a synthetic article.
+
+    Args:
+        n_words (int): Approximate number of words
+        density (float): Fraction of words replaced by indicator phrases
+        seed (int): Random seed, so the same arguments give the same text
+
+    Returns:
+        str: Article text with sentences, punctuation and a few URLs
+    """
+    rng = random.Random(seed)
+    phrases = indicator_phrases()
+    words = []
+    for i in range(n_words):
+        if rng.random() < density:
+            words.append(rng.choice(phrases))
+        else:
+            words.append(rng.choice(FILLER_WORDS))
+        if rng.random() < 0.08:
+            words[-1] += rng.choice(['.', '.', '.', '!', '?'])
+        if rng.random() < 0.002:
+            words.append('https://example.com/story/' + str(i))
+    return ' '.join(words) + '.'
+
+
+def time_stage(func, arg, repeat):
+    """
+    Time repeated calls of one stage.
+
+    Returns:
+        dict: Latency statistics in milliseconds
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'mean_ms': round(statistics.fmean(samples), 4),
+        'p50_ms': round(samples[len(samples) // 2], 4),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        'min_ms': round(samples[0], 4)
+    }
+
+
+def _preprocess_fully(text):
+    """Preprocess and force the lazily computed token lists."""
+    processed = nlp_logic.preprocess_text(text)
+    return processed.tokens, processed.filtered_tokens
+
+
+def build_stages(client):
+    """
+    List the stages to benchmark.
+
+    Each stage takes the raw article text; stages after cleaning clean it
+    outside the timed call, matching what the pipeline hands them.
+    """
+    analysis = {}
+
+    def issues_for(cleaned):
+        if cleaned not in analysis:
+            analysis[cleaned] = nlp_logic.calculate_trust_score(cleaned)
+        return analysis[cleaned]
+
+    stages = [
+        ('clean_text', lambda text: text, clean_text),
+        ('preprocess_text', clean_text, _preprocess_fully),
+        ('detect_clickbait', lambda t: clean_text(t).lower(), nlp_logic.detect_clickbait),
+        ('detect_emotional_language', lambda t: clean_text(t).lower(), nlp_logic.detect_emotional_language),
+        ('detect_extreme_claims', clean_text, nlp_logic.detect_extreme_claims),
+        ('detect_urgency', lambda t: clean_text(t).lower(), nlp_logic.detect_urgency),
+        ('detect_missing_sources', lambda t: clean_text(t).lower(), nlp_logic.detect_missing_sources),
+        ('count_caps_and_exclamations', clean_text, nlp_logic.count_caps_and_exclamations),
+        ('calculate_trust_score', clean_text, nlp_logic.calculate_trust_score),
+        ('generate_explanations',
+         lambda t: (clean_text(t), issues_for(clean_text(t))['issues']),
+         lambda args: explanation_engine.generate_explanations(*args)),
+        ('get_suggested_sources',
+         lambda t: (clean_text(t), issues_for(clean_text(t))['label']),
+         lambda args: source_suggester.get_suggested_sources(*args)),
+    ]
+
+    if client is not None:
+        stages.append(('analyze_endpoint', lambda t: {'text': t},
+                       lambda body: client.post('/analyze', json=body)))
+
+    return stages
+
+
+def run_benchmarks(lengths, densities, repeat, stage_filter=None, include_endpoint=True):
+    """
+    Benchmark every stage on every (length, density) combination.
+
+    Returns:
+        dict: Environment info and one result entry per stage and corpus
+    """
+    client = None
+    if include_endpoint:
+        import app as app_module
+        app_module.result_cache = None  # Time real analysis, not cache hits
+        app_module.near_duplicates = None
+        client = app_module.app.test_client()
+
+    nlp_logic.preload()
+    stages = build_stages(client)
+    if stage_filter:
+        stages = [stage for stage in stages if stage[0] in stage_filter]
+
+    results = []
+    for n_words in lengths:
+        for density in densities:
+            text = generate_article(n_words, density, seed=n_words)
+            for name, prepare, func in stages:
+                arg = prepare(text)
+                func(arg)  # Warm up
+                timing = time_stage(func, arg, repeat)
+                seconds = timing['mean_ms'] / 1000
+                results.append({
+                    'stage': name,
+                    'words': n_words,
+                    'density': density,
+                    'chars': len(text),
+                    **timing,
+                    'docs_per_second': round(1 / seconds, 1) if seconds else None,
+                    'mb_per_second': round(len(text) / 1e6 / seconds, 3) if seconds else None
+                })
+
+    return {
+        'ruleset_version': get_ruleset().version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare two benchmark runs.
+
+    Returns:
+        list: (stage, words, density, ratio) for each slowed-down entry
+    """
+    baseline_index = {
+        (r['stage'], r['words'], r['density']): r for r in baseline['results']
+    }
+    regressions = []
+    for r in current['results']:
+        base = baseline_index.get((r['stage'], r['words'], r['density']))
+        if not base or not base['p50_ms']:
+            continue
+        ratio = r['p50_ms'] / base['p50_ms']
+        if ratio > threshold:
+            regressions.append((r['stage'], r['words'], r['density'], round(ratio, 2)))
+    return regressions
+
+
+def print_table(report):
+    """Print results as a readable table."""
+    print(f"{'stage':<30} {'words':>6} {'density':>8} {'p50 ms':>10} {'p95 ms':>10} {'docs/s':>10}")
+    for r in report['results']:
+        print(f"{r['stage']:<30} {r['words']:>6} {r['density']:>8} "
+              f"{r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['docs_per_second'] or 0:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the fake news analysis pipeline.')
+    parser.add_argument('--lengths', type=int, nargs='+', default=DEFAULT_LENGTHS, help='Article lengths in words')
+    parser.add_argument('--densities', type=float, nargs='+', default=DEFAULT_DENSITIES,
+                        help='Fractions of words that are indicator phrases')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Timed runs per stage')
+    parser.add_argument('--stages', nargs='+', help='Only run these stages')
+    parser.add_argument('--no-endpoint', action='store_true', help='Skip the Flask /analyze benchmark')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='p50 slowdown ratio reported as a regression')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.lengths, args.densities, args.repeat,
+                            stage_filter=args.stages, include_endpoint=not args.no_endpoint)
+    print_table(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if baseline.get('ruleset_version') != report['ruleset_version']:
+            print("Note: baseline was recorded with a different ruleset version")
+        for stage, words, density, ratio in regressions:
+            print(f"REGRESSION {stage} (words={words}, density={density}): {ratio}x slower")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
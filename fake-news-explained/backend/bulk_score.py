@@ -0,0 +1,285 @@
+"""
+Bulk scoring tool for rescoring JSONL/CSV corpora offline.
+
+Reads the input as a stream, fans chunks of records out to a process
+pool and writes one JSON result per line, in input order. Progress is
+checkpointed so an interrupted run can be resumed with --resume.
+
+Usage:
+    python bulk_score.py articles.jsonl results.jsonl
+    python bulk_score.py articles.csv results.jsonl --text-field body --id-field url
+    python bulk_score.py articles.jsonl results.jsonl --workers 8 --resume
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import nlp_logic
+from utils import clean_text
+from ruleset import get_ruleset
+from pipeline import run_pipeline
+from classifier import get_model
+
+
+# Records sent to a worker at a time
+DEFAULT_CHUNK_SIZE = 200
+
+# Seconds between progress reports
+PROGRESS_INTERVAL = 5.0
+
+
+def read_records(path, input_format, text_field='text', id_field='id', label_field=None):
+    """
+    Stream records from a JSONL or CSV file.
+
+    Args:
+        path (str): Input file
+        input_format (str): 'jsonl' or 'csv'
+        text_field (str): Field holding the article text
+        id_field (str): Field holding the record id (defaults to the record number)
+        label_field (str): Field holding a label to read as well (e.g. for training)
+
+    Yields:
+        dict: {'id': ..., 'text': ...} (plus 'label') or {'id': ..., 'error': ...} for bad rows
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if input_format == 'csv':
+            csv.field_size_limit(2 ** 31 - 1)
+            rows = ((number, row) for number, row in enumerate(csv.DictReader(f)))
+        else:
+            rows = _read_jsonl_rows(f)
+
+        for number, row in rows:
+            if not isinstance(row, dict):
+                yield {'id': number, 'error': 'Invalid record'}
+                continue
+            record_id = row.get(id_field, number)
+            text = row.get(text_field)
+            if not isinstance(text, str):
+                yield {'id': record_id, 'error': f'Missing required field: {text_field}'}
+                continue
+            if label_field is None:
+                yield {'id': record_id, 'text': text}
+            elif row.get(label_field) in (None, ''):
+                yield {'id': record_id, 'error': f'Missing required field: {label_field}'}
+            else:
+                yield {'id': record_id, 'text': text, 'label': row[label_field]}
+
+
+def _read_jsonl_rows(f):
+    """Yield (record number, parsed object) for each non-blank JSONL line."""
+    number = 0
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row
+        number += 1
+
+
+def score_records(records):
+    """
+    Analyze a chunk of records.
+
+    Args:
+        records (list): Records from read_records
+
+    Returns:
+        list: One result dict per record, with its id
+    """
+    cleaned_texts = [clean_text(record['text']) if 'error' not in record else '' for record in records]
+
+    # The optional model scores the whole chunk in one batch
+    fake_probabilities = {}
+    model = get_model()
+    if model is not None:
+        scored = [index for index, cleaned_text in enumerate(cleaned_texts) if cleaned_text]
+        batch = model.fake_probabilities([cleaned_texts[index].lower() for index in scored])
+        fake_probabilities = dict(zip(scored, batch))
+
+    results = []
+    for index, record in enumerate(records):
+        if 'error' in record:
+            results.append(record)
+            continue
+
+        cleaned_text = cleaned_texts[index]
+        if not cleaned_text:
+            results.append({'id': record['id'], 'error': 'Empty text provided'})
+            continue
+
+        try:
+            result = run_pipeline(cleaned_text, fake_probability=fake_probabilities.get(index))
+        except Exception as e:
+            results.append({'id': record['id'], 'error': f'Analysis failed: {e}'})
+            continue
+
+        results.append({'id': record['id'], **result})
+    return results
+
+
+def load_checkpoint(path):
+    """Load a checkpoint file, or return None if there is none."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, checkpoint):
+    """Write a checkpoint atomically."""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, path)
+
+
+def _detect_format(path):
+    """Guess the input format from the file extension."""
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def bulk_score(input_path, output_path, input_format=None, text_field='text', id_field='id',
+               workers=None, chunk_size=DEFAULT_CHUNK_SIZE, resume=False, progress=True):
+    """
+    Score every record of a corpus and write results in input order.
+
+    Args:
+        input_path (str): JSONL or CSV corpus
+        output_path (str): JSONL file for results
+        input_format (str): 'jsonl' or 'csv' (guessed from the extension if None)
+        text_field (str): Field holding the article text
+        id_field (str): Field holding the record id
+        workers (int): Worker processes (defaults to the CPU count; 1 runs inline)
+        chunk_size (int): Records per worker task
+        resume (bool): Continue from the checkpoint of an earlier run
+        progress (bool): Report progress and throughput on stderr
+
+    Returns:
+        dict: Total records written, elapsed seconds and records per second
+    """
+    input_format = input_format or _detect_format(input_path)
+    workers = workers or os.cpu_count() or 1
+    checkpoint_path = output_path + '.checkpoint'
+
+    ruleset_version = get_ruleset().version
+    model = get_model()
+    model_version = model.key if model is not None else None
+    done = 0
+    output_bytes = 0
+    if resume:
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint is not None:
+            if (checkpoint['ruleset_version'] != ruleset_version
+                    or checkpoint.get('model_version') != model_version):
+                raise RuntimeError(
+                    'Rules or model changed since the checkpoint was written; '
+                    'rerun without --resume to rescore from the start'
+                )
+            done = checkpoint['records']
+            output_bytes = checkpoint['output_bytes']
+
+    records = itertools.islice(
+        read_records(input_path, input_format, text_field, id_field), done, None
+    )
+    chunks = iter(lambda: list(itertools.islice(records, chunk_size)), [])
+
+    mode = 'r+b' if resume and os.path.exists(output_path) else 'wb'
+    start_time = time.monotonic()
+    last_report = start_time
+    written = 0
+
+    with open(output_path, mode) as out:
+        out.seek(output_bytes)
+        out.truncate()
+
+        def write(results):
+            nonlocal written, last_report
+            out.write(b''.join(
+                json.dumps(result, ensure_ascii=False).encode('utf-8') + b'\n' for result in results
+            ))
+            out.flush()
+            written += len(results)
+            save_checkpoint(checkpoint_path, {
+                'input': os.path.abspath(input_path),
+                'ruleset_version': ruleset_version,
+                'model_version': model_version,
+                'records': done + written,
+                'output_bytes': out.tell()
+            })
+            now = time.monotonic()
+            if progress and now - last_report >= PROGRESS_INTERVAL:
+                rate = written / (now - start_time)
+                print(f"{done + written} records scored ({rate:.0f} records/s)", file=sys.stderr)
+                last_report = now
+
+        if workers == 1:
+            nlp_logic.preload()
+            for chunk in chunks:
+                write(score_records(chunk))
+        else:
+            with Pool(workers, initializer=nlp_logic.preload) as pool:
+                # Keep a bounded number of chunks in flight so the input is
+                # read only as fast as workers consume it
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.apply_async(score_records, (chunk,)))
+                    if len(pending) >= workers * 2:
+                        write(pending.popleft().get())
+                while pending:
+                    write(pending.popleft().get())
+
+    elapsed = time.monotonic() - start_time
+    summary = {
+        'records': done + written,
+        'scored_this_run': written,
+        'elapsed_seconds': round(elapsed, 2),
+        'records_per_second': round(written / elapsed, 1) if elapsed else 0.0
+    }
+    if progress:
+        print(
+            f"Done: {summary['records']} records ({written} this run) in "
+            f"{summary['elapsed_seconds']}s, {summary['records_per_second']} records/s",
+            file=sys.stderr
+        )
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a JSONL/CSV corpus of news articles.')
+    parser.add_argument('input', help='JSONL or CSV file of articles')
+    parser.add_argument('output', help='JSONL file to write results to')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='Input format (default: from extension)')
+    parser.add_argument('--text-field', default='text', help='Field holding the article text')
+    parser.add_argument('--id-field', default='id', help='Field holding the record id')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Records per worker task')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted run from its checkpoint')
+    parser.add_argument('--quiet', action='store_true', help='Do not report progress')
+    args = parser.parse_args(argv)
+
+    bulk_score(
+        args.input, args.output,
+        input_format=args.format,
+        text_field=args.text_field,
+        id_field=args.id_field,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        resume=args.resume,
+        progress=not args.quiet
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+Content-addressed result cache for the analysis pipeline.
+Results are keyed by a hash of the cleaned text and the ruleset version,
+so resubmitted stories skip tokenization, scoring and explanations.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# Bumped when the shape of analysis results changes, so entries stored
+# by an older version (e.g. in SQLite) are not served
+RESULT_FORMAT = 3
+
+# Seconds within which a SQLite cache hit does not record its access
+# again, so hot entries do not turn every read into a write
+ACCESS_RESOLUTION = 60.0
+
+# Inserts per process between SQLite eviction passes
+EVICTION_INTERVAL = 64
+
+
+def make_cache_key(cleaned_text, ruleset_version):
+    """
+    Build a cache key for a cleaned text.
+
+    Args:
+        cleaned_text (str): Output of utils.clean_text
+        ruleset_version (str): Version of the rules that produced the result
+
+    Returns:
+        str: Hex digest identifying the text under this ruleset
+    """
+    digest = hashlib.sha256()
+    digest.update(f'{RESULT_FORMAT}:{ruleset_version}'.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(cleaned_text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class CacheBackend:
+    """Storage interface for cached analysis results."""
+
+    def get(self, key):
+        """Return the stored value for key, or None if missing or expired."""
+        raise NotImplementedError
+
+    def set(self, key, value):
+        """Store a JSON-serializable value under key."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove every entry."""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache with an optional TTL."""
+
+    def __init__(self, max_entries=1024, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    File-backed LRU cache shared by every worker process on a host.
+    Values are stored as JSON; access times drive LRU eviction. Reads
+    only write an access time once it is ACCESS_RESOLUTION seconds old,
+    and entries beyond max_entries are evicted every EVICTION_INTERVAL
+    inserts, so the table may briefly hold a few more entries.
+    """
+
+    def __init__(self, path, max_entries=10000, ttl=None, eviction_interval=EVICTION_INTERVAL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.eviction_interval = eviction_interval
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'stored_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)')
+
+    def _connect(self):
+        # One connection per thread (and per process after fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute('SELECT value, stored_at, accessed_at FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value, stored_at, accessed_at = row
+        now = time.time()
+        if self.ttl and now - stored_at > self.ttl:
+            conn.execute('DELETE FROM results WHERE key = ?', (key,))
+            return None
+        if now - accessed_at > ACCESS_RESOLUTION:
+            conn.execute('UPDATE results SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(value)
+
+    def set(self, key, value):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO results (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)',
+            (key, json.dumps(value), now, now)
+        )
+        with self._lock:
+            self._inserts += 1
+            evict = self._inserts % self.eviction_interval == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries."""
+        conn = self._connect()
+        count = conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        if count > self.max_entries:
+            conn.execute(
+                'DELETE FROM results WHERE key IN ('
+                'SELECT key FROM results ORDER BY accessed_at LIMIT ?)',
+                (count - self.max_entries,)
+            )
+
+    def clear(self):
+        self._connect().execute('DELETE FROM results')
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+
+class ResultCache:
+    """Analysis result cache with hit/miss counters over a pluggable backend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # Requests are served on several threads
+
+    def get(self, key):
+        """Look up a cached result, counting the hit or miss."""
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """Store a result."""
+        self.backend.set(key, value)
+
+    def clear(self):
+        """Drop every cached result and reset the counters."""
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Entry count, hits, misses and hit ratio
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'entries': len(self.backend),
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def create_cache_from_env():
+    """
+    Build the result cache configured by environment variables.
+
+    RESULT_CACHE_BACKEND: "memory" (default), "sqlite" or "none"
+    RESULT_CACHE_SIZE: Maximum number of entries (default 1024)
+    RESULT_CACHE_TTL: Entry lifetime in seconds, 0 for no expiry (default 0)
+    RESULT_CACHE_PATH: SQLite file for the "sqlite" backend
+
+    Returns:
+        ResultCache or None: The cache, or None when caching is disabled
+    """
+    backend_name = os.environ.get('RESULT_CACHE_BACKEND', 'memory').lower()
+    max_entries = int(os.environ.get('RESULT_CACHE_SIZE', 1024))
+    ttl = float(os.environ.get('RESULT_CACHE_TTL', 0)) or None
+
+    if backend_name == 'none':
+        return None
+    if backend_name == 'sqlite':
+        path = os.environ.get('RESULT_CACHE_PATH', 'analysis_cache.sqlite3')
+        return ResultCache(SQLiteCacheBackend(path, max_entries=max_entries, ttl=ttl))
+    if backend_name == 'memory':
+        return ResultCache(MemoryCacheBackend(max_entries=max_entries, ttl=ttl))
+    raise ValueError(f"Unknown RESULT_CACHE_BACKEND: {backend_name}")
@@ -0,0 +1,327 @@
+"""
+Optional statistical classifier blended with the heuristic trust score.
+Texts are turned into hashed word n-gram TF-IDF vectors and scored by a
+logistic regression model trained offline with train_model.py. The model
+is a memory-mapped array file, so gunicorn workers share one copy, and
+a batch of texts is scored with a single sparse matrix-vector product.
+Requires NumPy; without a configured model the stage is skipped.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # Only needed when a model is configured
+    np = None
+
+
+logger = logging.getLogger(__name__)
+
+# Format of the files written by save_model
+MODEL_FORMAT = 1
+
+# Files of a model directory
+MODEL_META_FILE = 'model.json'
+MODEL_ARRAYS_FILE = 'weights.npy'
+
+# Feature space of 2 ** DEFAULT_HASH_BITS buckets, word 1- to 2-grams
+DEFAULT_HASH_BITS = 20
+DEFAULT_NGRAM_MAX = 2
+
+# Share of the model in the blended trust score
+DEFAULT_MODEL_WEIGHT = 0.5
+
+# Base of the polynomial word hash and its inverse (mod 2 ** 64)
+HASH_BASE = 0x100000001B3
+HASH_BASE_INVERSE = pow(HASH_BASE, -1, 1 << 64)
+
+# Longest batch (in characters) whose hash powers are kept for reuse
+MAX_CACHED_POWERS = 1 << 20
+
+# Multiplier chaining word hashes into n-gram hashes (64-bit, wrapping)
+NGRAM_PRIME = 1099511628211
+
+
+class ModelError(ValueError):
+    """Raised when a model cannot be loaded or trained."""
+
+
+def _require_numpy():
+    if np is None:
+        raise ModelError('NumPy is required for the model stage (pip install numpy)')
+
+
+def _mix(hashes):
+    """Scramble 64-bit hashes so their high bits are well distributed."""
+    hashes = hashes ^ (hashes >> np.uint64(33))
+    hashes = hashes * np.uint64(0xFF51AFD7ED558CCD)
+    return hashes ^ (hashes >> np.uint64(33))
+
+
+class HashedNgrams:
+    """
+    Featurizer mapping texts to hashed word n-gram counts.
+
+    A whole batch is featurized with array operations: the texts are
+    joined into one array of code points, words are the runs of word
+    characters (as matched by \\w, within the Basic Multilingual Plane),
+    and each word's polynomial hash is read off prefix sums. n-gram
+    hashes are chained from the word hashes. No Python code runs per
+    word, and the hashes are stable across processes.
+    """
+
+    def __init__(self, hash_bits=DEFAULT_HASH_BITS, ngram_max=DEFAULT_NGRAM_MAX):
+        _require_numpy()
+        self.hash_bits = hash_bits
+        self.ngram_max = ngram_max
+        self.size = 1 << hash_bits
+        self._word_table = np.array([chr(code).isalnum() or code == 0x5F for code in range(0x10000)])
+        self._powers = (np.zeros(0, np.uint64), np.zeros(0, np.uint64))
+
+    def _hash_powers(self, length):
+        """Get BASE ** (i + 1) and BASE ** -(i + 1) for i < length, cached for reuse."""
+        powers = self._powers
+        if len(powers[0]) < length:
+            size = max(length, 2 * len(powers[0]))
+            with np.errstate(over='ignore'):
+                powers = (np.cumprod(np.full(size, HASH_BASE, dtype=np.uint64)),
+                          np.cumprod(np.full(size, HASH_BASE_INVERSE, dtype=np.uint64)))
+            if size <= MAX_CACHED_POWERS:
+                self._powers = powers
+        return powers[0][:length], powers[1][:length]
+
+    def word_hashes(self, texts_lower):
+        """
+        Hash every word of a batch of texts.
+
+        Args:
+            texts_lower (list): Lowercased texts
+
+        Returns:
+            tuple: (hashes, text index of each word) arrays, in text order
+        """
+        joined = '\n'.join(texts_lower)
+        codes = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32)
+
+        # Words are runs of word characters; the joining newlines end them
+        is_word = self._word_table[np.minimum(codes, 0xFFFF)]
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], is_word, [False])).astype(np.int8)))
+        starts, ends = edges[0::2], edges[1::2]
+
+        # hash(word) = sum of code * BASE ** (distance to the word's end),
+        # read off prefix sums of code * BASE ** -(position + 1), mod 2 ** 64
+        powers, inverse_powers = self._hash_powers(len(codes))
+        with np.errstate(over='ignore'):
+            prefix = np.concatenate(([np.uint64(0)], np.cumsum(codes * inverse_powers)))
+            hashes = (prefix[ends] - prefix[starts]) * powers[ends - 1]
+
+        text_starts = np.cumsum([0] + [len(text) + 1 for text in texts_lower[:-1]])
+        docs = np.searchsorted(text_starts, starts, side='right') - 1
+        return hashes, docs
+
+    def counts(self, texts_lower):
+        """
+        Count the hashed n-grams of a batch of texts.
+
+        Args:
+            texts_lower (list): Lowercased texts
+
+        Returns:
+            tuple: (rows, cols, counts) arrays, sorted by row then column,
+                   giving how often n-gram bucket cols[i] occurs in text rows[i]
+        """
+        words, docs = self.word_hashes(texts_lower)
+        grams = [words]
+        gram_docs = [docs]
+        chained = words
+        with np.errstate(over='ignore'):
+            for n in range(2, self.ngram_max + 1):
+                # n-grams must not span two texts
+                count = len(words) - n + 1
+                if count <= 0:
+                    break
+                chained = chained[:count] * np.uint64(NGRAM_PRIME) + words[n - 1:]
+                same_doc = docs[:count] == docs[n - 1:]
+                grams.append(chained[same_doc])
+                gram_docs.append(docs[:count][same_doc])
+
+            buckets = (_mix(np.concatenate(grams)) >> np.uint64(64 - self.hash_bits)).astype(np.int64)
+        keys, counts = np.unique(np.concatenate(gram_docs) * self.size + buckets, return_counts=True)
+        return keys // self.size, keys % self.size, counts
+
+
+def tfidf_values(rows, cols, counts, idf, n_rows):
+    """
+    Weight n-gram counts by TF-IDF and L2-normalize each row.
+
+    Args:
+        rows, cols, counts: Output of HashedNgrams.counts
+        idf (ndarray): Inverse document frequency per bucket
+        n_rows (int): Number of texts in the batch
+
+    Returns:
+        ndarray: Feature value for each (row, col) pair
+    """
+    values = (1.0 + np.log(counts)) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=n_rows))
+    norms[norms == 0] = 1.0
+    return values / norms[rows]
+
+
+def sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35, 35)))
+
+
+class LinearModel:
+    """
+    Logistic regression over hashed n-gram TF-IDF features.
+
+    Scoring a batch is one sparse matrix-vector product: the weight of
+    every (text, bucket) feature is gathered and summed per text.
+    """
+
+    def __init__(self, path, weight=DEFAULT_MODEL_WEIGHT):
+        """
+        Args:
+            path (str): Model directory written by save_model
+            weight (float): Share of the model in the blended score (0 to 1)
+
+        Raises:
+            ModelError: If the model files are missing or invalid
+        """
+        _require_numpy()
+        try:
+            with open(os.path.join(path, MODEL_META_FILE), encoding='utf-8') as f:
+                meta = json.load(f)
+            arrays = np.load(os.path.join(path, MODEL_ARRAYS_FILE), mmap_mode='r')
+        except (OSError, ValueError) as e:
+            raise ModelError(f'Cannot load model {path}: {e}')
+        if meta.get('format') != MODEL_FORMAT:
+            raise ModelError(f"Unsupported model format {meta.get('format')!r} in {path}")
+        if arrays.shape != (2, 1 << meta['hash_bits']):
+            raise ModelError(f'Model arrays in {path} do not match hash_bits {meta["hash_bits"]}')
+        if not 0 <= weight <= 1:
+            raise ModelError('MODEL_WEIGHT must be between 0 and 1')
+
+        self.path = path
+        self.meta = meta
+        self.version = meta['version']
+        self.weight = weight
+        self.featurizer = HashedNgrams(meta['hash_bits'], meta['ngram_max'])
+        self.idf = np.asarray(arrays[0])  # Plain views of the mapped file
+        self.coefficients = np.asarray(arrays[1])
+        self.bias = meta['bias']
+
+    @property
+    def key(self):
+        """Identifies the model and blend weight in cache keys."""
+        return f'model-{self.version}-{self.weight:g}'
+
+    def fake_probabilities(self, texts_lower):
+        """
+        Score a batch of texts.
+
+        Args:
+            texts_lower (list): Lowercased texts
+
+        Returns:
+            list: Probability that each text is fake, in input order
+        """
+        if not texts_lower:
+            return []
+        rows, cols, counts = self.featurizer.counts(texts_lower)
+        values = tfidf_values(rows, cols, counts, self.idf, len(texts_lower))
+        logits = np.bincount(rows, weights=values * self.coefficients[cols], minlength=len(texts_lower))
+        return sigmoid(logits + self.bias).tolist()
+
+    def describe(self):
+        """Summary of the model for the health endpoint."""
+        return {'version': self.version, 'weight': self.weight, 'trained_on': self.meta.get('documents')}
+
+
+def blend_score(heuristic_score, fake_probability, weight):
+    """
+    Blend the heuristic trust score with the model's verdict.
+
+    Args:
+        heuristic_score (int): Trust score from the penalty rules (0-100)
+        fake_probability (float): Model probability that the text is fake
+        weight (float): Share of the model (0 keeps the heuristic score)
+
+    Returns:
+        int: Blended trust score (0-100)
+    """
+    blended = (1 - weight) * heuristic_score + weight * 100 * (1 - fake_probability)
+    return max(0, min(100, round(blended)))
+
+
+def save_model(path, idf, coefficients, bias, hash_bits, ngram_max, **info):
+    """
+    Write a model directory.
+
+    Args:
+        path (str): Directory to create or overwrite
+        idf (ndarray): Inverse document frequency per bucket
+        coefficients (ndarray): Logistic regression weight per bucket
+        bias (float): Logistic regression intercept
+        hash_bits (int): log2 of the number of buckets
+        ngram_max (int): Longest word n-gram
+        **info: Extra metadata (documents, holdout metrics...)
+
+    Returns:
+        dict: The model metadata
+    """
+    os.makedirs(path, exist_ok=True)
+    arrays_path = os.path.join(path, MODEL_ARRAYS_FILE)
+    np.save(arrays_path, np.stack([idf, coefficients]).astype(np.float32))
+    with open(arrays_path, 'rb') as f:
+        digest = hashlib.sha256(f.read())
+    digest.update(repr(float(bias)).encode('ascii'))
+    meta = {
+        'format': MODEL_FORMAT,
+        'version': digest.hexdigest()[:12],
+        'hash_bits': hash_bits,
+        'ngram_max': ngram_max,
+        'bias': float(bias),
+        **info
+    }
+    with open(os.path.join(path, MODEL_META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Get the process-wide model, loading it on first use.
+
+    MODEL_PATH: Model directory written by train_model.py (unset to
+                disable the model stage)
+    MODEL_WEIGHT: Share of the model in the blended trust score, from
+                  0 to 1 (default 0.5)
+
+    Returns:
+        LinearModel or None: The model, or None when disabled
+
+    Raises:
+        ModelError: If MODEL_PATH is set but the model cannot be loaded
+    """
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                path = os.environ.get('MODEL_PATH')
+                if path:
+                    weight = float(os.environ.get('MODEL_WEIGHT', DEFAULT_MODEL_WEIGHT))
+                    _model = LinearModel(path, weight=weight)
+                    logger.info('Model %s loaded from %s (weight %g)', _model.version, path, weight)
+                _model_loaded = True
+    return _model
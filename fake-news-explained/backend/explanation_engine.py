@@ -3,133 +3,252 @@ Explanation Engine for generating human-readable explanations
 for why text may be flagged as potential fake news.
 """
 
-import re
-from utils import split_into_sentences
-
-
-# Mapping of issue types to human-readable explanations
-ISSUE_EXPLANATIONS = {
-    'clickbait': "Contains clickbait phrase designed to manipulate readers",
-    'emotional_language': "Uses emotionally charged language to provoke reactions",
-    'extreme_claims': "Makes extreme or absolute claims without evidence",
-    'urgency': "Creates artificial urgency to pressure readers",
-    'missing_sources': "Uses vague source attribution instead of credible references",
-    'excessive_caps': "Excessive use of capital letters for emphasis",
-    'excessive_exclamations': "Overuse of exclamation marks for dramatic effect"
-}
-
-
-# Patterns for sentence-level analysis
-SENTENCE_PATTERNS = {
-    'medical_claim': {
-        'pattern': r'(cure[sd]?|heal[sd]?|treat[sd]?|remedy|miracle).*(disease|cancer|illness|condition|ailment)',
-        'reason': "Contains unverified medical claim"
-    },
-    'conspiracy': {
-        'pattern': r'(they|government|media|elites?)\s+(don\'t want|hiding|covering up|won\'t tell)',
-        'reason': "Uses conspiracy theory language"
-    },
-    'absolute_claim': {
-        'pattern': r'(100%|always|never|everyone|nobody|all|none)\s+\w+',
-        'reason': "Makes absolute claims that are rarely true"
-    },
-    'fear_mongering': {
-        'pattern': r'(warning|danger|threat|deadly|fatal|catastrophic|devastating)',
-        'reason': "Uses fear-inducing language"
-    },
-    'unverified_stat': {
-        'pattern': r'\d+%\s+of\s+(people|doctors|scientists|experts)',
-        'reason': "Cites statistics without verifiable source"
-    },
-    'call_to_action': {
-        'pattern': r'(share|spread|forward|tell everyone|wake up)',
-        'reason': "Urges sharing without fact-checking"
-    },
-    'sensational': {
-        'pattern': r'(shocking|unbelievable|you won\'t believe|mind.?blowing)',
-        'reason': "Uses sensationalist language"
-    }
-}
+from utils import as_context
+from ruleset import get_ruleset
+
+
+# Maximum number of explanations returned per text
+MAX_EXPLANATIONS = 5
 
 
-def analyze_sentence(sentence):
+def classify_sentence(sentence, ruleset=None):
     """
-    Analyze a single sentence for fake news indicators.
+    Find the first indicator a sentence is flagged for.
     
     Args:
         sentence (str): The sentence to analyze
+        ruleset (Ruleset): Rules to apply (defaults to the active ruleset)
         
     Returns:
-        dict or None: Analysis result with sentence and reason, or None if clean
+        tuple or None: (type, reason), or None if clean
     """
-    sentence_lower = sentence.lower()
-    
-    for pattern_name, pattern_data in SENTENCE_PATTERNS.items():
-        if re.search(pattern_data['pattern'], sentence_lower, re.IGNORECASE):
-            return {
-                'sentence': sentence,
-                'reason': pattern_data['reason'],
-                'type': pattern_name
-            }
+    # Patterns are tried in priority order; the first match wins
+    for pattern_name, compiled, reason in (ruleset or get_ruleset()).sentence_patterns:
+        if compiled.search(sentence):
+            return pattern_name, reason
     
+    return _classify_counts(sentence)
+
+
+def _classify_counts(sentence):
+    """Flag a sentence for its exclamation marks or all-caps words, if excessive."""
     # Check for excessive exclamation marks in this sentence
     if sentence.count('!') >= 2:
-        return {
-            'sentence': sentence,
-            'reason': "Multiple exclamation marks suggest sensationalism",
-            'type': 'punctuation'
-        }
+        return 'punctuation', "Multiple exclamation marks suggest sensationalism"
     
     # Check for all-caps words
-    words = sentence.split()
-    caps_words = [w for w in words if w.isupper() and len(w) > 2]
-    if len(caps_words) >= 2:
-        return {
-            'sentence': sentence,
-            'reason': "Excessive capitalization used for emphasis",
-            'type': 'caps'
-        }
+    caps_words = sum(1 for w in sentence.split() if w.isupper() and len(w) > 2)
+    if caps_words >= 2:
+        return 'caps', "Excessive capitalization used for emphasis"
     
     return None
 
 
-def generate_explanations(text, issues):
+def analyze_sentence(sentence, ruleset=None):
+    """
+    Analyze a single sentence for fake news indicators.
+    
+    Args:
+        sentence (str): The sentence to analyze
+        ruleset (Ruleset): Rules to apply (defaults to the active ruleset)
+        
+    Returns:
+        dict or None: Analysis result with sentence and reason, or None if clean
+    """
+    flagged = classify_sentence(sentence, ruleset)
+    if flagged is None:
+        return None
+    return {
+        'sentence': sentence,
+        'reason': flagged[1],
+        'type': flagged[0]
+    }
+
+
+def may_flag_sentences(text, ruleset, hits, caps_count, exclaim_count):
+    """
+    Pre-screen a scored text before the sentence pass.
+    
+    Without indicator hits a sentence can only be flagged for two or more
+    exclamation marks or all-caps words of its own, or for a sentence
+    pattern the scan does not cover. A text that rules all of these out
+    has nothing for explain_sentences to find.
+    
+    Args:
+        text (str or AnalysisContext): The original text
+        ruleset (Ruleset): Rules the text was scored with
+        hits (MatchState): Hits of the ruleset's matcher on the lowercased text
+        caps_count (int): All-caps words in the text
+        exclaim_count (int): Exclamation marks in the text
+        
+    Returns:
+        bool: False if no sentence can be flagged
+    """
+    if hits or caps_count > 1 or exclaim_count > 1 or not ruleset.unanchored_searchable_in_text:
+        return True
+    context = as_context(text)
+    if len(context.lowercase) != len(context.text):
+        return True
+    return any(ruleset.sentence_patterns[priority][1].search(context.text)
+               for priority in ruleset.unanchored_sentence_patterns)
+
+
+def explain_sentences(text, ruleset=None, hits=None, offset=0, limit=MAX_EXPLANATIONS):
+    """
+    Explain the flagged sentences of a text, in order.
+    
+    Uses the hits of the scoring pass instead of searching every sentence
+    again: the hits of each sentence are found by a binary search over the
+    hit offsets, and only sentence patterns with a candidate hit in the
+    sentence are checked there. Sentences after the last explanation
+    needed are never looked at.
+    
+    Args:
+        text (str or AnalysisContext): The original text
+        ruleset (Ruleset): Rules to apply (defaults to the active ruleset)
+        hits (MatchState): Hits of the ruleset's matcher on the lowercased
+                           text (scanned here if not given)
+        offset (int): Position of the text within the scanned text of hits
+        limit (int): Maximum number of explanations
+        
+    Returns:
+        list: Explanation dictionaries with sentence, reason and highlights
+              ([start, end] ranges within the sentence)
+    """
+    explanations = []
+    if limit <= 0:
+        return explanations
+    context = as_context(text)
+    ruleset = ruleset or get_ruleset()
+    matcher = ruleset.matcher
+    
+    if len(context.lowercase) != len(context.text):
+        # Lowercasing changed offsets (rare Unicode cases): search sentences directly
+        for sentence in context.sentences:
+            flagged = classify_sentence(sentence, ruleset)
+            if flagged:
+                explanations.append({'sentence': sentence, 'reason': flagged[1], 'highlights': []})
+                if len(explanations) >= limit:
+                    break
+        return explanations
+    
+    if hits is None:
+        hits = matcher.scan_state(context.lowercase)
+        offset = 0
+    
+    # Analyze sentences in order, stopping once the explanation cap is filled
+    for start, end in context.sentence_spans:
+        sentence = context.text[start:end]
+        sentence_hits = matcher.hits_between(hits, offset + start, offset + end)
+        reason, highlights = _explain_hits(sentence, offset + start, sentence_hits, ruleset)
+        if reason is None:
+            flagged = _classify_counts(sentence)
+            if flagged is None:
+                continue
+            reason = flagged[1]
+        explanations.append({
+            'sentence': sentence,
+            'reason': reason,
+            'highlights': highlights
+        })
+        if len(explanations) >= limit:
+            break
+    
+    return explanations
+
+
+def _explain_hits(sentence, sentence_start, hits, ruleset):
+    """
+    Verify the candidate sentence patterns of one sentence.
+    
+    Patterns without a literal prefix have no candidates and are searched.
+    
+    Returns:
+        tuple: (reason of the highest-priority matching pattern or None,
+                merged highlight ranges within the sentence)
+    """
+    best = None
+    ranges = []
+    for priority in ruleset.unanchored_sentence_patterns:
+        match = ruleset.sentence_patterns[priority][1].search(sentence)
+        if match is not None:
+            ranges.append(match.span())
+            if best is None or priority < best:
+                best = priority
+    for category, start, end in hits:
+        start -= sentence_start
+        priority = ruleset.sentence_categories.get(category)
+        if priority is None:
+            # Indicator hit: highlight it as is
+            ranges.append((start, min(end - sentence_start, len(sentence))))
+            continue
+        match = ruleset.sentence_patterns[priority][1].match(sentence, start)
+        if match is None:
+            continue
+        ranges.append(match.span())
+        if best is None or priority < best:
+            best = priority
+    
+    highlights = []
+    for start, end in sorted(ranges):
+        if end <= start:
+            continue
+        if highlights and start <= highlights[-1][1]:
+            highlights[-1][1] = max(highlights[-1][1], end)
+        else:
+            highlights.append([start, end])
+    return (ruleset.sentence_patterns[best][2] if best is not None else None), highlights
+
+
+def generate_explanations(text, issues, ruleset=None):
     """
     Generate sentence-level explanations for flagged content.
     
     Args:
-        text (str): The original text
+        text (str or AnalysisContext): The original text
         issues (list): List of detected issues from NLP analysis
+        ruleset (Ruleset): Rules to apply (defaults to the active ruleset)
         
     Returns:
         list: List of explanation dictionaries with sentence and reason
     """
-    explanations = []
-    sentences = split_into_sentences(text)
-    
-    # Analyze each sentence
-    for sentence in sentences:
-        result = analyze_sentence(sentence)
-        if result:
-            explanations.append({
-                'sentence': result['sentence'],
-                'reason': result['reason']
-            })
+    ruleset = ruleset or get_ruleset()
+    explanations = explain_sentences(text, ruleset)
     
     # If we have issues but no sentence-level explanations, create general ones
     if issues and not explanations:
-        for issue in issues:
-            issue_type = issue.get('type', '')
-            if issue_type in ISSUE_EXPLANATIONS:
-                items = issue.get('items', [])
-                if items:
-                    explanations.append({
-                        'sentence': f"Detected: {', '.join(items[:3])}",
-                        'reason': ISSUE_EXPLANATIONS[issue_type]
-                    })
+        explanations = explain_issues(issues, ruleset)
     
     # Limit to top 5 most relevant explanations
-    return explanations[:5]
+    return explanations[:MAX_EXPLANATIONS]
+
+
+def explain_issues(issues, ruleset=None):
+    """
+    Create general explanations from detected issues.
+    
+    Used when no individual sentence was flagged.
+    
+    Args:
+        issues (list): List of detected issues from NLP analysis
+        ruleset (Ruleset): Rules to apply (defaults to the active ruleset)
+        
+    Returns:
+        list: List of explanation dictionaries with sentence and reason
+    """
+    issue_explanations = (ruleset or get_ruleset()).issue_explanations
+    explanations = []
+    for issue in issues:
+        issue_type = issue.get('type', '')
+        if issue_type in issue_explanations:
+            items = issue.get('items', [])
+            if items:
+                explanations.append({
+                    'sentence': f"Detected: {', '.join(items[:3])}",
+                    'reason': issue_explanations[issue_type],
+                    'highlights': []
+                })
+    return explanations
 
 
 def create_summary(trust_score, label, explanations):
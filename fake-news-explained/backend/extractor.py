@@ -0,0 +1,168 @@
+"""
+Main-text extraction from HTML pages.
+One pass of the standard library's HTMLParser collects the text blocks
+of a page (paragraphs, headings, list items...) outside of scripts,
+navigation, headers, footers and forms. Each block credits its length
+to the element holding it, and half of it to that element's parent; the
+element with the most credit holds the article, and only its blocks are
+kept. Blocks made mostly of link text (menus, related stories) neither
+count nor are kept.
+"""
+
+from html.parser import HTMLParser
+
+
+# Elements whose content is never article text
+SKIPPED_TAGS = frozenset({
+    'script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object',
+    'nav', 'header', 'footer', 'aside', 'form', 'button', 'select', 'textarea', 'figcaption'
+})
+
+# Elements that end the text block before them
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'blockquote', 'body', 'br', 'dd', 'div', 'dl', 'dt', 'figure', 'h1', 'h2',
+    'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'main', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th',
+    'tr', 'ul'
+})
+
+# Block elements that hold text rather than other blocks
+TEXT_TAGS = frozenset({'blockquote', 'dd', 'dt', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'p', 'pre', 'td', 'th'})
+
+# Elements without content (never closed)
+VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source',
+    'track', 'wbr'
+})
+
+# Extra credit for elements marked up as the article
+ARTICLE_BONUS = {'article': 1.5, 'main': 1.25}
+
+# Blocks shorter than this (in characters) do not count towards their element
+MIN_BLOCK_CHARS = 25
+
+# Blocks with a larger share of link text are dropped
+MAX_LINK_SHARE = 0.5
+
+
+class _ArticleParser(HTMLParser):
+    """Collects the text blocks of a page with the elements holding them."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []         # (tag, element id) of the open elements
+        self.parents = {}       # element id -> parent element id
+        self.tags = {}          # element id -> tag
+        self.blocks = []        # (text, link characters, ids of the open elements)
+        self.title = None
+        self.meta_title = None
+        self.first_heading = None
+        self._parts = []
+        self._link_chars = 0
+        self._skipping = 0
+        self._links = 0
+        self._in_title = False
+        self._title_parts = []
+        self._next_id = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'meta':
+            attributes = dict(attrs)
+            if attributes.get('property') == 'og:title' and attributes.get('content'):
+                self.meta_title = attributes['content'].strip()
+            return
+        if tag == 'title':
+            self._in_title = True
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+            # A new block implicitly closes an open paragraph
+            if self.stack and self.stack[-1][0] == 'p':
+                self.stack.pop()
+        if tag in VOID_TAGS:
+            return
+        if tag in SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag == 'a':
+            self._links += 1
+        self._next_id += 1
+        self.parents[self._next_id] = self.stack[-1][1] if self.stack else None
+        self.tags[self._next_id] = tag
+        self.stack.append((tag, self._next_id))
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+            self.title = ' '.join(''.join(self._title_parts).split()) or None
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in VOID_TAGS or not any(open_tag == tag for open_tag, _ in self.stack):
+            return
+        while self.stack:
+            open_tag, _ = self.stack.pop()
+            if open_tag in SKIPPED_TAGS:
+                self._skipping -= 1
+            elif open_tag == 'a':
+                self._links -= 1
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+        elif not self._skipping:
+            self._parts.append(data)
+            if self._links:
+                self._link_chars += len(data.strip())
+
+    def _flush(self):
+        text = ' '.join(''.join(self._parts).split())
+        if text:
+            self.blocks.append((text, self._link_chars, tuple(element for _, element in self.stack)))
+            if self.first_heading is None and self.stack and self.stack[-1][0] == 'h1':
+                self.first_heading = text
+        self._parts = []
+        self._link_chars = 0
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_article(html):
+    """
+    Extract the title and main text of an HTML page.
+
+    Args:
+        html (str): Decoded page
+
+    Returns:
+        tuple: (title or None, article text with one block per line)
+    """
+    parser = _ArticleParser()
+    parser.feed(html)
+    parser.close()
+
+    blocks = [(text, elements) for text, link_chars, elements in parser.blocks
+              if link_chars <= MAX_LINK_SHARE * len(text)]
+
+    # Credit each block to the element holding it and half to that element's parent
+    credit = {}
+    for text, elements in blocks:
+        if len(text) < MIN_BLOCK_CHARS:
+            continue
+        holder = next((element for element in reversed(elements)
+                       if parser.tags[element] not in TEXT_TAGS), None)
+        if holder is None:
+            continue
+        credit[holder] = credit.get(holder, 0) + len(text)
+        parent = parser.parents[holder]
+        if parent is not None:
+            credit[parent] = credit.get(parent, 0) + len(text) / 2
+
+    if credit:
+        best = max(credit, key=lambda element: credit[element] * ARTICLE_BONUS.get(parser.tags[element], 1))
+        blocks = [(text, elements) for text, elements in blocks if best in elements]
+
+    title = parser.meta_title or parser.title or parser.first_heading
+    return title, '\n'.join(text for text, _ in blocks)
@@ -0,0 +1,515 @@
+"""
+Pooled, concurrent fetching of article pages for /analyze/url.
+Pages are fetched by a small asyncio HTTP/1.1 client on one event loop
+thread per process, so a batch of URLs is downloaded concurrently while
+the request thread waits. Connections are kept alive and reused per
+host, with limits on connections per host and in total, and every fetch
+is bounded by a timeout and a size cap. The main text of each page is
+extracted once; pages with an ETag are cached by URL and revalidated
+with If-None-Match, so an unchanged page is neither downloaded nor
+extracted again.
+"""
+
+import asyncio
+import contextlib
+import ipaddress
+import os
+import re
+import socket
+import ssl
+import threading
+import time
+import zlib
+from urllib.parse import quote, urljoin, urlsplit
+
+from cache import MemoryCacheBackend
+from extractor import extract_article
+
+
+# Seconds allowed for fetching one page, redirects included
+DEFAULT_FETCH_TIMEOUT = 10.0
+
+# Seconds allowed for opening a connection
+DEFAULT_CONNECT_TIMEOUT = 5.0
+
+# Largest page body accepted, in bytes (after decompression)
+DEFAULT_MAX_PAGE_BYTES = 2 * 1024 * 1024
+
+# Open connections allowed per host and in total
+DEFAULT_CONNECTIONS_PER_HOST = 4
+DEFAULT_MAX_CONNECTIONS = 64
+
+# Pages kept in the ETag cache
+DEFAULT_PAGE_CACHE_SIZE = 512
+
+# Seconds an unused keep-alive connection is kept
+IDLE_TIMEOUT = 30.0
+
+MAX_REDIRECTS = 5
+MAX_URL_LENGTH = 2048
+
+# Longest status or header line, and all headers together, in bytes
+MAX_HEADER_BYTES = 65536
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+TEXT_TYPES = HTML_TYPES + ('text/plain',)
+
+USER_AGENT = 'FakeNewsExplained/1.0 (article analysis)'
+
+# Characters left as they are in request targets (others are percent-encoded)
+URL_SAFE = "/?&=%:@!$'()*+,;~-._"
+
+_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+class FetchError(Exception):
+    """Raised when a page cannot be fetched or decoded."""
+
+
+def parse_url(value):
+    """
+    Check a URL given to /analyze/url.
+
+    Args:
+        value: URL from the request
+
+    Returns:
+        str: The URL, without surrounding whitespace
+
+    Raises:
+        ValueError: If the value is not an http(s) URL
+    """
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError('Each URL must be a non-empty string')
+    url = value.strip()
+    if len(url) > MAX_URL_LENGTH:
+        raise ValueError(f'URLs may be at most {MAX_URL_LENGTH} characters long')
+    parts = urlsplit(url)
+    try:
+        parts.port
+    except ValueError:
+        raise ValueError(f'Invalid port in URL: {url}')
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f'Not an http or https URL: {url}')
+    return url
+
+
+class _Connection:
+    """One HTTP connection, reusable once its last response was read in full."""
+
+    __slots__ = ('reader', 'writer', 'reused', 'reusable', 'idle_since')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+        self.reusable = False
+        self.idle_since = None
+
+    def close(self):
+        self.writer.close()
+
+
+class ConnectionPool:
+    """
+    Keep-alive connections grouped by (scheme, host, port).
+
+    A fetch holds one of the host's connections_per_host slots, and one
+    of max_connections slots overall, while it uses a connection; when it
+    is done the connection waits for the next fetch to the same host.
+    Only used from the fetcher's event loop thread.
+    """
+
+    def __init__(self, connections_per_host, max_connections, connect_timeout, allow_private):
+        self.connections_per_host = connections_per_host
+        self.connect_timeout = connect_timeout
+        self.allow_private = allow_private
+        self._slots = asyncio.Semaphore(max_connections)
+        self._host_slots = {}   # key -> (semaphore, fetches holding or waiting for it)
+        self._idle = {}         # key -> idle connections, most recently used last
+        self._ssl = ssl.create_default_context()
+
+    @contextlib.asynccontextmanager
+    async def connection(self, scheme, host, port, fresh=False):
+        """
+        Borrow a connection to a host.
+
+        Args:
+            scheme (str): "http" or "https"
+            host (str): Host name
+            port (int): Port
+            fresh (bool): Open a new connection instead of reusing an idle one
+
+        Yields:
+            _Connection: The connection; set its reusable flag once the
+            response was read in full to give it back to the pool
+        """
+        key = (scheme, host, port)
+        semaphore, users = self._host_slots.get(key, (None, 0))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.connections_per_host)
+        self._host_slots[key] = (semaphore, users + 1)
+        connection = None
+        try:
+            async with semaphore, self._slots:
+                connection = None if fresh else self._take_idle(key)
+                if connection is None:
+                    connection = await self._open(scheme, host, port)
+                connection.reusable = False
+                yield connection
+                if connection.reusable:
+                    connection.reused = True
+                    connection.idle_since = time.monotonic()
+                    self._idle.setdefault(key, []).append(connection)
+                    connection = None
+        finally:
+            if connection is not None:
+                connection.close()
+            semaphore, users = self._host_slots[key]
+            if users > 1:
+                self._host_slots[key] = (semaphore, users - 1)
+            else:
+                del self._host_slots[key]
+
+    def _take_idle(self, key):
+        idle = self._idle.get(key)
+        while idle:
+            connection = idle.pop()
+            if time.monotonic() - connection.idle_since < IDLE_TIMEOUT and not connection.reader.at_eof():
+                return connection
+            connection.close()
+        self._idle.pop(key, None)
+        return None
+
+    def prune(self):
+        """Close connections that have been idle for too long."""
+        now = time.monotonic()
+        for key in list(self._idle):
+            keep = []
+            for connection in self._idle[key]:
+                if now - connection.idle_since < IDLE_TIMEOUT:
+                    keep.append(connection)
+                else:
+                    connection.close()
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+
+    async def _open(self, scheme, host, port):
+        loop = asyncio.get_running_loop()
+        try:
+            addresses = await asyncio.wait_for(
+                loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), self.connect_timeout)
+        except socket.gaierror as e:
+            raise FetchError(f'Cannot resolve {host}: {e}')
+        if not self.allow_private:
+            # Do not let callers reach the server's own network
+            for address in addresses:
+                if not ipaddress.ip_address(address[4][0].split('%')[0]).is_global:
+                    raise FetchError(f'{host} resolves to a non-public address')
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(
+            addresses[0][4][0], port,
+            ssl=self._ssl if scheme == 'https' else None,
+            server_hostname=host if scheme == 'https' else None,
+            limit=MAX_HEADER_BYTES
+        ), self.connect_timeout)
+        return _Connection(reader, writer)
+
+
+async def _read_headers(reader):
+    """Read a status line and headers."""
+    while True:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError('Connection closed before a response')
+        parts = status_line.decode('latin-1').split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/') or not parts[1].isdigit():
+            raise FetchError(f'Malformed HTTP status line: {status_line[:100]!r}')
+        headers = {}
+        size = len(status_line)
+        while True:
+            line = await reader.readline()
+            size += len(line)
+            if size > MAX_HEADER_BYTES:
+                raise FetchError('Response headers are too large')
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name = name.strip().lower()
+            headers[name] = f'{headers[name]}, {value.strip()}' if name in headers else value.strip()
+        status = int(parts[1])
+        if status >= 200:
+            return parts[0], status, headers
+        # 1xx interim responses are followed by the real one
+
+
+async def _read_body(reader, status, headers, max_bytes):
+    """
+    Read a response body.
+
+    Returns:
+        tuple: (body bytes, whether the connection can be reused)
+    """
+    def too_large():
+        return FetchError(f'Page is larger than {max_bytes} bytes')
+
+    if status in (204, 304):
+        return b'', True
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        chunks = []
+        size = 0
+        while True:
+            line = await reader.readline()
+            try:
+                length = int(line.split(b';')[0].strip(), 16)
+            except ValueError:
+                raise FetchError('Malformed chunked response')
+            if length == 0:
+                # Skip trailers up to the final empty line
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks), True
+            size += length
+            if size > max_bytes:
+                raise too_large()
+            chunks.append(await reader.readexactly(length))
+            await reader.readline()
+
+    if 'content-length' in headers:
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise FetchError('Malformed Content-Length')
+        if length > max_bytes:
+            raise too_large()
+        return await reader.readexactly(length), True
+
+    # Body delimited by the end of the connection
+    body = await reader.read(max_bytes + 1)
+    while len(body) <= max_bytes:
+        more = await reader.read(max_bytes + 1 - len(body))
+        if not more:
+            break
+        body += more
+    if len(body) > max_bytes:
+        raise too_large()
+    return body, False
+
+
+def _decompress(body, encoding, max_bytes):
+    if encoding in ('', 'identity'):
+        return body
+    if encoding not in ('gzip', 'x-gzip', 'deflate'):
+        raise FetchError(f'Unsupported Content-Encoding {encoding!r}')
+    # Accepts both gzip and zlib headers; some servers send "deflate" as a
+    # raw stream without the zlib header
+    formats = [32 + zlib.MAX_WBITS] + ([-zlib.MAX_WBITS] if encoding == 'deflate' else [])
+    for wbits in formats:
+        decompressor = zlib.decompressobj(wbits)
+        try:
+            data = decompressor.decompress(body, max_bytes + 1)
+            break
+        except zlib.error as e:
+            error = e
+    else:
+        raise FetchError(f'Cannot decompress page: {error}')
+    if len(data) > max_bytes or decompressor.unconsumed_tail:
+        raise FetchError(f'Page is larger than {max_bytes} bytes')
+    return data
+
+
+def _decode(body, content_type):
+    """Decode a page with the charset of its Content-Type or meta tag."""
+    charset = None
+    for parameter in content_type.split(';')[1:]:
+        name, _, value = parameter.partition('=')
+        if name.strip().lower() == 'charset':
+            charset = value.strip().strip('"\'')
+    if charset is None:
+        match = _CHARSET.search(body[:4096])
+        charset = match.group(1).decode('ascii') if match else 'utf-8'
+    try:
+        return body.decode(charset, errors='replace')
+    except LookupError:
+        return body.decode('utf-8', errors='replace')
+
+
+class PageFetcher:
+    """
+    Fetches article pages concurrently and extracts their main text.
+
+    The event loop thread starts on first use, and again in a forked
+    worker, so the fetcher can be created before gunicorn forks.
+    """
+
+    def __init__(self, timeout=DEFAULT_FETCH_TIMEOUT, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 max_page_bytes=DEFAULT_MAX_PAGE_BYTES, connections_per_host=DEFAULT_CONNECTIONS_PER_HOST,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, cache_size=DEFAULT_PAGE_CACHE_SIZE,
+                 allow_private=False):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_page_bytes = max_page_bytes
+        self.connections_per_host = connections_per_host
+        self.max_connections = max_connections
+        self.allow_private = allow_private
+        self.cache = MemoryCacheBackend(max_entries=cache_size) if cache_size else None
+        self._loop = None
+        self._pool = None
+        self._started_pid = None
+        self._lock = threading.Lock()
+
+    def fetch_all(self, urls):
+        """
+        Fetch pages concurrently, waiting for all of them.
+
+        Args:
+            urls (list): URLs checked with parse_url (repeats are fetched once)
+
+        Returns:
+            list: For each URL, in order, a page dict ('url' after
+                  redirects, 'title', 'text', 'not_modified') or the
+                  FetchError that prevented fetching it
+        """
+        unique = list(dict.fromkeys(urls))
+        future = asyncio.run_coroutine_threadsafe(self._fetch_all(unique), self._ensure_loop())
+        pages = dict(zip(unique, future.result()))
+        return [pages[url] for url in urls]
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._started_pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pool = None
+                threading.Thread(target=self._loop.run_forever, name='page-fetcher', daemon=True).start()
+                self._started_pid = os.getpid()
+            return self._loop
+
+    async def _fetch_all(self, urls):
+        if self._pool is None:
+            self._pool = ConnectionPool(self.connections_per_host, self.max_connections,
+                                        self.connect_timeout, self.allow_private)
+        self._pool.prune()
+        return await asyncio.gather(*(self._fetch_one(url) for url in urls))
+
+    async def _fetch_one(self, url):
+        try:
+            return await asyncio.wait_for(self._fetch(url), self.timeout)
+        except asyncio.TimeoutError:
+            return FetchError(f'Timed out after {self.timeout:g}s fetching {url}')
+        except FetchError as e:
+            return e
+        except (OSError, asyncio.IncompleteReadError, UnicodeError, ValueError) as e:
+            return FetchError(f'Cannot fetch {url}: {e or type(e).__name__}')
+
+    async def _fetch(self, url):
+        cached = self.cache.get(url) if self.cache is not None else None
+        current = url
+        for _ in range(MAX_REDIRECTS + 1):
+            headers = {}
+            if cached is not None and current == url:
+                headers['If-None-Match'] = cached['etag']
+            status, response_headers, body = await self._get(current, headers)
+
+            location = response_headers.get('location')
+            if status in REDIRECT_STATUSES and location:
+                current = urljoin(current, location)
+                if urlsplit(current).scheme not in ('http', 'https'):
+                    raise FetchError(f'{url} redirects to a non-HTTP URL')
+                continue
+            if status == 304 and cached is not None:
+                self.cache.set(url, cached)
+                return {'url': cached['url'], 'title': cached['title'], 'text': cached['text'],
+                        'not_modified': True}
+            if status != 200:
+                raise FetchError(f'{current} returned HTTP {status}')
+
+            content_type = response_headers.get('content-type', 'text/html')
+            media_type = content_type.split(';')[0].strip().lower()
+            if media_type not in TEXT_TYPES:
+                raise FetchError(f'{current} is not a web page or text ({media_type})')
+            body = _decompress(body, response_headers.get('content-encoding', '').strip().lower(),
+                               self.max_page_bytes)
+            page_text = _decode(body, content_type)
+            if media_type in HTML_TYPES:
+                # Parse off the loop thread, so other downloads keep going
+                loop = asyncio.get_running_loop()
+                title, text = await loop.run_in_executor(None, extract_article, page_text)
+            else:
+                title, text = None, page_text
+
+            page = {'url': current, 'title': title, 'text': text}
+            etag = response_headers.get('etag')
+            if etag and self.cache is not None:
+                self.cache.set(url, {**page, 'etag': etag})
+            return {**page, 'not_modified': False}
+        raise FetchError(f'{url} redirects more than {MAX_REDIRECTS} times')
+
+    async def _get(self, url, extra_headers):
+        """
+        Send one GET request, retrying once on a fresh connection if a
+        reused keep-alive connection turns out to be closed.
+
+        Returns:
+            tuple: (status, lowercased headers, raw body)
+        """
+        parts = urlsplit(url)
+        host = parts.hostname.encode('idna').decode('ascii')
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        host_header = f'[{host}]' if ':' in host else host
+        if parts.port is not None:
+            host_header += f':{parts.port}'
+        target = quote((parts.path or '/') + (f'?{parts.query}' if parts.query else ''), safe=URL_SAFE)
+        headers = {
+            'Host': host_header,
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,text/plain;q=0.9',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+            **extra_headers
+        }
+        request = f'GET {target} HTTP/1.1\r\n' + ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        request = (request + '\r\n').encode('latin-1', errors='strict')
+
+        for attempt in range(2):
+            async with self._pool.connection(parts.scheme, host, port, fresh=attempt > 0) as connection:
+                try:
+                    connection.writer.write(request)
+                    await connection.writer.drain()
+                    version, status, response_headers = await _read_headers(connection.reader)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    if connection.reused and attempt == 0:
+                        continue
+                    raise
+                body, complete = await _read_body(connection.reader, status, response_headers,
+                                                  self.max_page_bytes)
+                connection.reusable = (complete and version == 'HTTP/1.1'
+                                       and response_headers.get('connection', '').lower() != 'close')
+                return status, response_headers, body
+
+
+def create_fetcher_from_env():
+    """
+    Build the page fetcher configured by environment variables.
+
+    FETCH_TIMEOUT: Seconds allowed per page, redirects included (default 10)
+    FETCH_MAX_BYTES: Largest page accepted, in bytes (default 2 MiB)
+    FETCH_CONNECTIONS_PER_HOST: Open connections per host (default 4)
+    FETCH_MAX_CONNECTIONS: Open connections in total (default 64)
+    FETCH_CACHE_SIZE: Pages kept for ETag revalidation, 0 to disable (default 512)
+    FETCH_ALLOW_PRIVATE: 1 to allow URLs on private and loopback
+                         addresses (e.g. a local test server)
+
+    Returns:
+        PageFetcher: The fetcher
+    """
+    return PageFetcher(
+        timeout=float(os.environ.get('FETCH_TIMEOUT', DEFAULT_FETCH_TIMEOUT)),
+        max_page_bytes=int(os.environ.get('FETCH_MAX_BYTES', DEFAULT_MAX_PAGE_BYTES)),
+        connections_per_host=int(os.environ.get('FETCH_CONNECTIONS_PER_HOST', DEFAULT_CONNECTIONS_PER_HOST)),
+        max_connections=int(os.environ.get('FETCH_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS)),
+        cache_size=int(os.environ.get('FETCH_CACHE_SIZE', DEFAULT_PAGE_CACHE_SIZE)),
+        allow_private=os.environ.get('FETCH_ALLOW_PRIVATE') == '1'
+    )
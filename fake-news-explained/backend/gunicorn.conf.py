@@ -0,0 +1,112 @@
+"""
+Gunicorn settings for production serving.
+Gunicorn reads this file automatically when started from the backend
+directory:
+
+    gunicorn wsgi:app
+
+The app and its NLP state are loaded once in the master process, which
+then forks the workers, so they share those pages copy-on-write instead
+of each loading its own copy.
+"""
+
+import gc
+import os
+
+
+def _cpu_count():
+    """Number of cores this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+
+# Analysis is CPU-bound pure Python, so more processes than cores only add
+# context switches; one worker per core unless WEB_CONCURRENCY says otherwise
+workers = int(os.environ.get('WEB_CONCURRENCY', 0)) or _cpu_count()
+
+# Polling requests for a job land on any worker, so with several workers
+# jobs are shared through SQLite; an in-process queue would only know the
+# jobs of its own worker, so it is refused
+_memory_jobs_refused = False
+if workers > 1:
+    os.environ.setdefault('JOB_BACKEND', 'sqlite')
+    if os.environ['JOB_BACKEND'].lower() == 'memory':
+        os.environ['JOB_BACKEND'] = 'none'
+        _memory_jobs_refused = True
+
+# Live documents hold per-sentence state in the process that created
+# them, and an edit may land on any worker, so /documents needs a single
+# worker; with several, the frontend scores with /analyze instead
+_documents_refused = False
+if workers > 1 and os.environ.get('LIVE_DOCUMENTS', '1') != '0':
+    os.environ['LIVE_DOCUMENTS'] = '0'
+    _documents_refused = True
+
+# Every worker keeps its own near-duplicate index, and saving them all to
+# one snapshot would keep only the last worker's entries, so the index
+# stays in memory
+_snapshot_refused = False
+if workers > 1 and os.environ.get('NEAR_DUPLICATE_PATH'):
+    os.environ['NEAR_DUPLICATE_PATH'] = ''
+    _snapshot_refused = True
+
+# Threaded workers keep idle keep-alive connections in a poller instead of
+# tying up the worker; extra threads help with slow clients and uploads
+# to /analyze/stream, but not with CPU-bound analysis (the GIL)
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+keepalive = int(os.environ.get('KEEPALIVE', 5))
+
+# Recycle workers after a number of requests to bound memory growth; the
+# jitter keeps them from restarting all at once
+max_requests = int(os.environ.get('MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', 100))
+
+# Long documents on /analyze/stream can take a while
+timeout = int(os.environ.get('TIMEOUT', 60))
+graceful_timeout = 30
+
+preload_app = True
+
+# Heartbeat files on tmpfs, so a slow disk cannot make workers look stuck
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('ACCESS_LOG') or None
+errorlog = '-'
+
+
+def when_ready(server):
+    """Prepare the loaded app for forking (runs in the master)."""
+    # Move everything loaded so far out of the garbage collector's reach;
+    # otherwise a collection in a worker writes to those objects' headers
+    # and copies the shared pages
+    gc.collect()
+    gc.freeze()
+
+    if server.cfg.workers > 1 and not os.environ.get('METRICS_DIR'):
+        server.log.warning('METRICS_DIR is not set: /metrics will only report the worker that answers it')
+    if _memory_jobs_refused:
+        server.log.warning('JOB_BACKEND=memory does not work with several workers: /jobs is disabled')
+    if _documents_refused:
+        server.log.warning('Live documents need a single worker: /documents is disabled')
+    if _snapshot_refused:
+        server.log.warning('NEAR_DUPLICATE_PATH is ignored with several workers: the index is not saved')
+
+
+def worker_exit(server, worker):
+    """Write the exiting worker's final metrics (runs in the worker)."""
+    if os.environ.get('METRICS_DIR'):
+        from metrics import metrics
+        metrics.flush(force=True)
+
+
+def child_exit(server, worker):
+    """Fold an exited worker's metrics into the archive (runs in the master)."""
+    if os.environ.get('METRICS_DIR'):
+        from metrics import metrics
+        metrics.retire(worker.pid)
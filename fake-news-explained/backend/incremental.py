@@ -0,0 +1,531 @@
+"""
+Incremental re-analysis for live editors.
+A document is kept as a list of sentence units, each with its own
+analysis. An edit re-analyzes only the units it touches and updates the
+running totals, so the cost per keystroke does not grow with the text.
+"""
+
+import os
+import random
+import threading
+import time
+import uuid
+from array import array
+from collections import Counter, OrderedDict
+
+from utils import AnalysisContext, clean_text, split_sentence_spans
+from language import PREFIX_CHARS, UNDETERMINED, detect_language
+from ruleset import route_ruleset
+from nlp_logic import score_counts
+from explanation_engine import MAX_EXPLANATIONS, explain_sentences, explain_issues, create_summary
+from source_suggester import categorize_content, suggest_sources_for_categories, get_source_names
+
+
+# Sentence-ending punctuation a unit's cleaned text must end with
+SENTENCE_END = ('.', '!', '?')
+
+# Raw characters cleaned to identify the language; edits past them leave
+# the language as it is
+LANGUAGE_WINDOW = 4 * PREFIX_CHARS
+
+
+class RevisionMismatch(Exception):
+    """Raised when an edit is based on an outdated revision of a document."""
+
+
+class Unit:
+    """Analysis of one sentence-aligned piece of the document."""
+
+    __slots__ = ('gap', 'text', 'state', 'caps_count', 'exclaim_count', 'categories', 'explanations')
+
+    def __init__(self, text, ruleset, supported=True):
+        self.gap = 0    # Characters between the previous unit (or the document start) and this one
+        self.text = text
+
+        context = AnalysisContext(clean_text(text))
+        self.state = ruleset.matcher.new_state()
+        self.caps_count = sum(1 for w in context.words if w.isupper() and len(w) > 2)
+        self.exclaim_count = context.text.count('!')
+        if not supported:
+            # The lexicons, patterns and keywords are for another language
+            self.categories = set()
+            self.explanations = []
+            return
+
+        ruleset.matcher.feed(self.state, context.lowercase)
+        self.categories = categorize_content(context, ruleset)
+
+        self.explanations = explain_sentences(context, ruleset, hits=self.state)
+
+
+def split_units(text, start, end):
+    """
+    Split text[start:end] into sentence units.
+
+    Units follow the sentence boundaries of the raw text, except that a
+    sentence whose cleaned form loses its final punctuation (e.g. it ends
+    in a removed URL) is joined with the next one, as it would be when the
+    whole text is cleaned.
+
+    Returns:
+        list: (start, end) offsets into text
+    """
+    spans = []
+    pending = None  # Start of a sentence waiting to be joined with the next
+    for span_start, span_end in split_sentence_spans(text[start:end]):
+        if pending is not None:
+            span_start = pending
+        cleaned = clean_text(text[start + span_start:start + span_end])
+        if cleaned and not cleaned.endswith(SENTENCE_END):
+            pending = span_start
+            continue
+        pending = None
+        spans.append((start + span_start, start + span_end))
+    if pending is not None:
+        spans.append((start + pending, start + span_end))
+    return spans
+
+
+class _Node:
+    """Node of a UnitSequence, with totals over its subtree."""
+
+    __slots__ = ('unit', 'priority', 'left', 'right', 'count', 'length', 'explained')
+
+    def __init__(self, unit):
+        self.unit = unit
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.count = 1
+        self.length = unit.gap + len(unit.text)
+        self.explained = 1 if unit.explanations else 0
+
+
+def _update(node):
+    """Recompute a node's subtree totals from its children."""
+    node.count = 1
+    node.length = node.unit.gap + len(node.unit.text)
+    node.explained = 1 if node.unit.explanations else 0
+    for child in (node.left, node.right):
+        if child is not None:
+            node.count += child.count
+            node.length += child.length
+            node.explained += child.explained
+
+
+def _merge(left, right):
+    """Join two trees, all of left's units coming first."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _split(node, index):
+    """Split a tree into its first index units and the rest."""
+    if node is None:
+        return None, None
+    left_count = node.left.count if node.left is not None else 0
+    if index <= left_count:
+        left, node.left = _split(node.left, index)
+        _update(node)
+        return left, node
+    node.right, right = _split(node.right, index - left_count - 1)
+    _update(node)
+    return node, right
+
+
+def _walk(node):
+    """Yield the units of a tree in text order."""
+    stack = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node.unit
+        node = node.right
+
+
+class UnitSequence:
+    """
+    The units of a document in text order, as a randomized balanced tree.
+
+    Units only know their text and the gap before it; their offsets follow
+    from the lengths summed in the tree, so an edit finds and replaces the
+    units it touches in O(log n) without shifting the offsets of the units
+    after it.
+    """
+
+    def __init__(self, units=()):
+        self.root = None
+        for unit in units:
+            self.root = _merge(self.root, _Node(unit))
+
+    def __len__(self):
+        return self.root.count if self.root is not None else 0
+
+    def __iter__(self):
+        return _walk(self.root)
+
+    def first_ending_at_or_after(self, offset):
+        """
+        Find the first unit whose end offset is >= offset.
+
+        Returns:
+            tuple: (unit index, its start offset); (len(self), total length)
+            if every unit ends before offset
+        """
+        index = 0
+        base = 0
+        node = self.root
+        while node is not None:
+            left_count = node.left.count if node.left is not None else 0
+            left_length = node.left.length if node.left is not None else 0
+            if base + left_length >= offset and node.left is not None:
+                node = node.left
+                continue
+            start = base + left_length + node.unit.gap
+            if start + len(node.unit.text) >= offset:
+                return index + left_count, start
+            index += left_count + 1
+            base = start + len(node.unit.text)
+            node = node.right
+        return index, base
+
+    def count_starting_at_or_before(self, offset):
+        """Count the units whose start offset is <= offset."""
+        count = 0
+        base = 0
+        node = self.root
+        while node is not None:
+            left_count = node.left.count if node.left is not None else 0
+            left_length = node.left.length if node.left is not None else 0
+            start = base + left_length + node.unit.gap
+            if start > offset:
+                node = node.left
+                continue
+            count += left_count + 1
+            base = start + len(node.unit.text)
+            node = node.right
+        return count
+
+    def span(self, index):
+        """Get the start offset and unit at an index."""
+        base = 0
+        node = self.root
+        while node is not None:
+            left_count = node.left.count if node.left is not None else 0
+            left_length = node.left.length if node.left is not None else 0
+            if index < left_count:
+                node = node.left
+            elif index == left_count:
+                return base + left_length + node.unit.gap, node.unit
+            else:
+                index -= left_count + 1
+                base += left_length + node.unit.gap + len(node.unit.text)
+                node = node.right
+        raise IndexError(index)
+
+    def replace(self, first, last, units):
+        """
+        Replace the units at indexes first..last-1 with new units.
+
+        Returns:
+            list: The removed units
+        """
+        head, rest = _split(self.root, first)
+        middle, tail = _split(rest, last - first)
+        removed = list(_walk(middle))
+        added = None
+        for unit in units:
+            added = _merge(added, _Node(unit))
+        self.root = _merge(_merge(head, added), tail)
+        return removed
+
+    def explanations(self, limit):
+        """Collect the sentence explanations of the units in order, up to limit."""
+        explanations = []
+        stack = []
+        node = self.root if self.root is not None and self.root.explained else None
+        # In-order walk that skips subtrees without explanations
+        while (stack or node is not None) and len(explanations) < limit:
+            while node is not None:
+                stack.append(node)
+                node = node.left if node.left is not None and node.left.explained else None
+            node = stack.pop()
+            explanations.extend(node.unit.explanations)
+            node = node.right if node.right is not None and node.right.explained else None
+        return explanations[:limit]
+
+
+class IncrementalDocument:
+    """
+    A document under live editing with per-sentence analysis state.
+
+    Indicator phrases are matched within sentences; a rule that could only
+    match across a sentence boundary is not reported in this mode.
+    Otherwise result() equals the regular pipeline on the full text.
+    The language is identified from the start of the document; an edit
+    that changes it re-analyzes the document with the ruleset for the
+    new language. Running totals (hits per lexicon entry, capitals,
+    exclamation marks, categories) are updated with the units an edit
+    replaces, so neither an edit nor result() walks the whole document.
+    """
+
+    def __init__(self, text, ruleset=None):
+        self.revision = 0
+        self.lock = threading.Lock()
+        self._rebuild(text, ruleset)
+
+    def _rebuild(self, text, ruleset=None):
+        """Analyze the whole text from scratch."""
+        self.text = text
+        self.language = detect_language(clean_text(text[:LANGUAGE_WINDOW]))
+        self.ruleset, self.supported = route_ruleset(self.language, ruleset)
+        units = []
+        previous_end = 0
+        for start, end in split_units(text, 0, len(text)):
+            unit = Unit(text[start:end], self.ruleset, self.supported)
+            unit.gap = start - previous_end
+            previous_end = end
+            units.append(unit)
+        self.units = UnitSequence(units)
+        self.caps_count = 0
+        self.exclaim_count = 0
+        self.category_counts = Counter()
+        self.entry_counts = array('q', bytes(8 * self.ruleset.matcher.entry_count))
+        for unit in units:
+            self._count(unit, 1)
+
+    def _count(self, unit, sign):
+        """Add (sign 1) or remove (sign -1) a unit's share of the running totals."""
+        self.caps_count += sign * unit.caps_count
+        self.exclaim_count += sign * unit.exclaim_count
+        if sign > 0:
+            self.category_counts.update(unit.categories)
+        else:
+            self.category_counts.subtract(unit.categories)
+        entry_counts = self.entry_counts
+        for rule_id in unit.state.rule_ids:
+            entry_counts[rule_id] += sign
+
+    def apply_edit(self, start, end, replacement):
+        """
+        Replace text[start:end] and re-analyze the affected units.
+
+        Args:
+            start (int): Start offset of the replaced range
+            end (int): End offset of the replaced range
+            replacement (str): New text for the range
+        """
+        if not (isinstance(start, int) and isinstance(end, int) and 0 <= start <= end <= len(self.text)):
+            raise ValueError(f'Edit range {start}-{end} is outside the document (length {len(self.text)})')
+        if not isinstance(replacement, str):
+            raise ValueError('Edit text must be a string')
+
+        language = self.language
+        if start < LANGUAGE_WINDOW:
+            language = detect_language(clean_text((self.text[:start] + replacement)[:LANGUAGE_WINDOW]
+                                                  + self.text[end:end + LANGUAGE_WINDOW]))
+        if language != self.language or self.ruleset.version != route_ruleset(language)[0].version:
+            # Language or rules changed since the document was analyzed
+            self._rebuild(self.text[:start] + replacement + self.text[end:])
+            return
+
+        units = self.units
+        count = len(units)
+
+        # Re-split from the unit before the edit to the unit after it, since
+        # the edit may create, join or remove sentence boundaries
+        first, _ = units.first_ending_at_or_after(start)
+        last = units.count_starting_at_or_before(end) - 1
+        lo = max(first - 1, 0)
+        hi = min(max(last + 1, first), count - 1)
+        region_start = units.span(lo)[0] if lo > 0 else 0
+        if count and hi < count - 1:
+            hi_start, hi_unit = units.span(hi)
+            region_end = hi_start + len(hi_unit.text)
+            following_start, following = units.span(hi + 1)
+        else:
+            region_end = len(self.text)
+            following = None
+        if lo > 0:
+            previous_start, previous = units.span(lo - 1)
+            previous_end = previous_start + len(previous.text)
+        else:
+            previous_end = 0
+
+        delta = len(replacement) - (end - start)
+        text = self.text[:start] + replacement + self.text[end:]
+
+        # Reuse analyses of units whose text did not change
+        removed = units.replace(lo, hi + 1, ()) if count else []
+        reusable = {unit.text: unit for unit in removed}
+        added = []
+        for span_start, span_end in split_units(text, region_start, region_end + delta):
+            unit = reusable.pop(text[span_start:span_end], None)
+            if unit is None:
+                unit = Unit(text[span_start:span_end], self.ruleset, self.supported)
+            unit.gap = span_start - previous_end
+            previous_end = span_end
+            added.append(unit)
+        if following is not None:
+            # The next unit moved with the edit; only its gap changes
+            following.gap = following_start + delta - previous_end
+            units.replace(lo, lo + 1, added + [following])
+        else:
+            units.replace(lo, lo, added)
+
+        for unit in removed:
+            self._count(unit, -1)
+        for unit in added:
+            self._count(unit, 1)
+
+        self.text = text
+
+    def result(self):
+        """
+        Build the analysis result from the running totals.
+
+        Returns:
+            dict: Analysis result in the /analyze response shape
+        """
+        ruleset = self.ruleset
+        matcher = ruleset.matcher
+        scoring = score_counts(matcher.entry_category_counts(self.entry_counts), self.caps_count,
+                               self.exclaim_count, ruleset=ruleset)
+        trust_score = scoring.score
+        label = scoring.label
+
+        explanations = self.units.explanations(MAX_EXPLANATIONS)
+        if scoring.penalties and not explanations:
+            # No sentence was flagged: the general explanations need the
+            # matched items, which only the units have
+            scoring.hits = matcher.merge(unit.state for unit in self.units)
+            explanations = explain_issues(scoring.issues, ruleset)[:MAX_EXPLANATIONS]
+
+        categories = {category for category, count in self.category_counts.items() if count > 0}
+        language = self.language if self.language != UNDETERMINED else None
+        sources_detailed = suggest_sources_for_categories(categories, label, ruleset, language=language)
+
+        return {
+            'label': label,
+            'trust_score': trust_score,
+            'explanations': explanations,
+            'sources': get_source_names(sources_detailed),
+            'sources_detailed': sources_detailed,
+            'summary': create_summary(trust_score, label, explanations),
+            'language': self.language,
+            'ruleset_version': ruleset.version
+        }
+
+
+class DocumentStore:
+    """In-process store of documents under editing, with LRU eviction and an idle TTL."""
+
+    def __init__(self, max_documents=256, ttl=1800):
+        self.max_documents = max_documents
+        self.ttl = ttl
+        self._documents = OrderedDict()  # id -> (last used, document)
+        self._lock = threading.Lock()
+
+    def create(self, text):
+        """
+        Start tracking a document.
+
+        Returns:
+            tuple: (document id, IncrementalDocument)
+        """
+        document = IncrementalDocument(text)
+        document_id = uuid.uuid4().hex
+        with self._lock:
+            self._documents[document_id] = (time.monotonic(), document)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+        return document_id, document
+
+    def get(self, document_id):
+        """Return the document, or None if unknown or expired."""
+        with self._lock:
+            entry = self._documents.get(document_id)
+            if entry is None:
+                return None
+            used_at, document = entry
+            now = time.monotonic()
+            if self.ttl and now - used_at > self.ttl:
+                del self._documents[document_id]
+                return None
+            self._documents[document_id] = (now, document)
+            self._documents.move_to_end(document_id)
+            return document
+
+    def edit(self, document_id, revision, edits):
+        """
+        Apply edits to a document.
+
+        Args:
+            document_id (str): Id from create()
+            revision (int): Revision the edits were made against
+            edits (list): {'start', 'end', 'text'} dicts, applied in order
+
+        Returns:
+            IncrementalDocument or None: The updated document, or None if unknown
+
+        Raises:
+            RevisionMismatch: If revision is not the document's current revision
+            ValueError: If an edit is malformed (the document is left unchanged)
+        """
+        document = self.get(document_id)
+        if document is None:
+            return None
+        with document.lock:
+            if revision != document.revision:
+                raise RevisionMismatch(
+                    f'Document is at revision {document.revision}, edits are for revision {revision}'
+                )
+            for edit in edits:
+                if not isinstance(edit, dict):
+                    raise ValueError('Each edit needs start, end and text')
+            text = document.text
+            for edit in edits:
+                start, end, replacement = edit.get('start'), edit.get('end'), edit.get('text')
+                if not (isinstance(start, int) and isinstance(end, int) and 0 <= start <= end <= len(text)
+                        and isinstance(replacement, str)):
+                    raise ValueError('Each edit needs start <= end within the document and a text string')
+                text = text[:start] + replacement + text[end:]
+            for edit in edits:
+                document.apply_edit(edit['start'], edit['end'], edit['text'])
+            document.revision += 1
+        return document
+
+    def delete(self, document_id):
+        """Stop tracking a document."""
+        with self._lock:
+            return self._documents.pop(document_id, None) is not None
+
+
+def create_document_store_from_env():
+    """
+    Build the document store configured by environment variables.
+
+    LIVE_DOCUMENTS: "1" (default) to enable, "0" to disable /documents
+    LIVE_MAX_DOCUMENTS: Documents kept per process (default 256)
+    LIVE_DOCUMENT_TTL: Seconds an unused document is kept, 0 to keep it (default 1800)
+
+    Returns:
+        DocumentStore or None: The store, or None when disabled
+    """
+    if os.environ.get('LIVE_DOCUMENTS', '1') == '0':
+        return None
+    return DocumentStore(
+        max_documents=int(os.environ.get('LIVE_MAX_DOCUMENTS', 256)),
+        ttl=float(os.environ.get('LIVE_DOCUMENT_TTL', 1800))
+    )
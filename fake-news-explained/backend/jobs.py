@@ -0,0 +1,406 @@
+"""
+Background analysis jobs.
+Large documents are queued and analyzed by a small pool of worker
+threads, so a few big submissions cannot hold every web worker.
+"""
+
+import importlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+# Job statuses
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# Seconds between checks for jobs submitted by other processes
+POLL_INTERVAL = 0.25
+
+# Times a job is started before one more interrupted run fails it
+MAX_ATTEMPTS = 2
+
+# Longest wait between retries when the SQLite database stays locked
+MAX_RETRY_DELAY = 5.0
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobQueue:
+    """Interface for job queues, so the in-process queue can be swapped out."""
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue func(*args, **kwargs) to run in the background.
+
+        Returns:
+            str: Job id
+
+        Raises:
+            QueueFull: If no more jobs can be accepted right now
+        """
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """Return the job's status dict, or None if unknown or expired."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Return queue depth and job counts."""
+        raise NotImplementedError
+
+
+class InProcessJobQueue(JobQueue):
+    """
+    Bounded queue served by worker threads in this process.
+
+    Finished jobs are kept for result_ttl seconds after they complete and
+    then dropped. Workers start on first use, so the queue also works
+    when the app is imported before gunicorn forks its workers.
+    """
+
+    def __init__(self, workers=2, max_queued=32, result_ttl=600):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}         # job id -> status dict
+        self._lock = threading.Lock()
+        self._started_pid = None
+
+    def submit(self, func, *args, **kwargs):
+        self._ensure_workers()
+        self._expire()
+
+        job_id = uuid.uuid4().hex
+        job = {'id': job_id, 'status': STATUS_QUEUED, 'created_at': time.time()}
+        with self._lock:
+            self._jobs[job_id] = job
+        try:
+            self._queue.put_nowait((job_id, func, args, kwargs))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+            raise QueueFull(f'At most {self.max_queued} jobs can wait at a time')
+        return job_id
+
+    def get(self, job_id):
+        self._expire()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self):
+        self._expire()
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {
+            'workers': self.workers,
+            'queued': self._queue.qsize(),
+            'max_queued': self.max_queued,
+            'jobs': counts
+        }
+
+    def _ensure_workers(self):
+        """Start the worker threads in this process if not running yet."""
+        pid = os.getpid()
+        if self._started_pid == pid:
+            return
+        with self._lock:
+            if self._started_pid == pid:
+                return
+            for _ in range(self.workers):
+                threading.Thread(target=self._work, daemon=True).start()
+            self._started_pid = pid
+
+    def _work(self):
+        """Worker loop: run queued jobs and record their outcome."""
+        while True:
+            job_id, func, args, kwargs = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job['status'] = STATUS_RUNNING
+                    job['started_at'] = time.time()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                update = {'status': STATUS_FAILED, 'error': str(e)}
+            else:
+                update = {'status': STATUS_DONE, 'result': result}
+            finally:
+                self._queue.task_done()
+            with self._lock:
+                if job is not None:
+                    job.update(update, finished_at=time.time())
+
+    def _expire(self):
+        """Drop finished jobs older than result_ttl."""
+        if not self.result_ttl:
+            return
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.get('finished_at', cutoff) < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+def _process_alive(pid):
+    """Check whether a process on this host is still running."""
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _resolve(name):
+    """Look up a job function stored as "module:qualified name"."""
+    module_name, _, qualname = name.partition(':')
+    target = sys.modules.get(module_name) or importlib.import_module(module_name)
+    for part in qualname.split('.'):
+        target = getattr(target, part)
+    return target
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Job queue in a SQLite file shared by every worker process on a host.
+
+    Any process can report on any job, and queued jobs are run by the
+    worker threads of whichever process claims them first. Functions are
+    stored by module and name, so they must be module-level functions
+    every process has loaded (e.g. app.analyze_text); their arguments and
+    results must be JSON-serializable. Jobs left running by a process
+    that exited (e.g. a recycled gunicorn worker) are queued again, up to
+    MAX_ATTEMPTS runs.
+    """
+
+    def __init__(self, path, workers=2, max_queued=32, result_ttl=600, poll_interval=POLL_INTERVAL):
+        self.path = path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started_pid = None
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, status TEXT NOT NULL, func TEXT NOT NULL, arguments TEXT NOT NULL, '
+            'result TEXT, error TEXT, pid INTEGER, attempts INTEGER NOT NULL DEFAULT 0, '
+            'created_at REAL NOT NULL, started_at REAL, finished_at REAL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+
+    def _connect(self):
+        # One connection per thread (and per process after fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Run statements in a write transaction, one process at a time."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            # A failed COMMIT (e.g. a busy database) leaves the transaction open
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+
+    def submit(self, func, *args, **kwargs):
+        self._ensure_workers()
+        self._expire()
+
+        job_id = uuid.uuid4().hex
+        name = f'{func.__module__}:{func.__qualname__}'
+        with self._transaction() as conn:
+            queued = conn.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (STATUS_QUEUED,)).fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFull(f'At most {self.max_queued} jobs can wait at a time')
+            conn.execute(
+                'INSERT INTO jobs (id, status, func, arguments, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, STATUS_QUEUED, name, json.dumps([args, kwargs]), time.time())
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        # Any process polling for jobs also helps run them
+        self._ensure_workers()
+        self._expire()
+        row = self._connect().execute(
+            'SELECT status, result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, result, error, created_at, started_at, finished_at = row
+        job = {'id': job_id, 'status': status, 'created_at': created_at}
+        if started_at is not None:
+            job['started_at'] = started_at
+        if result is not None:
+            job['result'] = json.loads(result)
+        if error is not None:
+            job['error'] = error
+        if finished_at is not None:
+            job['finished_at'] = finished_at
+        return job
+
+    def stats(self):
+        self._expire()
+        counts = dict(self._connect().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status'))
+        return {
+            'workers': self.workers,
+            'queued': counts.get(STATUS_QUEUED, 0),
+            'max_queued': self.max_queued,
+            'jobs': counts
+        }
+
+    def _ensure_workers(self):
+        """Start the worker threads in this process if not running yet."""
+        pid = os.getpid()
+        if self._started_pid == pid:
+            return
+        with self._lock:
+            if self._started_pid == pid:
+                return
+            for _ in range(self.workers):
+                threading.Thread(target=self._work, daemon=True).start()
+            self._started_pid = pid
+
+    def _claim(self):
+        """Mark the oldest queued job as running in this process and return it, or None."""
+        now = time.time()
+        with self._transaction() as conn:
+            # Jobs whose process exited mid-run
+            for job_id, pid, attempts in conn.execute(
+                    'SELECT id, pid, attempts FROM jobs WHERE status = ?', (STATUS_RUNNING,)).fetchall():
+                if _process_alive(pid):
+                    continue
+                if attempts < MAX_ATTEMPTS:
+                    conn.execute('UPDATE jobs SET status = ?, pid = NULL WHERE id = ?', (STATUS_QUEUED, job_id))
+                else:
+                    conn.execute('UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                                 (STATUS_FAILED, 'The worker running the job exited', now, job_id))
+
+            row = conn.execute(
+                'SELECT id, func, arguments FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1',
+                (STATUS_QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, pid = ?, attempts = attempts + 1, started_at = ? WHERE id = ?',
+                    (STATUS_RUNNING, os.getpid(), now, row[0])
+                )
+        return row
+
+    def _work(self):
+        """Worker loop: claim queued jobs and record their outcome."""
+        delay = self.poll_interval
+        while True:
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                # Typically a database locked past the timeout; back off and try again
+                logger.warning('Could not claim a job from %s: %s', self.path, e)
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            delay = self.poll_interval
+            if job is None:
+                # Submissions from this process wake the loop at once,
+                # those from other processes are seen at the next poll
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            job_id, name, arguments = job
+            try:
+                args, kwargs = json.loads(arguments)
+                result = _resolve(name)(*args, **kwargs)
+                update = (STATUS_DONE, json.dumps(result), None)
+            except Exception as e:
+                update = (STATUS_FAILED, None, str(e))
+            self._finish(job_id, update)
+
+    def _finish(self, job_id, update):
+        """Record the outcome of a job, retrying while the database is locked."""
+        delay = self.poll_interval
+        while True:
+            try:
+                self._connect().execute(
+                    'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?',
+                    update + (time.time(), job_id)
+                )
+                return
+            except sqlite3.Error as e:
+                logger.warning('Could not record the outcome of job %s in %s: %s', job_id, self.path, e)
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    def _expire(self):
+        """Drop finished jobs older than result_ttl."""
+        if not self.result_ttl:
+            return
+        self._connect().execute('DELETE FROM jobs WHERE finished_at < ?', (time.time() - self.result_ttl,))
+
+
+def create_job_queue_from_env():
+    """
+    Build the job queue configured by environment variables.
+
+    JOB_BACKEND: "memory" (default), "sqlite" (shared by the worker
+                 processes on a host) or "none" (disables /jobs)
+    JOB_WORKERS: Worker threads per process (default 2)
+    JOB_QUEUE_SIZE: Jobs that may wait before submissions get 429 (default 32)
+    JOB_RESULT_TTL: Seconds finished jobs are kept, 0 to keep them (default 600)
+    JOB_DB_PATH: SQLite file for the "sqlite" backend (default jobs.sqlite3)
+
+    Returns:
+        JobQueue or None: The job queue, or None when jobs are disabled
+    """
+    backend_name = os.environ.get('JOB_BACKEND', 'memory').lower()
+    options = {
+        'workers': int(os.environ.get('JOB_WORKERS', 2)),
+        'max_queued': int(os.environ.get('JOB_QUEUE_SIZE', 32)),
+        'result_ttl': float(os.environ.get('JOB_RESULT_TTL', 600))
+    }
+
+    if backend_name == 'none':
+        return None
+    if backend_name == 'sqlite':
+        return SQLiteJobQueue(os.environ.get('JOB_DB_PATH', 'jobs.sqlite3'), **options)
+    if backend_name == 'memory':
+        return InProcessJobQueue(**options)
+    raise ValueError(f"Unknown JOB_BACKEND: {backend_name}")
@@ -0,0 +1,174 @@
+"""
+Lightweight language identification.
+Only a short prefix of the text is examined. Texts written mostly in a
+non-Latin script are identified by the script. Latin-script texts are
+compared against character trigram profiles of each language's most
+frequent words; building the trigram set and intersecting it with each
+profile runs in C, a few dozen microseconds per text.
+"""
+
+import bisect
+import re
+
+
+# Characters of a text examined
+PREFIX_CHARS = 256
+
+# Code for texts whose language cannot be told with confidence
+UNDETERMINED = 'und'
+
+# Language of rulesets that do not declare one
+DEFAULT_LANGUAGE = 'en'
+
+# Latin-script texts need this many letters in the prefix; shorter ones,
+# such as headlines, share too many trigrams with other languages...
+MIN_LETTERS = 80
+
+# ...this many distinct profile trigrams...
+MIN_TRIGRAM_MATCHES = 20
+
+# ...and this many times as many as the runner-up language. Anything less
+# is reported as undetermined, which gets the main ruleset
+MIN_MARGIN = 1.3
+
+# Most frequent words of each Latin-script language, the source of its profile
+FREQUENT_WORDS = {
+    'en': 'the of and to in is that for it was on are as with his they be at one have this from or had by '
+          'not but what all were when we there can an your which their said if will each about how up out '
+          'them then she many some so these would other into has more her two like him see time could no '
+          'make than first been its who now people my made over did down only way find use may long very '
+          'after where most through before also should because does just those any government according',
+    'es': 'de la que el en y a los se del las un por con no una su para es al lo como más pero sus le ya '
+          'o este sí porque esta entre cuando muy sin sobre también me hasta hay donde quien desde todo nos '
+          'durante todos uno les ni contra otros ese eso ante ellos e esto mí antes algunos qué unos yo otro '
+          'otras otra él tanto esa estos mucho quienes nada muchos cual poco ella estar estas algunas algo '
+          'nosotros gobierno según años ha fue están',
+    'fr': 'de la le et les des en un du une que est pour qui dans par plus pas au sur ne se ce il sont avec '
+          'ou son sa leur mais comme été aux elle nous vous ont ses cette tout bien sans peut entre fait '
+          'deux aussi même faire dont ces très lui sous après avant encore ils où depuis tous être selon '
+          'contre autres était avait alors chez notre gouvernement ans leurs quand donc toujours celui',
+    'de': 'der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an '
+          'werden aus er hat dass sie nach wird bei einer um am sind noch wie einem über einen so zum war '
+          'haben nur oder aber vor zur bis mehr durch man sein wurde sei ihre seine können ich wenn schon '
+          'sehr jahr jahren gegen diese dieser hatte zwei unter regierung laut immer wieder gibt',
+    'it': 'di e il la che in a per un del non è una le sono da con si al dei della i lo come anche gli ma '
+          'più nel alla delle ha ad se questo o nella sua suo tra essere quando dopo stato ci perché loro '
+          'cui fatto tutti degli sia già ancora molto due anni solo fra questa sulla secondo governo noi '
+          'contro erano aveva ogni quello senza mentre quindi stati sempre',
+    'pt': 'de a o que e do da em um para é com não uma os no se na por mais as dos como mas foi ao ele das '
+          'tem à seu sua ou ser quando muito há nos já está eu também só pelo pela até isso ela entre era '
+          'depois sem mesmo aos ter seus quem nas me esse eles estão você tinha foram essa num nem suas '
+          'meu às minha têm numa pelos governo segundo anos ainda são então',
+    'nl': 'de van een het en in is dat op te zijn voor met die niet aan er om ook als bij door maar uit '
+          'dan nog wordt naar over tot werd kan zo worden wel deze hij we ze heeft geen al was hun meer '
+          'moet onder jaar volgens twee hebben of zij omdat nu veel waar tegen andere wat zich dit haar '
+          'na heb daar toen alleen regering zouden zou mensen jaren',
+    'sv': 'och i att det som en på är av för med till den har de inte om ett han men var jag sig från vi '
+          'så kan man när år säger hon under också efter eller nu sin där vid mot ska skulle kommer ut får '
+          'finns vara hade alla andra mycket än här då sedan över bara in blir upp även vad få två vill '
+          'ha många hur mer går sverige regeringen enligt',
+    'pl': 'w i się na z do nie że to jest o jak a po co tak za od przez ale jego dla ich być już go może '
+          'był jej tylko przy są oraz lub ze tym które który które została został jako jednak roku lat '
+          'według przed tego czy bardzo nawet było będzie jeszcze także gdy mnie mu ten ta też rząd '
+          'polski można kiedy wszystko pod nad bez',
+    'tr': 've bir bu da de için ile çok daha olarak gibi en ne ama o sonra kadar var olan her göre ise '
+          'ancak değil yok olduğu bunu şey ben sen biz onlar ki mi diye ya veya hem büyük yeni iki ilk '
+          'son yıl yılında tarafından hükümet türkiye nasıl neden şimdi önce ayrıca bütün bazı oldu '
+          'olduğunu etti edildi ediyor',
+    'id': 'yang dan di ini itu dengan untuk dari dalam tidak akan pada juga ke ada oleh sudah saya kami '
+          'mereka kita bisa karena atau lebih telah para seperti hanya tersebut tahun bahwa dapat harus '
+          'sebagai masih jika saat setelah menjadi banyak namun bagi serta agar kata antara pemerintah '
+          'menurut baru sejak belum sangat semua sebuah',
+}
+
+# Non-Latin scripts: (first code point, last code point, script)
+SCRIPT_RANGES = sorted([
+    (0x0370, 0x03FF, 'el'), (0x0400, 0x052F, 'cyrillic'), (0x0530, 0x058F, 'hy'),
+    (0x0590, 0x05FF, 'he'), (0x0600, 0x06FF, 'arabic'), (0x0750, 0x077F, 'arabic'),
+    (0x0900, 0x097F, 'hi'), (0x0980, 0x09FF, 'bn'), (0x0B80, 0x0BFF, 'ta'), (0x0E00, 0x0E7F, 'th'),
+    (0x10A0, 0x10FF, 'ka'), (0x1100, 0x11FF, 'ko'), (0x3040, 0x30FF, 'kana'), (0x3400, 0x4DBF, 'han'),
+    (0x4E00, 0x9FFF, 'han'), (0xAC00, 0xD7AF, 'ko'), (0xFB50, 0xFDFF, 'arabic'), (0xFE70, 0xFEFF, 'arabic'),
+])
+_RANGE_STARTS = [first for first, _, _ in SCRIPT_RANGES]
+
+# Letters that set a language apart from others sharing its script
+UKRAINIAN_LETTERS = frozenset('іїєґ')
+PERSIAN_LETTERS = frozenset('پچژگ')
+URDU_LETTERS = frozenset('ٹڈڑںے')
+
+_NON_LATIN = re.compile(r'[^\u0000-ɏḀ-ỿ]')
+_NON_LETTERS = re.compile(r'[\W\d_]+')
+_ASCII_NON_LETTERS = {code: ' ' for code in range(128) if not chr(code).isalpha()}
+
+
+def _profile(words):
+    """Trigrams of the space-padded words."""
+    trigrams = set()
+    for word in words.split():
+        padded = f' {word} '
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(trigrams)
+
+
+PROFILES = {language: _profile(words) for language, words in FREQUENT_WORDS.items()}
+
+
+def _script_language(letters):
+    """Identify the language of text written in a non-Latin script."""
+    counts = {}
+    for char in letters:
+        index = bisect.bisect_right(_RANGE_STARTS, ord(char)) - 1
+        if index >= 0 and ord(char) <= SCRIPT_RANGES[index][1]:
+            script = SCRIPT_RANGES[index][2]
+            counts[script] = counts.get(script, 0) + 1
+    if not counts:
+        return UNDETERMINED
+    script = max(counts, key=counts.get)
+    if script in ('han', 'kana'):
+        return 'ja' if 'kana' in counts else 'zh'
+    if script == 'cyrillic':
+        return 'uk' if UKRAINIAN_LETTERS.intersection(letters) else 'ru'
+    if script == 'arabic':
+        if URDU_LETTERS.intersection(letters):
+            return 'ur'
+        return 'fa' if PERSIAN_LETTERS.intersection(letters) else 'ar'
+    return script
+
+
+def detect_language(text):
+    """
+    Identify the language of a text from its first PREFIX_CHARS characters.
+
+    Args:
+        text (str): Text in any case
+
+    Returns:
+        str: ISO 639-1 code (e.g. "en", "es", "ru"), or "und" when the
+             prefix is too short or too mixed to tell with confidence
+    """
+    prefix = text[:PREFIX_CHARS].lower()
+    if prefix.isascii():
+        words = prefix.translate(_ASCII_NON_LETTERS)
+    else:
+        non_latin = ''.join(_NON_LATIN.findall(prefix))
+        if non_latin:
+            letters = [char for char in non_latin if char.isalpha()]
+            if 2 * len(letters) > len(_NON_LETTERS.sub('', prefix)):
+                return _script_language(letters)
+        words = _NON_LETTERS.sub(' ', prefix)
+    if len(words) - words.count(' ') < MIN_LETTERS:
+        return UNDETERMINED
+
+    padded = f' {words} '
+    trigrams = set(map(''.join, zip(padded, padded[1:], padded[2:])))
+    best = UNDETERMINED
+    best_matches = runner_up = 0
+    for language, profile in PROFILES.items():
+        matches = len(trigrams.intersection(profile))
+        if matches > best_matches:
+            best, best_matches, runner_up = language, matches, best_matches
+        elif matches > runner_up:
+            runner_up = matches
+    if best_matches < MIN_TRIGRAM_MATCHES or best_matches < MIN_MARGIN * runner_up:
+        return UNDETERMINED
+    return best
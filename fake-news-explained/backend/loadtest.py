@@ -0,0 +1,168 @@
+"""
+Load test for a running API server.
+
+Sends /analyze requests from concurrent clients over keep-alive
+connections for a fixed time and reports throughput and latency. Works
+against the dev server (python app.py) and gunicorn alike, so the two can
+be compared.
+
+Usage:
+    python loadtest.py --url http://localhost:5000 --concurrency 8 --duration 30
+    python loadtest.py --words 2000 --density 0.1 --output load.json
+
+Each request carries one of --texts distinct synthetic articles. Once all
+have been sent they repeat and are answered from the result cache; start
+the server with RESULT_CACHE_BACKEND=none to measure the analysis
+alone.
+"""
+
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from benchmark import generate_article
+
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_DURATION = 10.0
+DEFAULT_TEXTS = 500
+
+# Seconds to wait for one response
+REQUEST_TIMEOUT = 30.0
+
+
+def percentile(samples, fraction):
+    """Get a percentile of sorted samples."""
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class Client(threading.Thread):
+    """One simulated user sending requests back to back over one connection."""
+
+    def __init__(self, url, bodies, first, step, deadline):
+        super().__init__(daemon=True)
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.path = parts.path.rstrip('/') + '/analyze'
+        self.bodies = bodies
+        self.next_body = first
+        self.step = step
+        self.deadline = deadline
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.connection = None
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.connection = connection_class(self.host, self.port, timeout=REQUEST_TIMEOUT)
+
+    def run(self):
+        self._connect()
+        headers = {'Content-Type': 'application/json'}
+        while time.monotonic() < self.deadline:
+            body = self.bodies[self.next_body % len(self.bodies)]
+            self.next_body += self.step
+            started = time.perf_counter()
+            try:
+                self.connection.request('POST', self.path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                self.connection.close()
+                self._connect()
+                continue
+            self.latencies.append(time.perf_counter() - started)
+            self.statuses[response.status] = self.statuses.get(response.status, 0) + 1
+            if response.will_close:
+                self.connection.close()
+                self._connect()
+        self.connection.close()
+
+
+def run_load(url, concurrency, duration, bodies):
+    """
+    Run the load test.
+
+    Args:
+        url (str): Base URL of the API
+        concurrency (int): Number of concurrent clients
+        duration (float): Seconds to send requests for
+        bodies (list): Encoded JSON request bodies
+
+    Returns:
+        dict: Throughput, latency percentiles (ms), status counts and errors
+    """
+    deadline = time.monotonic() + duration
+    clients = [Client(url, bodies, i, concurrency, deadline) for i in range(concurrency)]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    statuses = {}
+    for client in clients:
+        for status, count in client.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'requests': len(latencies),
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'errors': sum(client.errors for client in clients)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the fake news analysis API.')
+    parser.add_argument('--url', default='http://localhost:5000', help='Base URL of the API')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='Seconds to run')
+    parser.add_argument('--words', type=int, default=500, help='Words per article')
+    parser.add_argument('--density', type=float, default=0.05, help='Fraction of words that are indicator phrases')
+    parser.add_argument('--texts', type=int, default=DEFAULT_TEXTS, help='Distinct articles to send')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    bodies = [json.dumps({'text': generate_article(args.words, args.density, seed=seed)}).encode('utf-8')
+              for seed in range(args.texts)]
+    report = run_load(args.url, args.concurrency, args.duration, bodies)
+
+    print(f"{report['requests']} requests in {report['duration_s']}s "
+          f"({report['concurrency']} clients): {report['requests_per_s']} req/s")
+    print(f"latency p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, "
+          f"p99 {report['p99_ms']} ms, max {report['max_ms']} ms")
+    print(f"statuses {report['statuses']}, connection errors {report['errors']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if not report['requests']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,572 @@
+"""
+Single-pass indicator matcher.
+Compiles every indicator lexicon into one trie-shaped regex so a text is
+scanned once, no matter how many phrases and patterns the lexicons contain.
+"""
+
+import bisect
+import re
+from array import array
+from operator import itemgetter
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+# Match modes for a lexicon category
+MODE_PRESENT = 'present'       # Report each entry once if it occurs anywhere
+MODE_FINDALL = 'findall'       # Report every non-overlapping match, like re.findall
+MODE_CANDIDATE = 'candidate'   # Only record where the entry may start; the caller
+                               # verifies it within its own bounds (e.g. a sentence)
+
+# Matched items kept per entry when hits are discarded (the general
+# explanations show the first three items of an issue)
+RETAINED_ITEMS = 3
+
+
+def literal_prefixes(pattern):
+    """
+    Get the literal strings every match of a regex must start with.
+
+    Args:
+        pattern (str): Regex pattern
+
+    Returns:
+        list or None: Literal prefixes, or None if the pattern has no
+        usable literal prefix (the matcher then tries it everywhere)
+    """
+    def expand(items, prefixes):
+        for op, av in items:
+            if op is sre_parse.LITERAL:
+                prefixes = [p + chr(av) for p in prefixes]
+            elif op is sre_parse.SUBPATTERN and not any(av[1:3]):
+                prefixes, done = expand(av[3], prefixes)
+                if not done:
+                    return prefixes, False
+            elif op is sre_parse.BRANCH:
+                branched = []
+                for alternative in av[1]:
+                    expanded, _ = expand(alternative, prefixes)
+                    branched.extend(expanded)
+                return branched, False
+            else:
+                return prefixes, False
+        return prefixes, True
+
+    prefixes, _ = expand(sre_parse.parse(pattern), [''])
+    if not prefixes or not all(prefixes):
+        return None
+    return sorted(set(prefixes))
+
+
+# Regex constructs that look at text around the match
+_POSITIONAL_OPS = (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+
+
+def position_independent(pattern):
+    """
+    Check whether a regex matches a piece of text the same way on its own.
+
+    Patterns without anchors, word boundaries or lookarounds only look at
+    the characters they match, so a match within a sentence is also found
+    when searching the whole text.
+
+    Args:
+        pattern (str): Regex pattern
+
+    Returns:
+        bool: True if the pattern has none of those constructs
+    """
+    def walk(node):
+        if isinstance(node, sre_parse.SubPattern):
+            return all(walk(item) for item in node)
+        if isinstance(node, tuple) and node and any(node[0] is op for op in _POSITIONAL_OPS):
+            return False
+        if isinstance(node, (tuple, list)):
+            return all(walk(item) for item in node)
+        return True
+
+    return walk(sre_parse.parse(pattern))
+
+
+def _trie_regex(words):
+    """Build a regex matching any of the words, with shared prefixes merged."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = None
+
+    def build(node):
+        branches = [re.escape(char) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class MatchState:
+    """
+    Compact record of the hits found in one text.
+
+    Hits are kept in parallel arrays of rule ids (entry indexes) and
+    character offsets, in text order; the matched strings are only
+    materialized by IndicatorMatcher.results(). Every occurrence is
+    recorded, including repeats of present-mode entries, so callers can
+    map hits back to positions. Regex findall hits also need their matched
+    text, since it is not recoverable from the offsets once the text is
+    gone (e.g. when streaming); each distinct string is stored once and
+    hits refer to it by number.
+
+    Hits discarded by IndicatorMatcher.discard_before() only leave their
+    per-category counts and the first few items of each entry behind.
+    """
+
+    __slots__ = ('rule_ids', 'starts', 'ends', 'item_ids', 'vocabulary', 'vocabulary_ids', 'last_hit',
+                 'scanned_to', 'discarded_counts', 'discarded_seen', 'discarded_items')
+
+    def __init__(self):
+        self.rule_ids = array('i')
+        self.starts = array('q')
+        self.ends = array('q')
+        self.item_ids = array('i')          # vocabulary number, or -1 for the rule's own text
+        self.vocabulary = []                # distinct matched strings
+        self.vocabulary_ids = {}            # matched string -> vocabulary number
+        self.last_hit = {}                  # rule id -> its latest hit number (regex entries)
+        self.scanned_to = 0                 # end offset of the text fed so far
+        self.discarded_counts = None        # hits per category discarded so far
+        self.discarded_seen = None          # entry index -> 1 if a discarded hit counted it
+        self.discarded_items = None         # entry index -> first discarded items (None for its own text)
+
+    def __len__(self):
+        return len(self.rule_ids)
+
+    def add(self, rule_id, start, end, item=None):
+        """Record one hit and return its number."""
+        if item is None:
+            item_id = -1
+        else:
+            item_id = self.vocabulary_ids.get(item)
+            if item_id is None:
+                item_id = self.vocabulary_ids[item] = len(self.vocabulary)
+                self.vocabulary.append(item)
+        self.rule_ids.append(rule_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.item_ids.append(item_id)
+        return len(self.rule_ids) - 1
+
+    def item(self, number):
+        """Return the matched string of a hit, or None if it is the rule's own text."""
+        item_id = self.item_ids[number]
+        return self.vocabulary[item_id] if item_id >= 0 else None
+
+
+class IndicatorMatcher:
+    """
+    Compiled matcher for a set of indicator lexicons.
+
+    Literal phrases and the literal prefixes of regex entries are merged
+    into one trie-shaped lookahead, so the text is scanned once and only
+    candidate positions are inspected further. Overlapping hits from
+    different entries (e.g. "shocking" in two lexicons) are all reported.
+    """
+
+    def __init__(self, lexicons):
+        """
+        Args:
+            lexicons (list): (category, entries, is_regex, mode) tuples.
+                Literal entries are matched as plain substrings.
+        """
+        self.categories = []
+        self.category_modes = []
+        self._entries = []          # (category, display, compiled or None, mode)
+        self._rule_category = array('i')  # entry index -> category index
+        self._once = bytearray()    # entry index -> 1 if reported once per text (present mode)
+        self._by_anchor = {}        # literal prefix -> entry indexes
+        self._by_match = {}         # longest prefix at a position -> (entry index, prefix length) (memo)
+        self._simple = bytearray()  # entry index -> 1 if a prefix hit needs no further check
+        self._lengths = array('i')  # entry index -> span length recorded for a simple hit
+        self._unanchored = []       # entry indexes without a literal prefix
+        anchors = set()
+        raw_patterns = []
+
+        for category, entries, is_regex, mode in lexicons:
+            self.categories.append(category)
+            self.category_modes.append(mode)
+            for entry in entries:
+                index = len(self._entries)
+                self._rule_category.append(len(self.categories) - 1)
+                self._once.append(mode == MODE_PRESENT)
+                if is_regex:
+                    self._entries.append((category, entry, re.compile(entry), mode))
+                    prefixes = literal_prefixes(entry)
+                else:
+                    self._entries.append((category, entry, None, mode))
+                    prefixes = [entry] if entry else None
+
+                if prefixes is not None and mode == MODE_CANDIDATE:
+                    # The literal prefix is all a candidate needs to match.
+                    # Candidates are verified case-insensitively by the
+                    # caller, so their prefixes are matched in the lowered text
+                    self._entries[index] = (category, entry, None, mode)
+                    prefixes = sorted({prefix.lower() for prefix in prefixes})
+                simple = prefixes is not None and mode != MODE_FINDALL and self._entries[index][2] is None
+                self._simple.append(simple)
+                self._lengths.append(len(entry) if simple and mode != MODE_CANDIDATE else 0)
+                if prefixes is None:
+                    self._unanchored.append(index)
+                    raw_patterns.append(f'(?:{entry})')
+                    continue
+                for prefix in prefixes:
+                    anchors.add(prefix)
+                    if index not in self._by_anchor.get(prefix, ()):
+                        self._by_anchor.setdefault(prefix, []).append(index)
+
+        # The trie is captured: at each position it matches the longest
+        # prefix there, and every shorter prefix that matches is a prefix of it
+        self._regex = re.compile('(?=(' + _trie_regex(anchors) + '))') if anchors else None
+
+        # Entries without a literal prefix get their own search: as an
+        # alternative of the trie lookahead they would defeat re's
+        # first-character scan and slow down every position
+        self._unanchored_regex = re.compile('|'.join(raw_patterns)) if raw_patterns else None
+
+    def scan(self, text):
+        """
+        Scan text once and collect hits for every category.
+
+        Args:
+            text (str): Text to scan (already lowercased by the caller)
+
+        Returns:
+            dict: Category name -> list of matched items, in lexicon order
+        """
+        return self.results(self.scan_state(text))
+
+    def scan_state(self, text):
+        """
+        Scan text once and keep the hits in compact form.
+
+        Args:
+            text (str): Text to scan (already lowercased by the caller)
+
+        Returns:
+            MatchState: Hits with their offsets in text
+        """
+        state = self.new_state()
+        self.feed(state, text)
+        return state
+
+    @staticmethod
+    def new_state():
+        """Create empty match state for scanning a text in pieces."""
+        return MatchState()
+
+    def feed(self, state, text, offset=0):
+        """
+        Scan one piece of a longer text, accumulating hits in state.
+
+        Pieces may overlap (e.g. a window re-scanning the tail of the
+        previous piece so phrases crossing the cut are found); matches are
+        deduplicated by absolute position, so overlapping is safe.
+
+        Args:
+            state (MatchState): State from new_state()
+            text (str): Lowercased piece of text
+            offset (int): Absolute position of text[0] in the whole text
+        """
+        entries = self._entries
+        simple = self._simple
+        lengths = self._lengths
+        unanchored = self._unanchored
+        scanned_to = state.scanned_to
+        rule_ids, starts, ends, item_ids = state.rule_ids, state.starts, state.ends, state.item_ids
+        others = self._unanchored_positions(text)
+        next_other = 0
+        anchored = self._regex.finditer(text) if self._regex is not None else ()
+        for candidate in anchored:
+            pos = candidate.start()
+            # Unanchored candidates before this position come first
+            while next_other < len(others) and others[next_other] < pos:
+                for index in unanchored:
+                    self._try_entry(index, entries[index], text, others[next_other], offset, state)
+                next_other += 1
+
+            indexes = self._by_match.get(candidate.group(1))
+            if indexes is None:
+                indexes = self._entries_for(candidate.group(1))
+            for index, prefix_length in indexes:
+                if not simple[index]:
+                    self._try_entry(index, entries[index], text, pos, offset, state)
+                    continue
+                # Inlined _try_entry for literal present-mode entries and
+                # candidates: a prefix inside text fed before was recorded then
+                absolute = offset + pos
+                if absolute + prefix_length <= scanned_to:
+                    continue
+                rule_ids.append(index)
+                starts.append(absolute)
+                ends.append(absolute + lengths[index])
+                item_ids.append(-1)
+        for pos in others[next_other:]:
+            for index in unanchored:
+                self._try_entry(index, entries[index], text, pos, offset, state)
+        state.scanned_to = max(scanned_to, offset + len(text))
+
+    def _unanchored_positions(self, text):
+        """Find every position where an entry without a literal prefix matches."""
+        positions = []
+        if self._unanchored_regex is None:
+            return positions
+        search = self._unanchored_regex.search
+        match = search(text)
+        while match is not None:
+            # Restart right after each match start, so overlapping matches are found
+            positions.append(match.start())
+            match = search(text, match.start() + 1)
+        return positions
+
+    def _entries_for(self, longest):
+        """Get (and memoize) the entries whose prefixes start a matched trie string."""
+        prefix_lengths = {}
+        for size in range(1, len(longest) + 1):
+            for index in self._by_anchor.get(longest[:size], ()):
+                prefix_lengths.setdefault(index, size)
+        indexes = sorted(prefix_lengths.items())
+        self._by_match[longest] = indexes
+        return indexes
+
+    def merge(self, states):
+        """
+        Combine the hits of pieces scanned separately, in document order.
+
+        Only valid for pieces no match can cross (e.g. whole sentences).
+        Offsets are kept as they were recorded for each piece. The merged
+        state is meant for results() and counting, not for further feeding.
+
+        Args:
+            states (iterable): States from new_state()/feed(), in order
+
+        Returns:
+            MatchState: Combined state
+        """
+        merged = self.new_state()
+        for state in states:
+            for number, rule_id in enumerate(state.rule_ids):
+                merged.add(rule_id, state.starts[number], state.ends[number], state.item(number))
+        return merged
+
+    def category_counts(self, state):
+        """
+        Count hits per category without building any lists of strings.
+
+        Present-mode entries count once however often they occur.
+
+        Args:
+            state (MatchState): Hits from scan_state() or feed()
+
+        Returns:
+            list: Hit counts, aligned with self.categories
+        """
+        if state.discarded_counts is not None:
+            counts = list(state.discarded_counts)
+            counted = bytearray(state.discarded_seen)
+        else:
+            counts = [0] * len(self.categories)
+            counted = bytearray(len(self._entries))
+        rule_category = self._rule_category
+        once = self._once
+        for rule_id in state.rule_ids:
+            if once[rule_id]:
+                if counted[rule_id]:
+                    continue
+                counted[rule_id] = 1
+            counts[rule_category[rule_id]] += 1
+        return counts
+
+    def entry_category_counts(self, entry_counts):
+        """
+        Count hits per category from per-entry hit counts.
+
+        Gives the same counts as category_counts() on the hits they were
+        counted from, for callers keeping running totals per entry.
+
+        Args:
+            entry_counts (sequence): Hits per entry index
+
+        Returns:
+            list: Hit counts, aligned with self.categories
+        """
+        counts = [0] * len(self.categories)
+        rule_category = self._rule_category
+        once = self._once
+        for rule_id, count in enumerate(entry_counts):
+            if count:
+                counts[rule_category[rule_id]] += 1 if once[rule_id] else count
+        return counts
+
+    @property
+    def entry_count(self):
+        """Number of lexicon entries (hits refer to them by index)."""
+        return len(self._entries)
+
+    def hits_between(self, state, start, end):
+        """
+        Get the hits starting in [start, end), in text order.
+
+        Relies on the hits being recorded in text order, as feed() does
+        for consecutive pieces (not for states from merge()).
+
+        Args:
+            state (MatchState): Hits from scan_state() or feed()
+            start (int): First offset
+            end (int): Offset past the range
+
+        Returns:
+            list: (category index, start, end) tuples
+        """
+        starts = state.starts
+        rule_category = self._rule_category
+        first = bisect.bisect_left(starts, start)
+        last = bisect.bisect_left(starts, end, first)
+        return [(rule_category[state.rule_ids[number]], starts[number], state.ends[number])
+                for number in range(first, last)]
+
+    def results(self, state):
+        """
+        Build the matched items per category.
+
+        Candidate-mode categories are left out, as their hits are unverified.
+
+        Args:
+            state (MatchState): Hits from scan_state() or feed()
+
+        Returns:
+            dict: Category name -> list of matched items, in lexicon order
+        """
+        entries = self._entries
+        once = self._once
+        vocabulary = state.vocabulary
+        results = {category: [] for category, mode in zip(self.categories, self.category_modes)
+                   if mode != MODE_CANDIDATE}
+        reported = bytearray(len(entries))
+        found = []
+        if state.discarded_items:
+            found.extend((rule_id, item) for rule_id, items in state.discarded_items.items() for item in items)
+        found.extend((rule_id, vocabulary[item_id] if item_id >= 0 else None)
+                     for rule_id, item_id in zip(state.rule_ids, state.item_ids))
+        # Group by rule in lexicon order, keeping text order within a rule
+        # (discarded hits come first, as they were earlier in the text)
+        found.sort(key=itemgetter(0))
+        for rule_id, item in found:
+            category, display, _, mode = entries[rule_id]
+            if mode == MODE_CANDIDATE:
+                continue
+            if once[rule_id]:
+                if reported[rule_id]:
+                    continue
+                reported[rule_id] = 1
+            results[category].append(display if item is None else item)
+        return results
+
+    def discard_before(self, state, position, retained_items=RETAINED_ITEMS):
+        """
+        Drop the hits ending at or before a position, keeping what scoring needs.
+
+        Lets a long text be fed piece by piece in bounded memory: hits the
+        next pieces can no longer touch are folded into per-category
+        counts plus the first retained_items items of each entry. The
+        counts of category_counts() and the first retained_items items of
+        each category in results() stay the same; hits_between() no
+        longer finds the dropped hits. The state can still be fed with
+        text starting at or after position.
+
+        Args:
+            state (MatchState): Hits from feed()
+            position (int): Offset no later piece starts before
+            retained_items (int): Items kept per entry for results()
+        """
+        if state.discarded_counts is None:
+            state.discarded_counts = [0] * len(self.categories)
+            state.discarded_seen = bytearray(len(self._entries))
+            state.discarded_items = {}
+        counts = state.discarded_counts
+        seen = state.discarded_seen
+        discarded_items = state.discarded_items
+        rule_category = self._rule_category
+        once = self._once
+
+        kept = self.new_state()
+        renumbered = {}
+        for number, rule_id in enumerate(state.rule_ids):
+            if state.ends[number] > position:
+                # May still block or extend a match in the next piece
+                renumbered[number] = kept.add(rule_id, state.starts[number], state.ends[number],
+                                              state.item(number))
+                continue
+            if once[rule_id]:
+                if seen[rule_id]:
+                    continue
+                seen[rule_id] = 1
+            counts[rule_category[rule_id]] += 1
+            items = discarded_items.setdefault(rule_id, [])
+            if len(items) < retained_items:
+                items.append(state.item(number))
+
+        state.rule_ids, state.starts, state.ends, state.item_ids = kept.rule_ids, kept.starts, kept.ends, kept.item_ids
+        state.vocabulary, state.vocabulary_ids = kept.vocabulary, kept.vocabulary_ids
+        state.last_hit = {rule_id: renumbered[number] for rule_id, number in state.last_hit.items()
+                          if number in renumbered}
+
+    @staticmethod
+    def _try_entry(index, entry, text, pos, offset, state):
+        """Record a hit for one entry at a candidate position, if it matches."""
+        _, display, compiled, mode = entry
+        absolute = offset + pos
+        last = state.last_hit.get(index)
+
+        if mode != MODE_FINDALL:
+            # Regex entries reported by position; every distinct start is
+            # recorded once, even when re-scanned
+            if last is not None and absolute <= state.starts[last]:
+                return
+            match = compiled.match(text, pos)
+            if match is None:
+                return
+            state.last_hit[index] = state.add(index, absolute, offset + match.end())
+            return
+
+        if last is not None and absolute < state.ends[last]:
+            # Already covered by an earlier match; a re-scan of the same
+            # match may see more of it, so keep the furthest end
+            if absolute == state.starts[last] and compiled is not None:
+                match = compiled.match(text, pos)
+                if match is not None and offset + match.end() > state.ends[last]:
+                    state.ends[last] = offset + match.end()
+            return
+        if compiled is None:
+            match_end = pos + len(display)
+            item = None
+        else:
+            match = compiled.match(text, pos)
+            if match is None:
+                return
+            match_end = match.end()
+            groups = match.groups(default='')
+            if not groups:
+                item = match.group(0)
+            elif len(groups) == 1:
+                item = groups[0]
+            else:
+                item = ' '.join(groups)
+        # An empty match still blocks its own position, like re.findall
+        state.last_hit[index] = state.add(index, absolute, offset + max(match_end, pos + 1), item)
@@ -0,0 +1,300 @@
+"""
+Low-overhead in-process metrics with Prometheus text exposition.
+
+Counters and histograms are kept in plain dicts behind a lock. With
+several worker processes (e.g. gunicorn), set METRICS_DIR to a directory
+shared by the workers: each worker periodically writes its totals there
+and /metrics sums the files of all workers. The totals of workers that
+have exited are folded into one archive file, so counters keep growing
+across worker restarts without the directory filling up.
+"""
+
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no worker processes to coordinate
+    fcntl = None
+
+
+# Histogram buckets for latencies, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Histogram buckets for request sizes, in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name -> (type, help text, buckets)
+METRIC_DEFINITIONS = {
+    'fakenews_stage_duration_seconds': (
+        'histogram', 'Time spent in each analysis stage', LATENCY_BUCKETS),
+    'fakenews_request_duration_seconds': (
+        'histogram', 'Total request handling time per endpoint', LATENCY_BUCKETS),
+    'fakenews_request_size_bytes': (
+        'histogram', 'Request body size per endpoint', SIZE_BUCKETS),
+    'fakenews_issues_total': (
+        'counter', 'Detected issues by type', None),
+    'fakenews_labels_total': (
+        'counter', 'Analysis results by label', None),
+    'fakenews_cache_lookups_total': (
+        'counter', 'Result cache lookups by outcome', None),
+    'fakenews_errors_total': (
+        'counter', 'Failed requests by endpoint and status code', None),
+    'fakenews_page_fetches_total': (
+        'counter', 'Article page fetches by outcome', None),
+}
+
+# Minimum seconds between writes of this worker's totals to METRICS_DIR
+FLUSH_INTERVAL = 1.0
+
+# Totals of exited workers in METRICS_DIR
+ARCHIVE_FILE = 'metrics-archive.json'
+
+# Lock file serializing updates of the archive
+LOCK_FILE = 'metrics.lock'
+
+
+def _label_key(labels):
+    """Turn a labels dict into a hashable, ordered key."""
+    return tuple(sorted(labels.items()))
+
+
+def _pid_alive(pid):
+    """Check whether a process is still running (assumed so where it cannot be checked)."""
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_snapshot(path):
+    """Read a snapshot file, or None if it is missing or being replaced."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_snapshot(path, snapshot):
+    """Write a snapshot file atomically."""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    os.replace(temp_path, path)
+
+
+def _merge(counters, histograms, snapshot):
+    """Add a snapshot's totals to counters and histograms keyed by (name, labels)."""
+    for name, labels, value in snapshot['counters']:
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, data in snapshot['histograms']:
+        key = (name, tuple(map(tuple, labels)))
+        if key in histograms:
+            histograms[key] = [a + b for a, b in zip(histograms[key], data)]
+        else:
+            histograms[key] = data
+
+
+def _as_snapshot(counters, histograms):
+    """Turn merged totals back into the snapshot shape."""
+    return {
+        'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+        'histograms': [[name, labels, data] for (name, labels), data in histograms.items()]
+    }
+
+
+class MetricsRegistry:
+    """Counters and histograms for one process."""
+
+    def __init__(self, metrics_dir=None):
+        self.metrics_dir = metrics_dir
+        self._counters = {}     # (name, label key) -> value
+        self._histograms = {}   # (name, label key) -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._pending_flush = None  # Timer writing totals held back by the throttle
+        self._flush_lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        """Increase a counter."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Record one observation in a histogram."""
+        buckets = METRIC_DEFINITIONS[name][2]
+        key = (name, _label_key(labels))
+        with self._lock:
+            data = self._histograms.get(key)
+            if data is None:
+                data = self._histograms[key] = [0] * (len(buckets) + 3)
+            data[bisect.bisect_left(buckets, value)] += 1
+            data[-2] += value
+            data[-1] += 1
+        if self.metrics_dir:
+            self.flush()
+
+    def snapshot(self):
+        """
+        Get a JSON-serializable copy of this process's totals.
+
+        Returns:
+            dict: 'counters' and 'histograms' lists
+        """
+        with self._lock:
+            return {
+                'counters': [[name, list(map(list, labels)), value]
+                             for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(map(list, labels)), list(data)]
+                               for (name, labels), data in self._histograms.items()]
+            }
+
+    def flush(self, force=False):
+        """Write this process's totals to METRICS_DIR (throttled)."""
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL:
+            # Write them a little later, so an idle worker's last requests
+            # are not left out of /metrics
+            with self._lock:
+                if self._pending_flush is None:
+                    self._pending_flush = threading.Timer(FLUSH_INTERVAL, self._flush_pending)
+                    self._pending_flush.daemon = True
+                    self._pending_flush.start()
+            return
+        with self._flush_lock:
+            self._last_flush = now
+            _write_snapshot(os.path.join(self.metrics_dir, f'metrics-{os.getpid()}.json'), self.snapshot())
+
+    def _flush_pending(self):
+        """Write the totals held back by the throttle."""
+        with self._lock:
+            self._pending_flush = None
+        self.flush(force=True)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the lock on METRICS_DIR shared by all workers and the master."""
+        with open(os.path.join(self.metrics_dir, LOCK_FILE), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def retire(self, pid):
+        """
+        Fold the totals of an exited worker into the archive and remove its file.
+
+        Called by the gunicorn master when a worker exits; collect() does
+        the same for files of workers that are no longer running.
+
+        Args:
+            pid (int): Process id of the exited worker
+        """
+        if not self.metrics_dir:
+            return
+        with self._locked():
+            self._fold(pid)
+
+    def _fold(self, pid):
+        """Move a worker's totals into the archive (with the lock held)."""
+        path = os.path.join(self.metrics_dir, f'metrics-{pid}.json')
+        # A write cut short by the exit
+        if os.path.exists(path + '.tmp'):
+            os.remove(path + '.tmp')
+        snapshot = _read_snapshot(path)
+        if snapshot is None:
+            # Already retired by another process
+            return
+        archive_path = os.path.join(self.metrics_dir, ARCHIVE_FILE)
+        counters = {}
+        histograms = {}
+        archive = _read_snapshot(archive_path)
+        if archive is not None:
+            _merge(counters, histograms, archive)
+        _merge(counters, histograms, snapshot)
+        _write_snapshot(archive_path, _as_snapshot(counters, histograms))
+        os.remove(path)
+
+    def collect(self):
+        """
+        Get totals across all worker processes.
+
+        Returns:
+            dict: Merged snapshot (just this process without METRICS_DIR)
+        """
+        if not self.metrics_dir:
+            return self.snapshot()
+
+        self.flush(force=True)
+        counters = {}
+        histograms = {}
+        pattern = os.path.join(self.metrics_dir, 'metrics-[0-9]*.json')
+        # Under the lock, so a worker being retired is counted exactly once
+        with self._locked():
+            for path in glob.glob(pattern):
+                pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+                if not _pid_alive(pid):
+                    self._fold(pid)
+            for path in glob.glob(pattern) + [os.path.join(self.metrics_dir, ARCHIVE_FILE)]:
+                snapshot = _read_snapshot(path)
+                if snapshot is not None:
+                    _merge(counters, histograms, snapshot)
+        return _as_snapshot(counters, histograms)
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        snapshot = self.collect()
+        series = {}
+        for name, labels, value in snapshot['counters']:
+            series.setdefault(name, []).append((labels, value))
+        for name, labels, data in snapshot['histograms']:
+            series.setdefault(name, []).append((labels, data))
+
+        lines = []
+        for name, (metric_type, help_text, buckets) in METRIC_DEFINITIONS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in sorted(series.get(name, []), key=lambda item: list(item[0])):
+                if metric_type == 'counter':
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], value):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(labels, le=bound)} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {value[-2]}')
+                lines.append(f'{name}_count{_format_labels(labels)} {value[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels, le=None):
+    """Format label pairs as {a="1",b="2"}."""
+    pairs = [(key, value) for key, value in labels]
+    if le is not None:
+        pairs.append(('le', le))
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+# Registry for this process
+metrics = MetricsRegistry(os.environ.get('METRICS_DIR') or None)
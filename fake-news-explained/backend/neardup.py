@@ -0,0 +1,371 @@
+"""
+Near-duplicate index for analyzed texts.
+Lightly reworded copies of a story miss the exact-hash result cache, so
+texts are also indexed by a MinHash signature of their word shingles.
+Locality-sensitive hashing over signature bands finds earlier texts that
+are probably similar; their signatures then estimate the similarity.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # Signatures are then computed in Python, with the same values
+    np = None
+
+
+logger = logging.getLogger(__name__)
+
+# Words per shingle (at most one per word multiplier below)
+SHINGLE_SIZE = 3
+
+# Signature length; BANDS * ROWS_PER_BAND must equal NUM_HASHES
+NUM_HASHES = 64
+BANDS = 16
+ROWS_PER_BAND = 4
+
+# Texts with fewer shingles than this are not indexed (too short to compare)
+MIN_SHINGLES = 8
+
+# Seconds between snapshots written by the background thread
+SNAPSHOT_INTERVAL = 60.0
+
+# Bumped when the snapshot layout, the hashing or the shape of stored results changes
+SNAPSHOT_FORMAT = 4
+
+# Odd 64-bit constants mixing the hashes of a shingle's words by position,
+# and the final multiplier spreading the mixed bits
+WORD_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9)
+FINAL_MULTIPLIER = 0xFF51AFD7ED558CCD
+_MASK = (1 << 64) - 1
+
+
+def shingle_hashes(text_lower, size=SHINGLE_SIZE):
+    """
+    Hash the word n-grams of a lowercased text.
+
+    Each distinct word is hashed once (CRC-32, in C); the hash of a
+    shingle mixes the hashes of its words with 64-bit multiplications, so
+    no n-gram strings are built. With NumPy the mixing runs vectorized,
+    otherwise the same values are computed in Python.
+
+    Args:
+        text_lower (str): Lowercased text
+        size (int): Words per shingle
+
+    Returns:
+        NumPy uint64 array or list: One hash per shingle position
+        (repeated shingles repeat their hash, which MinHash ignores)
+    """
+    words = text_lower.split()
+    count = max(len(words) - size + 1, 0)
+    word_hash = {word: zlib.crc32(word.encode('utf-8')) for word in set(words)}
+    hashes = [word_hash[word] for word in words]
+
+    if np is not None:
+        hashes = np.array(hashes, dtype=np.uint64)
+        mixed = np.zeros(count, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for position in range(size):
+                mixed ^= hashes[position:position + count] * np.uint64(WORD_MULTIPLIERS[position])
+            mixed *= np.uint64(FINAL_MULTIPLIER)
+        return mixed ^ (mixed >> np.uint64(29))
+
+    mixed = [0] * count
+    for position in range(size):
+        multiplier = WORD_MULTIPLIERS[position]
+        mixed = [value ^ (word * multiplier & _MASK) for value, word in zip(mixed, hashes[position:])]
+    mixed = [value * FINAL_MULTIPLIER & _MASK for value in mixed]
+    return [value ^ (value >> 29) for value in mixed]
+
+
+def minhash_signature(hashes, num_hashes=NUM_HASHES):
+    """
+    Compute a MinHash signature with one-permutation hashing.
+
+    Each shingle hash picks one of num_hashes bins and the bin keeps its
+    smallest value. Empty bins borrow from the next non-empty bin, so two
+    signatures agree in a bin with probability equal to the Jaccard
+    similarity of the shingle sets. Costs one hash per shingle instead of
+    one per shingle and bin.
+
+    Args:
+        hashes (NumPy array or list): From shingle_hashes
+        num_hashes (int): Signature length
+
+    Returns:
+        list: num_hashes integers (empty list for no shingles)
+    """
+    if not len(hashes):
+        return []
+    empty = 1 << 64
+    if np is not None:
+        filled = np.full(num_hashes, _MASK, dtype=np.uint64)
+        np.minimum.at(filled, (hashes % np.uint64(num_hashes)).astype(np.intp), hashes // np.uint64(num_hashes))
+        bins = [value if value != _MASK else empty for value in filled.tolist()]
+    else:
+        bins = [empty] * num_hashes
+        for value in hashes:
+            index = value % num_hashes
+            value //= num_hashes
+            if value < bins[index]:
+                bins[index] = value
+
+    # Densify: fill each empty bin from the next non-empty one, with an
+    # offset per distance so borrowed values differ from the originals
+    signature = list(bins)
+    for index in range(num_hashes):
+        if bins[index] == empty:
+            distance = 1
+            while bins[(index + distance) % num_hashes] == empty:
+                distance += 1
+            signature[index] = bins[(index + distance) % num_hashes] + distance * empty
+    return signature
+
+
+def estimate_similarity(first, second):
+    """Estimate the Jaccard similarity of two texts from their signatures."""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+
+class NearDuplicateIndex:
+    """
+    Bounded LSH index of analyzed texts with clusters of near-duplicates.
+
+    Each entry keeps its signature, its result, the penalties it was
+    scored with and a cluster id; a text similar enough to an existing
+    entry joins that entry's cluster. Least recently used entries are
+    evicted beyond max_entries. With a snapshot_path the index is loaded
+    from disk, and a background thread saves it every SNAPSHOT_INTERVAL
+    seconds when it changed.
+    """
+
+    def __init__(self, threshold=0.85, max_entries=5000, snapshot_path=None,
+                 num_hashes=NUM_HASHES, bands=BANDS):
+        if num_hashes % bands:
+            raise ValueError('num_hashes must be a multiple of bands')
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.snapshot_path = snapshot_path
+        self.num_hashes = num_hashes
+        self.bands = bands
+        self.rows = num_hashes // bands
+        self._entries = OrderedDict()   # id -> {'signature', 'result', 'penalties', 'cluster', 'version'}
+        self._buckets = {}              # band hash -> set of ids
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saver_pid = None
+        if snapshot_path:
+            self.load()
+
+    def signature(self, cleaned_text):
+        """
+        Get the signature of a cleaned text.
+
+        Returns:
+            list or None: Signature, or None if the text is too short to index
+        """
+        hashes = shingle_hashes(cleaned_text.lower())
+        if len(hashes) < MIN_SHINGLES:
+            return None
+        return minhash_signature(hashes, self.num_hashes)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hash((band,) + tuple(signature[band * rows:(band + 1) * rows]))
+                for band in range(self.bands)]
+
+    def find(self, signature, version, limit=5):
+        """
+        Find indexed texts similar to a signature.
+
+        Args:
+            signature (list): From signature()
+            version (str): Ruleset version results must have been produced with
+            limit (int): Maximum number of matches
+
+        Returns:
+            list: (similarity, entry id) pairs at or above the threshold, best first
+        """
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            matches = []
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry['version'] != version:
+                    continue
+                similarity = estimate_similarity(signature, entry['signature'])
+                if similarity >= self.threshold:
+                    matches.append((similarity, entry_id))
+            matches.sort(reverse=True)
+            return matches[:limit]
+
+    def get(self, entry_id):
+        """Return an entry (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is not None:
+                self._entries.move_to_end(entry_id)
+            return entry
+
+    def add(self, entry_id, signature, result, version, matches=(), penalties=()):
+        """
+        Index an analyzed text.
+
+        Args:
+            entry_id (str): Id of the text (e.g. its cache key)
+            signature (list): From signature()
+            result (dict): Analysis result
+            version (str): Ruleset version of the result
+            matches (list): Output of find() for this signature
+            penalties (list): (issue type, penalty) pairs the text was scored with
+
+        Returns:
+            str: Cluster id the text was placed in
+        """
+        with self._lock:
+            cluster = entry_id
+            for _, match_id in matches:
+                if match_id in self._entries:
+                    cluster = self._entries[match_id]['cluster']
+                    break
+
+            if entry_id in self._entries:
+                self._remove(entry_id)
+            self._entries[entry_id] = {
+                'signature': signature, 'result': result, 'penalties': [list(pair) for pair in penalties],
+                'cluster': cluster, 'version': version
+            }
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self._dirty = True
+
+        if self.snapshot_path:
+            self._ensure_saver()
+        return cluster
+
+    def _ensure_saver(self):
+        """Start the thread saving snapshots in this process if not running yet."""
+        pid = os.getpid()
+        if self._saver_pid == pid:
+            return
+        with self._lock:
+            if self._saver_pid == pid:
+                return
+            threading.Thread(target=self._save_periodically, daemon=True).start()
+            self._saver_pid = pid
+
+    def _save_periodically(self):
+        """Saver loop: write a snapshot every SNAPSHOT_INTERVAL seconds."""
+        while True:
+            time.sleep(SNAPSHOT_INTERVAL)
+            self.save()
+
+    def _remove(self, entry_id):
+        """Drop an entry and its bucket memberships (lock held)."""
+        entry = self._entries.pop(entry_id)
+        for key in self._band_keys(entry['signature']):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def stats(self):
+        """Return the number of entries and clusters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'clusters': len({entry['cluster'] for entry in self._entries.values()}),
+                'max_entries': self.max_entries,
+                'threshold': self.threshold
+            }
+
+    def save(self):
+        """Write a snapshot of the index to snapshot_path (atomically)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {
+                'format': SNAPSHOT_FORMAT,
+                'num_hashes': self.num_hashes,
+                'bands': self.bands,
+                'shingle_size': SHINGLE_SIZE,
+                'entries': [[entry_id, entry['cluster'], entry['version'], entry['signature'], entry['result'],
+                             entry['penalties']]
+                            for entry_id, entry in self._entries.items()]
+            }
+            self._dirty = False
+        temp_path = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning('Could not save near-duplicate snapshot %s: %s', self.snapshot_path, e)
+
+    def load(self):
+        """Load entries from snapshot_path, if it exists and is compatible."""
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning('Ignoring unreadable near-duplicate snapshot %s: %s', self.snapshot_path, e)
+            return
+
+        layout = (snapshot.get('format'), snapshot.get('num_hashes'), snapshot.get('bands'),
+                  snapshot.get('shingle_size'))
+        if layout != (SNAPSHOT_FORMAT, self.num_hashes, self.bands, SHINGLE_SIZE):
+            logger.warning('Ignoring near-duplicate snapshot %s with different settings', self.snapshot_path)
+            return
+
+        with self._lock:
+            for entry_id, cluster, version, signature, result, penalties in snapshot['entries'][-self.max_entries:]:
+                self._entries[entry_id] = {
+                    'signature': signature, 'result': result, 'penalties': penalties,
+                    'cluster': cluster, 'version': version
+                }
+                for key in self._band_keys(signature):
+                    self._buckets.setdefault(key, set()).add(entry_id)
+
+
+def create_index_from_env():
+    """
+    Build the near-duplicate index configured by environment variables.
+
+    NEAR_DUPLICATE_INDEX: "1" to enable, "0" (default) to disable
+    NEAR_DUPLICATE_THRESHOLD: Estimated similarity needed to reuse a result (default 0.85)
+    NEAR_DUPLICATE_SIZE: Maximum number of indexed texts (default 5000)
+    NEAR_DUPLICATE_PATH: Snapshot file (default none: the index is kept in
+                         memory only). Each process saves its own index, so
+                         only set it for a single process.
+
+    Returns:
+        NearDuplicateIndex or None: The index, or None when disabled
+    """
+    if os.environ.get('NEAR_DUPLICATE_INDEX', '0') != '1':
+        return None
+    snapshot_path = os.environ.get('NEAR_DUPLICATE_PATH') or None
+    index = NearDuplicateIndex(
+        threshold=float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.85)),
+        max_entries=int(os.environ.get('NEAR_DUPLICATE_SIZE', 5000)),
+        snapshot_path=snapshot_path
+    )
+    if snapshot_path:
+        atexit.register(index.save)
+    return index
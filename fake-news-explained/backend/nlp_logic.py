@@ -3,309 +3,470 @@ Core NLP logic for fake news detection.
 Contains functions for text analysis and trust score calculation.
 """
 
-import re
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
-
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab', quiet=True)
-
-
-# Fake news indicator patterns
-CLICKBAIT_PHRASES = [
-    "you won't believe",
-    "shocking",
-    "breaking",
-    "this will blow your mind",
-    "doctors hate",
-    "one weird trick",
-    "what happens next",
-    "share before",
-    "spread this",
-    "they don't want you to know",
-    "the truth about",
-    "secret revealed",
-    "must see",
-    "going viral",
-    "share now",
-    "deleted soon",
-    "banned",
-    "censored",
-    "mainstream media won't tell you"
-]
-
-EMOTIONAL_WORDS = [
-    "outrageous", "unbelievable", "terrifying", "horrifying",
-    "devastating", "shocking", "explosive", "bombshell",
-    "insane", "crazy", "ridiculous", "disgusting",
-    "amazing", "incredible", "miraculous", "stunning"
-]
-
-EXTREME_CLAIM_PATTERNS = [
-    r"cure[sd]?\s+(all|every|any)",
-    r"(100%|completely)\s+(safe|effective|proven)",
-    r"(never|always)\s+\w+",
-    r"(all|every)\s+\w+\s+(are|is|will)",
-    r"(instantly|immediately)\s+(cure|heal|fix|solve)",
-    r"(miracle|magic)\s+\w+",
-    r"(scientists|doctors|experts)\s+(shocked|amazed|stunned)",
-    r"exposed|exposed!",
-    r"exposed|exposed!",
-]
-
-URGENCY_PATTERNS = [
-    r"act now",
-    r"limited time",
-    r"before it's too late",
-    r"hurry",
-    r"don't wait",
-    r"urgent",
-    r"immediately",
-    r"right now",
-    r"while you still can",
-    r"before they delete",
-    r"share before"
-]
-
-MISSING_SOURCE_INDICATORS = [
-    "sources say",
-    "people are saying",
-    "everyone knows",
-    "it is known",
-    "many believe",
-    "some say",
-    "reportedly",
-    "allegedly",
-    "rumor has it",
-    "anonymous sources"
-]
+import json
+import logging
+import os
+import threading
+from functools import cached_property
 
+from ruleset import get_ruleset, get_language_managers, route_ruleset
+from language import DEFAULT_LANGUAGE, UNDETERMINED
+from classifier import get_model
+from utils import as_context
 
-def preprocess_text(text):
+# Scoring traces are emitted at DEBUG level on this logger
+logger = logging.getLogger(__name__)
+
+
+# NLTK data used for tokenization, resolved lazily on first use.
+# Set NLTK_AUTO_DOWNLOAD=1 to download missing data, or NLTK_REQUIRE_DATA=1
+# to fail instead of falling back to whitespace tokenization.
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+    'stopwords': 'corpora/stopwords'
+}
+
+# NLTK stopword lists by language code
+STOPWORD_LANGUAGES = {
+    'ar': 'arabic', 'da': 'danish', 'de': 'german', 'el': 'greek', 'en': 'english', 'es': 'spanish',
+    'fi': 'finnish', 'fr': 'french', 'hu': 'hungarian', 'id': 'indonesian', 'it': 'italian',
+    'nl': 'dutch', 'no': 'norwegian', 'pt': 'portuguese', 'ro': 'romanian', 'ru': 'russian',
+    'sv': 'swedish', 'tr': 'turkish'
+}
+
+_nltk_state = None
+_nltk_lock = threading.Lock()
+_stopword_sets = {}
+
+
+def _resolve_nltk_resources(require):
+    """Import NLTK and look up its data files, without touching the network by default."""
+    state = {'word_tokenize': None, 'stopwords': None, 'missing': []}
+    
+    try:
+        import nltk
+    except ImportError:
+        state['missing'] = list(NLTK_RESOURCES)
+    else:
+        auto_download = os.environ.get('NLTK_AUTO_DOWNLOAD') == '1'
+        for name, path in NLTK_RESOURCES.items():
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                if not (auto_download and nltk.download(name, quiet=True)):
+                    state['missing'].append(name)
+        
+        # Older NLTK releases tokenize with punkt, newer ones with punkt_tab
+        if 'punkt' not in state['missing'] or 'punkt_tab' not in state['missing']:
+            from nltk.tokenize import word_tokenize
+            state['word_tokenize'] = word_tokenize
+        
+        if 'stopwords' not in state['missing']:
+            from nltk.corpus import stopwords
+            state['stopwords'] = frozenset(stopwords.words('english'))
+    
+    if state['word_tokenize'] is None or state['stopwords'] is None:
+        message = (
+            f"NLTK data not available ({', '.join(state['missing'])}). "
+            "Install it with: python -c \"import nltk; nltk.download('punkt'); "
+            "nltk.download('stopwords'); nltk.download('punkt_tab')\""
+        )
+        if require:
+            raise RuntimeError(message)
+        logger.warning('%s. Falling back to whitespace tokenization.', message)
+    
+    return state
+
+
+def load_nltk_resources(require=None):
     """
-    Preprocess text for NLP analysis.
+    Resolve NLTK tokenizer and stopwords once per process.
     
     Args:
-        text (str): Raw input text
+        require (bool): Raise if data is missing instead of falling back.
+                        Defaults to the NLTK_REQUIRE_DATA environment variable.
         
     Returns:
-        dict: Preprocessed text data including tokens and lowercase version
+        dict: 'word_tokenize' (callable or None), 'stopwords' (frozenset or None)
+              and 'missing' (list of unavailable resource names)
     """
-    # Lowercase version
-    text_lower = text.lower()
+    global _nltk_state
     
-    # Tokenize
-    try:
-        tokens = word_tokenize(text_lower)
-    except:
-        tokens = text_lower.split()
+    if _nltk_state is None:
+        if require is None:
+            require = os.environ.get('NLTK_REQUIRE_DATA') == '1'
+        with _nltk_lock:
+            if _nltk_state is None:
+                _nltk_state = _resolve_nltk_resources(require)
     
-    # Remove stopwords
-    try:
-        stop_words = set(stopwords.words('english'))
-        filtered_tokens = [t for t in tokens if t not in stop_words and t.isalpha()]
-    except:
-        filtered_tokens = [t for t in tokens if t.isalpha()]
+    return _nltk_state
+
+
+def preload():
+    """
+    Load all NLP state up front.
     
-    return {
-        'original': text,
-        'lowercase': text_lower,
-        'tokens': tokens,
-        'filtered_tokens': filtered_tokens
-    }
+    Call this in a prefork server's master process (e.g. a gunicorn
+    on_starting hook) so workers inherit the loaded data instead of
+    each resolving it on their first request. The optional model is
+    memory-mapped, so the workers share its pages as well.
+    """
+    load_nltk_resources()
+    get_ruleset()
+    get_language_managers()
+    get_model()
+
+
+def get_stopwords(language=DEFAULT_LANGUAGE):
+    """
+    Get the stopword set for a language.
+    
+    Args:
+        language (str): Language code; undetermined texts use the English list
+        
+    Returns:
+        frozenset or None: Stopwords, loaded once per process and language,
+        or None if the NLTK corpus has no list for the language
+    """
+    if language in (DEFAULT_LANGUAGE, UNDETERMINED):
+        return load_nltk_resources()['stopwords']
+    if language not in _stopword_sets:
+        words = None
+        if language in STOPWORD_LANGUAGES and load_nltk_resources()['stopwords'] is not None:
+            from nltk.corpus import stopwords
+            try:
+                words = frozenset(stopwords.words(STOPWORD_LANGUAGES[language]))
+            except (LookupError, OSError):
+                pass
+        _stopword_sets[language] = words
+    return _stopword_sets[language]
+
+
+class ProcessedText:
+    """
+    Lazily evaluated view of a text for NLP analysis.
+    
+    The lowercase form comes from the shared AnalysisContext; tokens and
+    filtered tokens are only computed the first time a detector asks for
+    them. Supports item access (processed['tokens']) for dict-style callers.
+    """
+    
+    def __init__(self, text):
+        self.context = as_context(text)
+        self.original = self.context.text
+    
+    @property
+    def lowercase(self):
+        """Lowercase form of the text."""
+        return self.context.lowercase
+    
+    @cached_property
+    def tokens(self):
+        """Word tokens of the lowercase text."""
+        word_tokenize = load_nltk_resources()['word_tokenize']
+        if word_tokenize is not None:
+            try:
+                return word_tokenize(self.lowercase)
+            except Exception:
+                pass
+        return self.lowercase.split()
+    
+    @cached_property
+    def filtered_tokens(self):
+        """Alphabetic tokens with the stopwords of the text's language removed."""
+        stop_words = get_stopwords(self.context.language)
+        if stop_words is not None:
+            return [t for t in self.tokens if t not in stop_words and t.isalpha()]
+        return [t for t in self.tokens if t.isalpha()]
+    
+    def __getitem__(self, key):
+        if key not in ('original', 'lowercase', 'tokens', 'filtered_tokens'):
+            raise KeyError(key)
+        return getattr(self, key)
+
+
+def preprocess_text(text):
+    """
+    Preprocess text for NLP analysis.
+    
+    Args:
+        text (str or AnalysisContext): Raw input text
+        
+    Returns:
+        ProcessedText: Lowercase version plus lazily computed tokens
+    """
+    return ProcessedText(text)
+
+
+def scan_indicators(text_lower, ruleset=None):
+    """
+    Detect every indicator category in a single pass over the text.
+    
+    Args:
+        text_lower (str): Lowercased text to scan
+        ruleset (Ruleset): Rules to apply (defaults to the active ruleset)
+        
+    Returns:
+        dict: Issue type -> list of matched phrases/patterns
+    """
+    return (ruleset or get_ruleset()).matcher.scan(text_lower)
 
 
 def detect_clickbait(text_lower):
     """Detect clickbait phrases in text."""
-    found = []
-    for phrase in CLICKBAIT_PHRASES:
-        if phrase in text_lower:
-            found.append(phrase)
-    return found
+    return scan_indicators(text_lower)['clickbait']
 
 
 def detect_emotional_language(text_lower):
     """Detect emotional and sensational words."""
-    found = []
-    for word in EMOTIONAL_WORDS:
-        if word in text_lower:
-            found.append(word)
-    return found
+    return scan_indicators(text_lower)['emotional_language']
 
 
 def detect_extreme_claims(text):
     """Detect extreme and absolute claims using regex patterns."""
-    found = []
-    text_lower = text.lower()
-    
-    for pattern in EXTREME_CLAIM_PATTERNS:
-        matches = re.findall(pattern, text_lower)
-        if matches:
-            found.extend(matches if isinstance(matches[0], str) else [' '.join(m) for m in matches])
-    
-    return found
+    return scan_indicators(text.lower())['extreme_claims']
 
 
 def detect_urgency(text_lower):
     """Detect urgency language patterns."""
-    found = []
-    for pattern in URGENCY_PATTERNS:
-        if re.search(pattern, text_lower):
-            found.append(pattern)
-    return found
+    return scan_indicators(text_lower)['urgency']
 
 
 def detect_missing_sources(text_lower):
     """Detect vague source attribution."""
-    found = []
-    for indicator in MISSING_SOURCE_INDICATORS:
-        if indicator in text_lower:
-            found.append(indicator)
-    return found
+    return scan_indicators(text_lower)['missing_sources']
 
 
 def count_caps_and_exclamations(text):
     """Count excessive capitalization and punctuation."""
+    context = as_context(text)
+    
     # Count all-caps words
-    words = text.split()
-    caps_count = sum(1 for w in words if w.isupper() and len(w) > 2)
+    caps_count = sum(1 for w in context.words if w.isupper() and len(w) > 2)
     
     # Count exclamation marks
-    exclaim_count = text.count('!')
+    exclaim_count = context.text.count('!')
     
     return caps_count, exclaim_count
 
 
-def calculate_trust_score(text):
+def calculate_trust_score(text, trace=False, ruleset=None):
     """
     Calculate trust score for the given text.
     
+    The text's language is identified first; it is scored with the
+    ruleset written for that language, or by the counted rules only
+    (capitals, exclamation marks) when no ruleset covers it.
+    
     Args:
-        text (str): News text to analyze
+        text (str or AnalysisContext): News text to analyze
+        trace (bool): Include the step-by-step scoring trace in the result
+        ruleset (Ruleset): Rules to apply (defaults to the ruleset for the
+                           text's language)
         
     Returns:
-        dict: Analysis results including score, label, and detected issues
+        dict: Analysis results including score, label, language and detected
+              issues (plus 'trace' when requested)
+    """
+    return score_text(text, trace=trace, ruleset=ruleset).as_dict()
+
+
+def score_text(text, trace=False, ruleset=None):
+    """
+    Score text, keeping the detected indicators in compact form.
+    
+    Args:
+        text (str or AnalysisContext): News text to analyze
+        trace (bool): Record the step-by-step scoring trace
+        ruleset (Ruleset): Rules to apply (defaults to the ruleset for the
+                           text's language)
+        
+    Returns:
+        Scoring: Score, label and penalties
+    """
+    context = as_context(text)
+    ruleset, supported = route_ruleset(context.language, ruleset)
+    
+    # Find all lexicon indicators in one pass, unless the lexicons are
+    # written for another language
+    if supported:
+        hits = ruleset.matcher.scan_state(context.lowercase)
+    else:
+        hits = ruleset.matcher.new_state()
+    caps_count, exclaim_count = count_caps_and_exclamations(context)
+    
+    scoring = score_hits(hits, caps_count, exclaim_count, trace=trace, ruleset=ruleset)
+    scoring.language = context.language
+    return scoring
+
+
+class Scoring:
+    """
+    Result of scoring one text.
+    
+    Penalties are kept as (issue type, penalty) pairs next to the raw
+    matcher hits; the per-issue dicts with matched items are only built
+    when something asks for them (the general explanations fallback, the
+    trace, or callers of calculate_trust_score).
     """
-    processed = preprocess_text(text)
-    text_lower = processed['lowercase']
+    
+    __slots__ = ('score', 'label', 'penalties', 'hits', 'caps_count', 'exclaim_count',
+                 'ruleset', 'language', 'trace', '_issues')
+    
+    def __init__(self, score, label, penalties, hits, caps_count, exclaim_count, ruleset):
+        self.score = score
+        self.label = label
+        self.penalties = penalties
+        self.hits = hits
+        self.caps_count = caps_count
+        self.exclaim_count = exclaim_count
+        self.ruleset = ruleset
+        self.language = None
+        self.trace = None
+        self._issues = None
+    
+    @property
+    def issue_types(self):
+        """Types of the detected issues, in scoring order."""
+        return [issue_type for issue_type, _ in self.penalties]
+    
+    @property
+    def issues(self):
+        """Detected issues as dicts with type, items or count, and penalty."""
+        if self._issues is None:
+            found = self.ruleset.matcher.results(self.hits) if self.hits is not None else {}
+            counts = {'excessive_caps': self.caps_count, 'excessive_exclamations': self.exclaim_count}
+            self._issues = []
+            for issue_type, penalty in self.penalties:
+                if issue_type in counts:
+                    self._issues.append({'type': issue_type, 'count': counts[issue_type], 'penalty': penalty})
+                else:
+                    self._issues.append({'type': issue_type, 'items': found[issue_type], 'penalty': penalty})
+        return self._issues
+    
+    def as_dict(self):
+        """Return the result in the calculate_trust_score shape."""
+        result = {
+            'score': self.score,
+            'label': self.label,
+            'issues': self.issues
+        }
+        if self.language is not None:
+            result['language'] = self.language
+        if self.trace is not None:
+            result['trace'] = self.trace
+        return result
+
+
+def label_for_score(score, ruleset=None):
+    """
+    Get the label for a trust score.
+    
+    Args:
+        score (int): Trust score (0-100)
+        ruleset (Ruleset): Rules holding the label thresholds (defaults to the active ruleset)
+        
+    Returns:
+        str: Likely Real, Unverified or Likely Fake
+    """
+    thresholds = (ruleset or get_ruleset()).label_thresholds
+    if score >= thresholds['likely_real']:
+        return "Likely Real"
+    if score >= thresholds['unverified']:
+        return "Unverified"
+    return "Likely Fake"
+
+
+def score_hits(hits, caps_count, exclaim_count, trace=False, ruleset=None):
+    """
+    Turn matcher hits into a trust score and label.
+    
+    Penalties only depend on how many hits each issue type has, so the
+    hits are counted per category without materializing any item lists.
+    
+    Args:
+        hits (MatchState): Hits from the ruleset's matcher
+        caps_count (int): Number of all-caps words
+        exclaim_count (int): Number of exclamation marks
+        trace (bool): Record the step-by-step scoring trace
+        ruleset (Ruleset): Rules to apply (defaults to the active ruleset)
+        
+    Returns:
+        Scoring: Score, label and penalties
+    """
+    ruleset = ruleset or get_ruleset()
+    counts = ruleset.matcher.category_counts(hits)
+    return score_counts(counts, caps_count, exclaim_count, trace=trace, ruleset=ruleset, hits=hits)
+
+
+def score_counts(counts, caps_count, exclaim_count, trace=False, ruleset=None, hits=None):
+    """
+    Turn per-category hit counts into a trust score and label.
+    
+    Args:
+        counts (list): Hit counts, aligned with the matcher's categories
+        caps_count (int): Number of all-caps words
+        exclaim_count (int): Number of exclamation marks
+        trace (bool): Record the step-by-step scoring trace
+        ruleset (Ruleset): Rules to apply (defaults to the active ruleset)
+        hits (MatchState): Hits the counts come from, for the matched items
+                           of the trace and of Scoring.issues (the caller may
+                           set Scoring.hits later instead)
+        
+    Returns:
+        Scoring: Score, label and penalties
+    """
+    ruleset = ruleset or get_ruleset()
+    matcher = ruleset.matcher
     
     # Initialize score at 100 (most trustworthy)
     score = 100
-    issues = []
+    penalties = []
     
-    print(f"Initial score: {score}")
+    # Scoring steps are only recorded when asked for or when DEBUG logging is on
+    steps = [] if trace or logger.isEnabledFor(logging.DEBUG) else None
+    found = matcher.results(hits) if steps is not None and hits is not None else None
     
-    # Check for clickbait (-15 points per phrase, max -30)
-    clickbait = detect_clickbait(text_lower)
-    if clickbait:
-        penalty = min(len(clickbait) * 15, 30)
-        score -= penalty
-        print(f"Clickbait detected: {clickbait}, Penalty: {penalty}, New score: {score}")
-        issues.append({
-            'type': 'clickbait',
-            'items': clickbait,
-            'penalty': penalty
-        })
-    
-    # Check for emotional language (-10 points per word, max -25)
-    emotional = detect_emotional_language(text_lower)
-    if emotional:
-        penalty = min(len(emotional) * 10, 25)
-        score -= penalty
-        print(f"Emotional language detected: {emotional}, Penalty: {penalty}, New score: {score}")
-        issues.append({
-            'type': 'emotional_language',
-            'items': emotional,
-            'penalty': penalty
-        })
-    
-    # Check for extreme claims (-20 points per claim, max -40)
-    extreme = detect_extreme_claims(text)
-    if extreme:
-        penalty = min(len(extreme) * 20, 40)
+    # Lexicon indicators: a fixed penalty per item, capped per type
+    counts = dict(zip(matcher.categories, counts))
+    for rule in ruleset.indicators:
+        count = counts[rule['type']]
+        if not count:
+            continue
+        penalty = min(count * rule['penalty'], rule['max_penalty'])
         score -= penalty
-        print(f"Extreme claims detected: {extreme}, Penalty: {penalty}, New score: {score}")
-        issues.append({
-            'type': 'extreme_claims',
-            'items': extreme,
-            'penalty': penalty
-        })
-    
-    # Check for urgency language (-10 points per pattern, max -20)
-    urgency = detect_urgency(text_lower)
-    if urgency:
-        penalty = min(len(urgency) * 10, 20)
-        score -= penalty
-        print(f"Urgency detected: {urgency}, Penalty: {penalty}, New score: {score}")
-        issues.append({
-            'type': 'urgency',
-            'items': urgency,
-            'penalty': penalty
-        })
-    
-    # Check for missing/vague sources (-15 points per indicator, max -25)
-    missing_sources = detect_missing_sources(text_lower)
-    if missing_sources:
-        penalty = min(len(missing_sources) * 15, 25)
-        score -= penalty
-        print(f"Missing sources detected: {missing_sources}, Penalty: {penalty}, New score: {score}")
-        issues.append({
-            'type': 'missing_sources',
-            'items': missing_sources,
-            'penalty': penalty
-        })
+        if steps is not None:
+            if found is not None:
+                steps.append({'type': rule['type'], 'items': found[rule['type']], 'penalty': penalty,
+                              'score': score})
+            else:
+                steps.append({'type': rule['type'], 'count': count, 'penalty': penalty, 'score': score})
+        penalties.append((rule['type'], penalty))
     
     # Check for excessive caps and exclamations
-    caps_count, exclaim_count = count_caps_and_exclamations(text)
-    
-    if caps_count > 3:
-        penalty = min((caps_count - 3) * 5, 15)
-        score -= penalty
-        print(f"Excessive caps: {caps_count}, Penalty: {penalty}, New score: {score}")
-        issues.append({
-            'type': 'excessive_caps',
-            'count': caps_count,
-            'penalty': penalty
-        })
-    
-    if exclaim_count > 2:
-        penalty = min((exclaim_count - 2) * 5, 15)
+    for issue_type, count in (('excessive_caps', caps_count), ('excessive_exclamations', exclaim_count)):
+        rule = ruleset.data[issue_type]
+        if count <= rule['threshold']:
+            continue
+        penalty = min((count - rule['threshold']) * rule['penalty'], rule['max_penalty'])
         score -= penalty
-        print(f"Excessive exclamations: {exclaim_count}, Penalty: {penalty}, New score: {score}")
-        issues.append({
-            'type': 'excessive_exclamations',
-            'count': exclaim_count,
-            'penalty': penalty
-        })
+        if steps is not None:
+            steps.append({'type': issue_type, 'count': count, 'penalty': penalty, 'score': score})
+        penalties.append((issue_type, penalty))
     
     # Ensure score is within bounds
     score = max(0, min(100, score))
-    print(f"Final score: {score}")
     
     # Determine label
-    if score >= 70:
-        label = "Likely Real"
-    elif score >= 40:
-        label = "Unverified"
-    else:
-        label = "Likely Fake"
+    label = label_for_score(score, ruleset)
+    
+    scoring = Scoring(score, label, penalties, hits, caps_count, exclaim_count, ruleset)
+    
+    if steps is not None:
+        record = {'initial_score': 100, 'steps': steps, 'final_score': score, 'label': label}
+        logger.debug('scoring trace %s', json.dumps(record))
+        if trace:
+            scoring.trace = record
     
-    return {
-        'score': score,
-        'label': label,
-        'issues': issues
-    }
+    return scoring
@@ -0,0 +1,133 @@
+"""
+Analysis pipeline shared by the API, streaming and bulk scoring tools.
+Identifies the language, then runs scoring, explanations, source
+suggestions and summary on cleaned text.
+"""
+
+import time
+
+from utils import as_context
+from language import UNDETERMINED
+from ruleset import route_ruleset
+from nlp_logic import score_text, label_for_score
+from classifier import get_model, blend_score
+from explanation_engine import (
+    MAX_EXPLANATIONS, may_flag_sentences, explain_sentences, explain_issues, create_summary
+)
+from source_suggester import categorize_content, suggest_sources_for_categories, get_source_names
+
+
+def run_pipeline(cleaned_text, trace=False, stats=None, ruleset=None, region=None, fake_probability=None,
+                 similar=None):
+    """
+    Analyze cleaned text with every pipeline stage.
+    
+    Args:
+        cleaned_text (str or AnalysisContext): Output of utils.clean_text
+        trace (bool): Attach the scoring trace to the result
+        stats (dict): If given, filled with 'stages' (stage -> seconds),
+                      'issue_types' (list of detected issue types),
+                      'penalties' ((issue type, penalty) pairs) and
+                      'reused' (whether similar's sources were reused)
+        ruleset (Ruleset): Rules to apply (defaults to the ruleset for the
+                           text's language)
+        region (str): Preferred region of the suggested sources, or None
+        fake_probability (float): Model verdict computed for a whole batch
+                                  (scored here when a model is configured)
+        similar (tuple): (penalties, result) of a near-duplicate analyzed
+                         earlier. The text is always scored and explained
+                         itself; when it gets the same penalties and label,
+                         the near-duplicate's suggested sources are reused.
+        
+    Returns:
+        dict: Analysis result in the /analyze response shape
+    """
+    started = time.perf_counter()
+    
+    # Shared lowercase form, words, sentences and language for every stage
+    context = as_context(cleaned_text)
+    
+    # One ruleset for every stage, even if a reload happens meanwhile. Its
+    # lexicons, sentence patterns and keywords are skipped for texts in a
+    # language they are not written for.
+    ruleset, supported = route_ruleset(context.language, ruleset)
+    
+    # Calculate trust score and get issues
+    scoring = score_text(context, trace=trace, ruleset=ruleset)
+    trust_score = scoring.score
+    label = scoring.label
+    scored = time.perf_counter()
+    
+    # Blend in the statistical model, when one is configured
+    model = get_model()
+    batched = fake_probability is not None
+    if model is not None:
+        if not batched:
+            fake_probability = model.fake_probabilities([context.lowercase])[0]
+        trust_score = blend_score(scoring.score, fake_probability, model.weight)
+        label = label_for_score(trust_score, ruleset)
+    modeled = time.perf_counter()
+    
+    reused = (similar is not None and similar[1]['label'] == label
+              and [list(pair) for pair in similar[0]] == [list(pair) for pair in scoring.penalties])
+    
+    # Generate explanations from the scoring hits; per-issue item lists are
+    # only built for the general fallback when no sentence was flagged.
+    # Clean texts (the bulk of short submissions) skip splitting sentences.
+    if supported and may_flag_sentences(context, ruleset, scoring.hits, scoring.caps_count,
+                                        scoring.exclaim_count):
+        explanations = explain_sentences(context, ruleset, hits=scoring.hits)
+    else:
+        explanations = []
+    if scoring.penalties and not explanations:
+        explanations = explain_issues(scoring.issues, ruleset)[:MAX_EXPLANATIONS]
+    explained = time.perf_counter()
+    
+    # Get suggested sources, preferring ones in the text's language
+    if reused:
+        sources_detailed = similar[1]['sources_detailed']
+    else:
+        categories = categorize_content(context, ruleset) if supported else set()
+        language = context.language if context.language != UNDETERMINED else None
+        sources_detailed = suggest_sources_for_categories(categories, label, ruleset, region, language)
+    sources = get_source_names(sources_detailed)
+    sourced = time.perf_counter()
+    
+    if stats is not None:
+        stats['stages'] = {
+            'score': scored - started,
+            'explanation': explained - modeled,
+            'sources': sourced - explained
+        }
+        if model is not None and not batched:
+            stats['stages']['model'] = modeled - scored
+        stats['issue_types'] = scoring.issue_types
+        stats['penalties'] = scoring.penalties
+        stats['reused'] = reused
+    
+    # Create summary
+    summary = create_summary(trust_score, label, explanations)
+    
+    result = {
+        'label': label,
+        'trust_score': trust_score,
+        'explanations': explanations,
+        'sources': sources,
+        'sources_detailed': sources_detailed,
+        'summary': summary,
+        'language': context.language,
+        'ruleset_version': ruleset.version
+    }
+    
+    if model is not None:
+        result['model'] = {
+            'fake_probability': round(fake_probability, 4),
+            'heuristic_score': scoring.score,
+            'weight': model.weight,
+            'version': model.version
+        }
+    
+    if trace:
+        result['trace'] = scoring.trace
+    
+    return result
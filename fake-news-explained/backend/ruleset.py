@@ -0,0 +1,618 @@
+"""
+External, hot-reloadable ruleset.
+Indicator lexicons, penalties, sentence patterns and verification sources
+live in a JSON (or YAML) file. The file is validated, deduplicated and
+compiled once into matcher objects; when it changes on disk the compiled
+ruleset is swapped atomically, without restarting workers.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from matcher import (
+    IndicatorMatcher, MODE_PRESENT, MODE_FINDALL, MODE_CANDIDATE, literal_prefixes, position_independent
+)
+from source_catalog import CODE_PATTERN, CategoryIndex, SourceCatalog
+from language import DEFAULT_LANGUAGE, UNDETERMINED
+
+
+logger = logging.getLogger(__name__)
+
+# Ruleset shipped with the backend
+DEFAULT_RULESET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ruleset.json')
+
+# Minimum seconds between checks of the ruleset file for changes
+CHECK_INTERVAL = 2.0
+
+# File extensions of ruleset files
+RULESET_EXTENSIONS = ('json', 'yaml', 'yml')
+
+MATCH_TYPES = ('phrase', 'regex')
+MATCH_MODES = (MODE_PRESENT, MODE_FINDALL)
+COUNT_RULES = ('excessive_caps', 'excessive_exclamations')
+SOURCE_GROUPS = ('fact_check', 'news', 'health', 'science')
+
+# Catalog defaults for sources that do not say
+DEFAULT_SOURCE_RANK = 100
+DEFAULT_SOURCE_REGIONS = ['global']
+DEFAULT_SOURCE_LANGUAGES = ['en']
+DEFAULT_MAX_SOURCES = 5
+
+# Routing of the grouped sources format (fact_check/news/health/science lists)
+LEGACY_SOURCE_ROUTES = [
+    {'labels': ['Likely Fake', 'Unverified'], 'tag': 'fact_check', 'limit': 2},
+    {'category': 'health', 'tag': 'health', 'limit': 2},
+    {'category': 'science', 'tag': 'science', 'limit': 1},
+    {'category': 'political', 'tag': 'political', 'limit': 1},
+    {'tag': 'news', 'limit': 2}
+]
+
+# Matcher category names of sentence patterns, kept apart from indicator types
+SENTENCE_CATEGORY_PREFIX = 'sentence:'
+
+
+class RulesetError(ValueError):
+    """Raised when a ruleset file is missing, malformed or invalid."""
+
+
+def load_ruleset_file(path):
+    """
+    Read a ruleset file.
+
+    Args:
+        path (str): .json, .yaml or .yml file
+
+    Returns:
+        dict: Parsed (not yet validated) ruleset
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            if path.lower().endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError:
+                    raise RulesetError('PyYAML is required for YAML rulesets (pip install pyyaml)')
+                return yaml.safe_load(f)
+            return json.load(f)
+    except OSError as e:
+        raise RulesetError(f'Cannot read ruleset {path}: {e}')
+    except ValueError as e:
+        raise RulesetError(f'Cannot parse ruleset {path}: {e}')
+
+
+def _require(condition, message):
+    if not condition:
+        raise RulesetError(message)
+
+
+def _dedupe(items, where):
+    """Drop repeated entries, keeping the first, and warn about them."""
+    unique = list(dict.fromkeys(items))
+    if len(unique) < len(items):
+        logger.warning('Ruleset: dropped %d duplicate entries in %s', len(items) - len(unique), where)
+    return unique
+
+
+def _validate_regex(pattern, where):
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise RulesetError(f'Invalid regex in {where}: {pattern!r} ({e})')
+
+
+def _validate_penalty(rule, where):
+    for key in ('penalty', 'max_penalty'):
+        _require(isinstance(rule.get(key), int) and rule[key] >= 0,
+                 f'{where}.{key} must be a non-negative integer')
+
+
+def _validate_strings(items, where):
+    _require(isinstance(items, list) and all(isinstance(item, str) and item for item in items),
+             f'{where} must be a list of non-empty strings')
+    return _dedupe(items, where)
+
+
+def _validate_codes(codes, where):
+    _require(isinstance(codes, list) and codes and all(isinstance(code, str) and CODE_PATTERN.match(code)
+                                                       for code in codes),
+             f'{where} must be a non-empty list of lowercase codes')
+    return _dedupe(codes, where)
+
+
+def _grouped_sources(sources, categories):
+    """
+    Convert the grouped sources format to a catalog.
+
+    Each group becomes a tag and the position in its list the rank. The
+    third fact-checker doubles as the political source, as it always has.
+    """
+    catalog = []
+    for group in SOURCE_GROUPS:
+        entries = sources.get(group)
+        _require(isinstance(entries, list), f'sources.{group} must be a list')
+        for number, source in enumerate(entries):
+            _require(isinstance(source, dict), f'sources.{group}[{number}] must be a mapping')
+            tags = [group, 'political'] if group == 'fact_check' and number == 2 else [group]
+            catalog.append({**source, 'tags': tags, 'rank': number + 1})
+    _require(len(sources['fact_check']) >= 3, 'sources.fact_check needs at least 3 entries')
+    tags = {tag for source in catalog for tag in source['tags']}
+    routes = [route for route in LEGACY_SOURCE_ROUTES
+              if route['tag'] in tags and ('category' not in route or route['category'] in categories)]
+    return {'max_results': DEFAULT_MAX_SOURCES, 'routes': routes, 'catalog': catalog}
+
+
+def _validate_sources(sources, categories):
+    """Check the source catalog and its routes, filling in defaults."""
+    catalog = sources.get('catalog')
+    _require(isinstance(catalog, list) and catalog, 'sources.catalog must be a non-empty list')
+    clean_catalog = []
+    names = set()
+    tags = set()
+    for number, source in enumerate(catalog):
+        where = f'sources.catalog[{number}]'
+        _require(isinstance(source, dict) and all(isinstance(source.get(key), str)
+                                                  for key in ('name', 'url', 'description')),
+                 f'{where} needs name, url and description strings')
+        _require(source['name'] not in names, f"{where}: duplicate source name {source['name']!r}")
+        names.add(source['name'])
+        rank = source.get('rank', DEFAULT_SOURCE_RANK)
+        _require(isinstance(rank, int) and rank >= 0, f'{where}.rank must be a non-negative integer')
+        clean = {key: source[key] for key in ('name', 'url', 'description')}
+        clean['tags'] = _validate_strings(source.get('tags'), f'{where}.tags')
+        clean['regions'] = _validate_codes(source.get('regions', DEFAULT_SOURCE_REGIONS), f'{where}.regions')
+        clean['languages'] = _validate_codes(source.get('languages', DEFAULT_SOURCE_LANGUAGES),
+                                             f'{where}.languages')
+        clean['rank'] = rank
+        tags.update(clean['tags'])
+        clean_catalog.append(clean)
+
+    routes = sources.get('routes')
+    _require(isinstance(routes, list) and routes, 'sources.routes must be a non-empty list')
+    clean_routes = []
+    for number, route in enumerate(routes):
+        where = f'sources.routes[{number}]'
+        _require(isinstance(route, dict), f'{where} must be a mapping')
+        _require(route.get('tag') in tags, f'{where}.tag must be a tag used in sources.catalog')
+        _require(isinstance(route.get('limit'), int) and route['limit'] > 0,
+                 f'{where}.limit must be a positive integer')
+        labels = route.get('labels')
+        if labels is not None:
+            labels = _validate_strings(labels, f'{where}.labels')
+        category = route.get('category')
+        _require(category is None or category in categories,
+                 f'{where}.category must be one of category_keywords')
+        clean_routes.append({'tag': route['tag'], 'limit': route['limit'], 'labels': labels, 'category': category})
+
+    max_results = sources.get('max_results', DEFAULT_MAX_SOURCES)
+    _require(isinstance(max_results, int) and max_results > 0, 'sources.max_results must be a positive integer')
+    return {'max_results': max_results, 'routes': clean_routes, 'catalog': clean_catalog}
+
+
+def validate_ruleset(data):
+    """
+    Check a parsed ruleset and normalize it.
+
+    Duplicate lexicon entries, keywords and sentence patterns are dropped
+    (keeping the first), so a repeated entry is neither scanned nor
+    penalized twice.
+
+    Args:
+        data (dict): Parsed ruleset file
+
+    Returns:
+        dict: Validated ruleset
+
+    Raises:
+        RulesetError: If a section is missing or malformed
+    """
+    _require(isinstance(data, dict), 'Ruleset must be a mapping')
+
+    language = data.get('language', DEFAULT_LANGUAGE)
+    _require(isinstance(language, str) and CODE_PATTERN.match(language) and language != UNDETERMINED,
+             'language must be a lowercase language code such as "en"')
+
+    indicators = data.get('indicators')
+    _require(isinstance(indicators, list) and indicators, 'indicators must be a non-empty list')
+    seen_types = set()
+    clean_indicators = []
+    for number, rule in enumerate(indicators):
+        where = f'indicators[{number}]'
+        _require(isinstance(rule, dict), f'{where} must be a mapping')
+        _require(isinstance(rule.get('type'), str) and rule['type'], f'{where}.type is required')
+        _require(rule['type'] not in seen_types, f"{where}: duplicate indicator type {rule['type']!r}")
+        seen_types.add(rule['type'])
+        _require(rule.get('match') in MATCH_TYPES, f'{where}.match must be one of {MATCH_TYPES}')
+        _require(rule.get('mode', MODE_PRESENT) in MATCH_MODES, f'{where}.mode must be one of {MATCH_MODES}')
+        _validate_penalty(rule, where)
+        entries = _validate_strings(rule.get('entries'), f'{where}.entries')
+        if rule['match'] == 'regex':
+            for entry in entries:
+                _validate_regex(entry, f'{where}.entries')
+        clean_indicators.append({
+            'type': rule['type'],
+            'match': rule['match'],
+            'mode': rule.get('mode', MODE_PRESENT),
+            'penalty': rule['penalty'],
+            'max_penalty': rule['max_penalty'],
+            'entries': entries
+        })
+
+    counts = {}
+    for name in COUNT_RULES:
+        rule = data.get(name)
+        _require(isinstance(rule, dict), f'{name} must be a mapping')
+        _require(isinstance(rule.get('threshold'), int), f'{name}.threshold must be an integer')
+        _validate_penalty(rule, name)
+        counts[name] = {key: rule[key] for key in ('threshold', 'penalty', 'max_penalty')}
+
+    thresholds = data.get('label_thresholds')
+    _require(isinstance(thresholds, dict)
+             and all(isinstance(thresholds.get(key), (int, float)) for key in ('likely_real', 'unverified'))
+             and thresholds['likely_real'] >= thresholds['unverified'],
+             'label_thresholds needs numeric likely_real >= unverified')
+
+    explanations = data.get('issue_explanations')
+    _require(isinstance(explanations, dict)
+             and all(isinstance(value, str) for value in explanations.values()),
+             'issue_explanations must map issue types to strings')
+
+    patterns = data.get('sentence_patterns')
+    _require(isinstance(patterns, list), 'sentence_patterns must be a list')
+    clean_patterns = []
+    seen_patterns = set()
+    for number, rule in enumerate(patterns):
+        where = f'sentence_patterns[{number}]'
+        _require(isinstance(rule, dict) and all(isinstance(rule.get(key), str) and rule[key]
+                                                for key in ('type', 'pattern', 'reason')),
+                 f'{where} needs type, pattern and reason strings')
+        _validate_regex(rule['pattern'], where)
+        if rule['pattern'] in seen_patterns:
+            logger.warning('Ruleset: dropped duplicate pattern in %s', where)
+            continue
+        seen_patterns.add(rule['pattern'])
+        clean_patterns.append({key: rule[key] for key in ('type', 'pattern', 'reason')})
+
+    keywords = data.get('category_keywords')
+    _require(isinstance(keywords, dict), 'category_keywords must be a mapping')
+    clean_keywords = {
+        category: _validate_strings(words, f'category_keywords.{category}')
+        for category, words in keywords.items()
+    }
+
+    sources = data.get('sources')
+    _require(isinstance(sources, dict), 'sources must be a mapping')
+    if 'catalog' not in sources:
+        sources = _grouped_sources(sources, clean_keywords)
+    clean_sources = _validate_sources(sources, clean_keywords)
+
+    return {
+        'language': language,
+        'indicators': clean_indicators,
+        **counts,
+        'label_thresholds': dict(thresholds),
+        'issue_explanations': dict(explanations),
+        'sentence_patterns': clean_patterns,
+        'category_keywords': clean_keywords,
+        'sources': clean_sources
+    }
+
+
+class Ruleset:
+    """
+    A validated ruleset compiled for analysis.
+
+    Instances are never modified after construction, so a request can
+    hold on to one while a reload swaps in the next.
+    """
+
+    def __init__(self, data, source=None):
+        """
+        Args:
+            data (dict): Ruleset as returned by validate_ruleset
+            source (str): File the ruleset was loaded from, for reporting
+        """
+        self.data = data
+        self.source = source
+        canonical = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        self.version = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+
+        self.language = data['language']
+        self.indicators = data['indicators']
+        self.issue_types = [rule['type'] for rule in self.indicators]
+        self.excessive_caps = data['excessive_caps']
+        self.excessive_exclamations = data['excessive_exclamations']
+        self.label_thresholds = data['label_thresholds']
+        self.issue_explanations = data['issue_explanations']
+        self.category_keywords = data['category_keywords']
+
+        # Keyword and source indexes, so categorizing a text and picking its
+        # sources do not scan every keyword or source
+        self.category_index = CategoryIndex(self.category_keywords)
+        self.source_catalog = SourceCatalog(data['sources'])
+
+        # Each verification source encoded once (name -> (source, JSON bytes)),
+        # so responses splice in the bytes instead of re-encoding the dicts
+        self.source_fragments = {
+            source['name']: (source, json.dumps(source, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            for source in self.source_catalog.sources
+        }
+
+        # Sentence patterns compiled once, case-insensitive, in priority order
+        self.sentence_patterns = [
+            (rule['type'], re.compile(rule['pattern'], re.IGNORECASE), rule['reason'])
+            for rule in data['sentence_patterns']
+        ]
+
+        # All lexicons compiled into a single-pass matcher. Sentence patterns
+        # ride along as candidates: the scan records where each may start,
+        # and explanations verify them within the sentence holding the hit.
+        # Patterns without a literal prefix would have to be tried all over
+        # the text; they are searched in the explained sentences instead.
+        anchored = [priority for priority, rule in enumerate(data['sentence_patterns'])
+                    if literal_prefixes(rule['pattern']) is not None]
+        self.unanchored_sentence_patterns = [priority for priority in range(len(self.sentence_patterns))
+                                             if priority not in anchored]
+
+        # If every unanchored pattern matches a sentence as it would the whole
+        # text, one search of the text tells whether any sentence has a match
+        self.unanchored_searchable_in_text = all(
+            position_independent(data['sentence_patterns'][priority]['pattern'])
+            for priority in self.unanchored_sentence_patterns
+        )
+        self.matcher = IndicatorMatcher([
+            (rule['type'], rule['entries'], rule['match'] == 'regex', rule['mode'])
+            for rule in self.indicators
+        ] + [
+            (SENTENCE_CATEGORY_PREFIX + data['sentence_patterns'][priority]['type'],
+             [data['sentence_patterns'][priority]['pattern']], True, MODE_CANDIDATE)
+            for priority in anchored
+        ])
+
+        # Matcher category index -> priority of the sentence pattern it stands for
+        first = len(self.indicators)
+        self.sentence_categories = {first + position: priority for position, priority in enumerate(anchored)}
+
+    def supports(self, language):
+        """
+        Tell whether the lexicons apply to texts in a language.
+
+        Texts whose language could not be determined are analyzed with
+        whatever ruleset they are routed to.
+
+        Args:
+            language (str): Detected language code
+
+        Returns:
+            bool: True if the ruleset is written for the language
+        """
+        return language == self.language or language == UNDETERMINED
+
+    def entries(self, issue_type):
+        """Get the lexicon entries for one indicator type."""
+        for rule in self.indicators:
+            if rule['type'] == issue_type:
+                return rule['entries']
+        raise KeyError(issue_type)
+
+
+def compile_ruleset_file(path):
+    """
+    Load, validate and compile a ruleset file.
+
+    Args:
+        path (str): Ruleset file
+
+    Returns:
+        Ruleset: Compiled ruleset
+
+    Raises:
+        RulesetError: If the file cannot be used
+    """
+    return Ruleset(validate_ruleset(load_ruleset_file(path)), source=path)
+
+
+class RulesetManager:
+    """
+    Holds the active ruleset and reloads it when its file changes.
+
+    The file's modification time is checked at most every check_interval
+    seconds. A changed file is compiled in full before it replaces the
+    active ruleset; if it is invalid, the error is logged and the
+    previous ruleset stays active.
+    """
+
+    def __init__(self, path=DEFAULT_RULESET_PATH, check_interval=CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = self._stat()
+        self._current = compile_ruleset_file(path)
+        self._next_check = time.monotonic() + check_interval
+
+    def current(self):
+        """
+        Get the active ruleset, reloading it first if the file changed.
+
+        Returns:
+            Ruleset: Active ruleset
+        """
+        if self.check_interval is not None and time.monotonic() >= self._next_check:
+            self.reload_if_changed()
+        return self._current
+
+    def reload_if_changed(self):
+        """
+        Recompile the ruleset if its file was modified.
+
+        Returns:
+            bool: True if a new ruleset was swapped in
+        """
+        with self._lock:
+            self._next_check = time.monotonic() + (self.check_interval or 0)
+            mtime = self._stat()
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            try:
+                ruleset = compile_ruleset_file(self.path)
+            except RulesetError as e:
+                logger.error('Ruleset reload failed, keeping version %s: %s', self._current.version, e)
+                return False
+            if ruleset.version != self._current.version:
+                logger.info('Ruleset reloaded: %s -> %s', self._current.version, ruleset.version)
+            self._current = ruleset
+            return True
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+
+_manager = None
+_language_managers = None
+_manager_lock = threading.Lock()
+
+
+def get_ruleset_manager():
+    """
+    Get the process-wide ruleset manager, creating it on first use.
+
+    RULESET_PATH: Ruleset file (default: ruleset.json next to this module)
+    RULESET_CHECK_INTERVAL: Seconds between change checks, 0 to disable
+                            hot reloading (default 2)
+
+    Returns:
+        RulesetManager: The manager
+    """
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = RulesetManager(_ruleset_path(), check_interval=_check_interval())
+    return _manager
+
+
+def _ruleset_path():
+    return os.environ.get('RULESET_PATH') or DEFAULT_RULESET_PATH
+
+
+def _check_interval():
+    return float(os.environ.get('RULESET_CHECK_INTERVAL', CHECK_INTERVAL)) or None
+
+
+def find_language_rulesets(path):
+    """
+    Find the per-language rulesets stored next to a ruleset file.
+
+    They are named after the main file with a language code inserted
+    before the extension (ruleset.es.json, ruleset.de.yaml...).
+
+    Args:
+        path (str): Main ruleset file
+
+    Returns:
+        dict: Language code -> ruleset file
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    stem = os.path.splitext(name)[0] + '.'
+    found = {}
+    try:
+        entries = sorted(os.listdir(directory))
+    except OSError:
+        return found
+    for entry in entries:
+        if not entry.startswith(stem):
+            continue
+        code, _, extension = entry[len(stem):].partition('.')
+        if extension.lower() in RULESET_EXTENSIONS and CODE_PATTERN.match(code) and code != UNDETERMINED:
+            found.setdefault(code, os.path.join(directory, entry))
+    return found
+
+
+def get_language_managers():
+    """
+    Get the managers of the per-language rulesets, creating them on first use.
+
+    Each file found by find_language_rulesets next to RULESET_PATH gets a
+    manager of its own and is hot-reloaded like the main ruleset.
+
+    Returns:
+        dict: Language code -> RulesetManager
+
+    Raises:
+        RulesetError: If a ruleset file is invalid or declares another language
+    """
+    global _language_managers
+    if _language_managers is None:
+        with _manager_lock:
+            if _language_managers is None:
+                managers = {}
+                for code, path in find_language_rulesets(_ruleset_path()).items():
+                    manager = RulesetManager(path, check_interval=_check_interval())
+                    if manager.current().language != code:
+                        raise RulesetError(f'{path} declares language {manager.current().language!r}, '
+                                           f'expected {code!r}')
+                    managers[code] = manager
+                if managers:
+                    logger.info('Per-language rulesets: %s', ', '.join(sorted(managers)))
+                _language_managers = managers
+    return _language_managers
+
+
+def get_ruleset():
+    """
+    Get the active ruleset.
+
+    Callers analyzing one document should fetch it once and pass it on,
+    so a reload mid-document cannot mix two rulesets.
+
+    Returns:
+        Ruleset: Active ruleset
+    """
+    return get_ruleset_manager().current()
+
+
+def get_ruleset_for(language):
+    """
+    Get the active ruleset written for a language.
+
+    Args:
+        language (str): Detected language code
+
+    Returns:
+        Ruleset or None: The main ruleset if it supports the language, else
+        the per-language ruleset, or None if no ruleset covers it
+    """
+    ruleset = get_ruleset()
+    if ruleset.supports(language):
+        return ruleset
+    manager = get_language_managers().get(language)
+    return manager.current() if manager is not None else None
+
+
+def route_ruleset(language, ruleset=None):
+    """
+    Pick the ruleset for a document in a detected language.
+
+    Args:
+        language (str): Detected language code
+        ruleset (Ruleset): Rules chosen by the caller, or None to route by language
+
+    Returns:
+        tuple: (ruleset, whether its lexicons apply to the language). Without
+               a ruleset for the language the main ruleset is returned, for
+               its thresholds and the counted rules only.
+    """
+    if ruleset is None:
+        ruleset = get_ruleset_for(language)
+        if ruleset is None:
+            return get_ruleset(), False
+        return ruleset, True
+    return ruleset, ruleset.supports(language)
@@ -0,0 +1,140 @@
+"""
+JSON encoding of analysis responses.
+The verification sources in a response come from a small fixed catalog,
+so each source is encoded once per ruleset and its bytes are spliced into
+every response. The rest of the payload is encoded with orjson when it
+is installed, or the standard library encoder otherwise.
+"""
+
+import json
+import logging
+import os
+
+from ruleset import get_ruleset
+
+try:
+    import orjson
+except ImportError:  # Optional speedup
+    orjson = None
+
+
+logger = logging.getLogger(__name__)
+
+# Analysis fields a client may select with the fields parameter
+RESULT_FIELDS = ('label', 'trust_score', 'explanations', 'sources', 'sources_detailed',
+                 'summary', 'language', 'ruleset_version', 'model', 'duplicates', 'trace')
+
+_std_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def _encode_std(payload):
+    return _std_encoder.encode(payload).encode('utf-8')
+
+
+def select_encoder(name):
+    """
+    Pick the JSON encoder.
+
+    Args:
+        name (str): "orjson", "json" or "auto" (orjson if installed)
+
+    Returns:
+        tuple: (encoder name, function turning a payload into UTF-8 bytes)
+    """
+    if name not in ('auto', 'orjson', 'json'):
+        raise ValueError(f'Unknown JSON encoder {name!r} (use auto, orjson or json)')
+    if name == 'orjson' and orjson is None:
+        logger.warning('JSON_ENCODER=orjson but orjson is not installed; using the json module')
+    if name != 'json' and orjson is not None:
+        return 'orjson', orjson.dumps
+    return 'json', _encode_std
+
+
+# JSON_ENCODER: "auto" (default), "orjson" or "json"
+ENCODER_NAME, encode_json = select_encoder(os.environ.get('JSON_ENCODER', 'auto'))
+
+
+def parse_fields(value):
+    """
+    Parse the fields parameter of a request.
+
+    Args:
+        value (str or list or None): Comma-separated string or list of field names
+
+    Returns:
+        frozenset or None: Selected fields, or None for all fields
+
+    Raises:
+        ValueError: If the value is malformed or names an unknown field
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ValueError('fields must be a comma-separated string or a list of field names')
+    fields = frozenset(name.strip() for name in value if name.strip())
+    if not fields:
+        raise ValueError('fields must name at least one field')
+    unknown = sorted(fields.difference(RESULT_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(RESULT_FIELDS)})")
+    return fields
+
+
+def select_fields(result, fields):
+    """Keep only the selected analysis fields; other keys (id, error...) stay."""
+    return {key: value for key, value in result.items() if key in fields or key not in RESULT_FIELDS}
+
+
+def _source_fragments(sources, catalog):
+    """Get the encoded form of each source, reusing the catalog's bytes."""
+    fragments = []
+    for source in sources:
+        entry = catalog.get(source.get('name'))
+        if entry is not None and entry[0] == source:
+            fragments.append(entry[1])
+        else:
+            fragments.append(encode_json(source))
+    return fragments
+
+
+def encode_result(result, fields=None, ruleset=None):
+    """
+    Encode an analysis result (or a payload extending one) as JSON.
+
+    Args:
+        result (dict): Result in the /analyze response shape
+        fields (frozenset): Analysis fields to include (None for all)
+        ruleset (Ruleset): Ruleset holding the encoded source catalog
+                           (defaults to the active ruleset)
+
+    Returns:
+        bytes: UTF-8 JSON
+    """
+    if fields is not None:
+        result = select_fields(result, fields)
+    sources = result.get('sources_detailed')
+    if not sources:
+        return encode_json(result)
+
+    catalog = (ruleset or get_ruleset()).source_fragments
+    rest = encode_json({key: value for key, value in result.items() if key != 'sources_detailed'})
+    spliced = b'"sources_detailed":[' + b','.join(_source_fragments(sources, catalog)) + b']}'
+    return rest[:-1] + (b',' if len(rest) > 2 else b'') + spliced
+
+
+def encode_batch(results, fields=None):
+    """
+    Encode the /analyze/batch response.
+
+    Args:
+        results (list): Per-item results or error dicts, in input order
+        fields (frozenset): Analysis fields to include (None for all)
+
+    Returns:
+        bytes: UTF-8 JSON
+    """
+    ruleset = get_ruleset()
+    items = b','.join(encode_result(result, fields, ruleset) for result in results)
+    return b'{"results":[' + items + b'],"count":' + str(len(results)).encode('ascii') + b'}'
@@ -0,0 +1,213 @@
+"""
+Indexed catalog of verification sources.
+Sources are tagged by topic, region and language and ranked within the
+catalog. Indexes built once per ruleset map a keyword to its content
+categories and a (tag, region, language) key to the ranked sources, so
+categorizing a text is one pass over its tokens and picking sources is a
+few dictionary lookups, however large the catalog grows.
+"""
+
+import re
+
+
+# Region and language codes (e.g. "us", "gb", "en", "pt-br")
+CODE_PATTERN = re.compile(r'^[a-z][a-z0-9_-]{0,15}$')
+
+# Tokens remembered (with or without categories) before the memo is reset
+MAX_MEMO_TOKENS = 65536
+
+# Longer tokens are checked against every keyword instead of by substrings
+MAX_SLICED_TOKEN = 64
+
+
+def parse_region(value):
+    """
+    Parse the region parameter of a request.
+
+    Args:
+        value (str or None): Region code, in any case
+
+    Returns:
+        str or None: Lowercase region code, or None when not given
+
+    Raises:
+        ValueError: If the value is not a region code
+    """
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str) or not CODE_PATTERN.match(value.strip().lower()):
+        raise ValueError('region must be a short region code such as "us" or "gb"')
+    return value.strip().lower()
+
+
+class CategoryIndex:
+    """
+    Keyword index for content categories.
+
+    A category applies when one of its keywords occurs anywhere in the
+    lowercased text, as a plain substring. A keyword without whitespace
+    can only occur inside a single word, so each distinct word is looked
+    up once (its substrings against the keyword table) and remembered;
+    words seen before without keywords are set aside in one set operation.
+    """
+
+    def __init__(self, category_keywords):
+        """
+        Args:
+            category_keywords (dict): Category -> list of keywords
+        """
+        self.categories = frozenset(category_keywords)
+        self._keywords = {}     # keyword -> categories
+        self._spaced = []       # (keyword, category) for keywords spanning tokens
+        for category, keywords in category_keywords.items():
+            for keyword in keywords:
+                if keyword.split() != [keyword]:
+                    self._spaced.append((keyword, category))
+                else:
+                    self._keywords[keyword] = self._keywords.get(keyword, frozenset()) | {category}
+        self._lengths = sorted({len(keyword) for keyword in self._keywords})
+        self._memo = {}         # token -> categories, for tokens holding keywords
+        self._plain = set()     # tokens known to hold no keyword
+
+    def _token_categories(self, token):
+        """Find the categories of every keyword contained in one token."""
+        keywords = self._keywords
+        found = set()
+        if len(token) > MAX_SLICED_TOKEN:
+            for keyword, categories in keywords.items():
+                if keyword in token:
+                    found |= categories
+            return frozenset(found)
+        for length in self._lengths:
+            if length > len(token):
+                break
+            for start in range(len(token) - length + 1):
+                categories = keywords.get(token[start:start + length])
+                if categories:
+                    found |= categories
+        return frozenset(found)
+
+    def categorize(self, words, text_lower):
+        """
+        Categorize a text.
+
+        Args:
+            words (list): Whitespace-separated words of the text, in any case
+            text_lower (str): Lowercased text
+
+        Returns:
+            set: Content categories
+        """
+        found = set()
+        tokens = set(words)
+        tokens.difference_update(self._plain)
+        for token in tokens:
+            categories = self._memo.get(token)
+            if categories is None:
+                categories = self._token_categories(token.lower())
+                if len(token) <= MAX_SLICED_TOKEN:
+                    self._remember(token, categories)
+            if categories:
+                found |= categories
+                if len(found) == len(self.categories):
+                    return found
+        for keyword, category in self._spaced:
+            if category not in found and keyword in text_lower:
+                found.add(category)
+        return found
+
+    def _remember(self, token, categories):
+        if len(self._plain) + len(self._memo) >= MAX_MEMO_TOKENS:
+            self._plain = set()
+            self._memo = {}
+        if categories:
+            self._memo[token] = categories
+        else:
+            self._plain.add(token)
+
+
+class SourceCatalog:
+    """
+    Ranked verification sources with routing rules.
+
+    Each route adds up to `limit` sources carrying its tag, optionally
+    only for some labels or when a content category was detected. Sources
+    in the requested language and region are preferred, then the rest in
+    rank order.
+    """
+
+    def __init__(self, sources):
+        """
+        Args:
+            sources (dict): The ruleset's validated sources section
+                            ('catalog', 'routes', 'max_results')
+        """
+        self.routes = sources['routes']
+        self.max_results = sources['max_results']
+        self.sources = []       # Response form of each source, in catalog order
+        self._ranked = {}       # (tag, region or None, language or None) -> sources by rank
+
+        ordered = sorted(enumerate(sources['catalog']), key=lambda item: (item[1]['rank'], item[0]))
+        for _, entry in ordered:
+            source = {key: entry[key] for key in ('name', 'url', 'description')}
+            self.sources.append(source)
+            for tag in entry['tags']:
+                for region in [None] + entry['regions']:
+                    for language in [None] + entry['languages']:
+                        self._ranked.setdefault((tag, region, language), []).append(source)
+
+    def ranked(self, tag, region=None, language=None):
+        """
+        Get the sources with a tag, best first.
+
+        Args:
+            tag (str): Source tag (e.g. "fact_check", "health")
+            region (str): Preferred region code, or None
+            language (str): Preferred language code, or None
+
+        Yields:
+            dict: Sources in preference order (a source may repeat)
+        """
+        keys = []
+        if language and region:
+            keys.append((tag, region, language))
+        if language:
+            keys.append((tag, None, language))
+        if region:
+            keys.append((tag, region, None))
+        keys.append((tag, None, None))
+        for key in keys:
+            yield from self._ranked.get(key, ())
+
+    def suggest(self, categories, label, region=None, language=None):
+        """
+        Pick sources for a classified text.
+
+        Args:
+            categories (set): Content categories of the text
+            label (str): The classification label
+            region (str): Preferred region code, or None
+            language (str): Preferred language code, or None
+
+        Returns:
+            list: Source dictionaries with name, url and description
+        """
+        chosen = []
+        names = set()
+        for route in self.routes:
+            if route['labels'] is not None and label not in route['labels']:
+                continue
+            if route['category'] is not None and route['category'] not in categories:
+                continue
+            added = 0
+            for source in self.ranked(route['tag'], region, language):
+                if added >= route['limit'] or len(chosen) >= self.max_results:
+                    break
+                if source['name'] in names:
+                    continue
+                names.add(source['name'])
+                chosen.append(source)
+                added += 1
+            if len(chosen) >= self.max_results:
+                break
+        return chosen
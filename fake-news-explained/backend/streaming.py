@@ -0,0 +1,229 @@
+"""
+Streaming analysis for very long documents.
+Processes text chunk by chunk and sentence by sentence with running
+penalty counters, so memory stays bounded no matter the document size.
+"""
+
+import codecs
+
+from utils import SENTENCE_BOUNDARY, AnalysisContext, iter_clean_text
+from language import PREFIX_CHARS, UNDETERMINED, detect_language
+from ruleset import get_ruleset, route_ruleset
+from nlp_logic import score_hits
+from explanation_engine import (
+    MAX_EXPLANATIONS, explain_sentences, explain_issues, create_summary
+)
+from source_suggester import (
+    categorize_content, suggest_sources_for_categories, get_source_names
+)
+
+
+# Longest stretch of text without a sentence boundary analyzed as one piece
+MAX_SEGMENT_CHARS = 16384
+
+# Characters of the previous segment re-scanned with the next one, so
+# indicator phrases crossing a segment boundary are still found
+OVERLAP_CHARS = 256
+
+# Bytes read per chunk from files and request streams
+CHUNK_SIZE = 65536
+
+
+class StreamingAnalyzer:
+    """
+    Incremental analyzer fed with cleaned text.
+
+    Complete sentences are analyzed as soon as they arrive and then
+    dropped; only running counters, the first few explanations and a
+    short overlap tail are kept. Indicator hits behind the overlap tail
+    are folded into per-category counts and the first few matched items,
+    all scoring and the general explanations need. Analysis starts once the first
+    PREFIX_CHARS characters have arrived, so the language is identified
+    from the same prefix as in the regular pipeline, and finish() returns
+    the same result as the pipeline would for the whole text.
+    """
+
+    def __init__(self, max_segment_chars=MAX_SEGMENT_CHARS, overlap_chars=OVERLAP_CHARS, ruleset=None,
+                 region=None):
+        self.max_segment_chars = max_segment_chars
+        self.overlap_chars = overlap_chars
+        self.requested_ruleset = ruleset
+        self.ruleset = ruleset or get_ruleset()  # Pinned once the language is known
+        self.language = None
+        self.supported = True
+        self.region = region
+        self.buffer = ''
+        self.match_state = self.ruleset.matcher.new_state()
+        self.lower_tail = ''
+        self.offset = 0
+        self.caps_count = 0
+        self.exclaim_count = 0
+        self.categories = set()
+        self.explanations = []
+        self.length = 0
+
+    def feed(self, text):
+        """
+        Add a piece of cleaned text and analyze every complete sentence.
+
+        Args:
+            text (str): Next piece of cleaned text
+        """
+        self.buffer += text
+        self.length += len(text)
+        if self.language is None:
+            if len(self.buffer) < PREFIX_CHARS:
+                return
+            self._route()
+        while True:
+            segment = self._take_segment()
+            if segment is None:
+                break
+            self._process(segment)
+
+    def finish(self):
+        """
+        Analyze the remaining text and build the final result.
+
+        Returns:
+            dict: Analysis result in the /analyze response shape
+        """
+        if self.language is None:
+            self._route()
+        if self.buffer:
+            self._process(self.buffer)
+            self.buffer = ''
+
+        scoring = score_hits(self.match_state, self.caps_count, self.exclaim_count, ruleset=self.ruleset)
+        trust_score = scoring.score
+        label = scoring.label
+
+        explanations = self.explanations
+        if scoring.penalties and not explanations:
+            explanations = explain_issues(scoring.issues, self.ruleset)
+        explanations = explanations[:MAX_EXPLANATIONS]
+
+        language = self.language if self.language != UNDETERMINED else None
+        sources_detailed = suggest_sources_for_categories(self.categories, label, self.ruleset, self.region,
+                                                          language)
+
+        return {
+            'label': label,
+            'trust_score': trust_score,
+            'explanations': explanations,
+            'sources': get_source_names(sources_detailed),
+            'sources_detailed': sources_detailed,
+            'summary': create_summary(trust_score, label, explanations),
+            'language': self.language,
+            'ruleset_version': self.ruleset.version
+        }
+
+    def _route(self):
+        """Identify the language from the buffered start of the text and pick its ruleset."""
+        self.language = detect_language(self.buffer)
+        self.ruleset, self.supported = route_ruleset(self.language, self.requested_ruleset)
+        self.match_state = self.ruleset.matcher.new_state()
+
+    def _take_segment(self):
+        """Split off the buffered text up to the last complete sentence."""
+        last_boundary = None
+        for boundary in SENTENCE_BOUNDARY.finditer(self.buffer):
+            # A boundary at the very end may continue in the next piece
+            if boundary.end() < len(self.buffer):
+                last_boundary = boundary
+
+        if last_boundary is not None:
+            cut = last_boundary.end()
+        elif len(self.buffer) > self.max_segment_chars:
+            # No sentence end in sight: cut at a word boundary instead
+            cut = self.buffer.rfind(' ', 0, self.max_segment_chars) + 1
+            if cut <= 0:
+                cut = self.max_segment_chars
+        else:
+            return None
+
+        segment = self.buffer[:cut]
+        self.buffer = self.buffer[cut:]
+        return segment
+
+    def _process(self, segment):
+        """Update running counters with one segment of complete sentences."""
+        context = AnalysisContext(segment)
+        self.caps_count += sum(1 for w in context.words if w.isupper() and len(w) > 2)
+        self.exclaim_count += segment.count('!')
+        if not self.supported:
+            # The lexicons, patterns and keywords are for another language
+            return
+
+        # Indicator phrases, re-scanning the previous tail for matches
+        # that cross the segment boundary
+        window = self.lower_tail + context.lowercase
+        segment_offset = self.offset
+        self.ruleset.matcher.feed(self.match_state, window, segment_offset - len(self.lower_tail))
+        self.offset += len(context.lowercase)
+        self.lower_tail = window[-self.overlap_chars:] if self.overlap_chars else ''
+
+        self.categories |= categorize_content(context, self.ruleset)
+
+        if len(self.explanations) < MAX_EXPLANATIONS:
+            self.explanations.extend(explain_sentences(
+                context, self.ruleset, hits=self.match_state, offset=segment_offset,
+                limit=MAX_EXPLANATIONS - len(self.explanations)
+            ))
+
+        # Keep only the hits the next window can still run into
+        self.ruleset.matcher.discard_before(self.match_state, self.offset - len(self.lower_tail))
+
+
+def analyze_stream(chunks, **options):
+    """
+    Analyze raw text arriving in chunks.
+
+    Args:
+        chunks (iterable): Pieces of raw (uncleaned) text
+        **options: Passed to StreamingAnalyzer
+
+    Returns:
+        dict: Analysis result in the /analyze response shape
+    """
+    analyzer = StreamingAnalyzer(**options)
+    for piece in iter_clean_text(chunks):
+        analyzer.feed(piece)
+    return analyzer.finish()
+
+
+def iter_decoded_chunks(stream, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """
+    Read a binary stream in chunks and decode it incrementally.
+
+    Args:
+        stream: File-like object with a read(size) method returning bytes
+        chunk_size (int): Bytes per read
+        encoding (str): Text encoding
+
+    Yields:
+        str: Decoded text chunks
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        yield decoder.decode(data)
+    yield decoder.decode(b'', final=True)
+
+
+def analyze_file(path, encoding='utf-8', **options):
+    """
+    Analyze a text file without loading it into memory.
+
+    Args:
+        path (str): Path to a plain-text file
+        encoding (str): Text encoding of the file
+        **options: Passed to StreamingAnalyzer
+
+    Returns:
+        dict: Analysis result in the /analyze response shape
+    """
+    with open(path, 'rb') as stream:
+        return analyze_stream(iter_decoded_chunks(stream, encoding=encoding), **options)
@@ -0,0 +1,17 @@
+"""
+Shared test setup.
+The backend modules import each other by their flat names, so the
+backend directory goes on the import path, as when the app is started
+from there. The app is configured to keep its caches and indexes in
+memory, so importing it writes nothing to disk.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['RESULT_CACHE_BACKEND'] = 'none'
+os.environ['NEAR_DUPLICATE_PATH'] = ''
+os.environ['JOB_BACKEND'] = 'memory'
+os.environ.pop('METRICS_DIR', None)
@@ -0,0 +1,45 @@
+"""Tests for the result cache."""
+
+import threading
+
+import cache
+from cache import MemoryCacheBackend, ResultCache, SQLiteCacheBackend
+
+
+def test_sqlite_reads_and_eviction(tmp_path, monkeypatch):
+    backend = SQLiteCacheBackend(str(tmp_path / 'cache.sqlite3'), max_entries=4, eviction_interval=3)
+    statements = []
+    backend._connect().set_trace_callback(statements.append)
+
+    backend.set('hot', {'n': 0})
+    backend.get('hot')
+    assert not any(statement.startswith('UPDATE') for statement in statements)
+
+    # A hit writes its access time once it is older than the resolution
+    monkeypatch.setattr(cache, 'ACCESS_RESOLUTION', -1)
+    backend.get('hot')
+    assert any(statement.startswith('UPDATE') for statement in statements)
+
+    for n in range(1, 6):
+        backend.set(f'key{n}', {'n': n})
+    assert len(backend) == 4
+    assert backend.get('hot') is None
+    assert backend.get('key5') == {'n': 5}
+
+
+def test_counters_are_thread_safe():
+    result_cache = ResultCache(MemoryCacheBackend())
+    result_cache.set('hit', {})
+
+    def look_up():
+        for _ in range(2000):
+            result_cache.get('hit')
+            result_cache.get('miss')
+
+    threads = [threading.Thread(target=look_up) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = result_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (16000, 16000, 0.5)
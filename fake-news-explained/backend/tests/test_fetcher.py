@@ -0,0 +1,136 @@
+"""Tests for fetching and extracting pages, against a local stand-in server."""
+
+import gzip
+import threading
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from extractor import extract_article
+from fetcher import FetchError, PageFetcher
+import app
+
+
+ARTICLE = """<html><head><title>Cure | Site</title></head><body><nav><a href="/">Home</a></nav>
+<article><h1>Miracle cure</h1><p>You won't believe this SHOCKING miracle cure that heals all diseases instantly!</p>
+<p>Anonymous sources say the government is hiding the truth from everyone, experts are shocked.</p></article>
+<footer><p>Copyright notice for the website and all of its content here.</p></footer></body></html>"""
+
+TEXT = ("Miracle cure\n"
+        "You won't believe this SHOCKING miracle cure that heals all diseases instantly!\n"
+        "Anonymous sources say the government is hiding the truth from everyone, experts are shocked.")
+
+MAX_PAGE_BYTES = 100000
+
+
+def _raw_deflate(data):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    not_modified = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='text/html; charset=utf-8', headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        for name, value in headers:
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        page = ARTICLE.encode()
+        if self.path == '/article':
+            if self.headers.get('If-None-Match') == '"v1"':
+                type(self).not_modified += 1
+                return self._send(304, headers=[('ETag', '"v1"')])
+            return self._send(200, page, headers=[('ETag', '"v1"')])
+        if self.path == '/redirect':
+            return self._send(302, headers=[('Location', '/article')])
+        if self.path == '/gzip':
+            return self._send(200, gzip.compress(page), headers=[('Content-Encoding', 'gzip')])
+        if self.path == '/deflate':
+            return self._send(200, zlib.compress(page), headers=[('Content-Encoding', 'deflate')])
+        if self.path == '/raw-deflate':
+            return self._send(200, _raw_deflate(page), headers=[('Content-Encoding', 'deflate')])
+        if self.path == '/big':
+            return self._send(200, b'<p>' + b'x ' * MAX_PAGE_BYTES + b'</p>')
+        if self.path == '/big-gzip':
+            body = gzip.compress(b'<p>' + b'x ' * MAX_PAGE_BYTES + b'</p>')
+            return self._send(200, body, headers=[('Content-Encoding', 'gzip')])
+        if self.path == '/pdf':
+            return self._send(200, b'%PDF', content_type='application/pdf')
+        return self._send(404, b'Not found')
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher():
+    return PageFetcher(timeout=5, max_page_bytes=MAX_PAGE_BYTES, allow_private=True)
+
+
+def test_extracts_main_text():
+    assert extract_article(ARTICLE) == ('Cure | Site', TEXT)
+
+
+def test_revalidates_with_etag(base_url, fetcher):
+    first, = fetcher.fetch_all([base_url + '/article'])
+    before = _Handler.not_modified
+    second, = fetcher.fetch_all([base_url + '/article'])
+    assert not first['not_modified'] and second['not_modified']
+    assert _Handler.not_modified == before + 1
+    assert second['text'] == first['text'] == TEXT
+
+
+@pytest.mark.parametrize('path', ['/gzip', '/deflate', '/raw-deflate'])
+def test_decompresses(base_url, fetcher, path):
+    page, = fetcher.fetch_all([base_url + path])
+    assert page['text'] == TEXT
+
+
+def test_follows_redirects(base_url, fetcher):
+    page, = fetcher.fetch_all([base_url + '/redirect'])
+    assert page['url'] == base_url + '/article'
+
+
+@pytest.mark.parametrize('path', ['/pdf', '/big', '/big-gzip', '/missing'])
+def test_rejects(base_url, fetcher, path):
+    page, = fetcher.fetch_all([base_url + path])
+    assert isinstance(page, FetchError)
+
+
+def test_refuses_private_addresses(base_url):
+    page, = PageFetcher(timeout=5).fetch_all([base_url + '/article'])
+    assert isinstance(page, FetchError)
+
+
+def test_analyze_url(base_url, fetcher, monkeypatch):
+    monkeypatch.setattr(app, 'page_fetcher', fetcher)
+    client = app.app.test_client()
+
+    response = client.post('/analyze/url', json={'url': base_url + '/article'})
+    result = response.get_json()
+    assert response.status_code == 200
+    assert result['title'] == 'Cure | Site'
+    assert {key: value for key, value in result.items() if key not in ('url', 'title', 'duplicates')} == \
+        {key: value for key, value in app.analyze_text(TEXT).items() if key != 'duplicates'}
+
+    assert client.post('/analyze/url', json={'url': base_url + '/missing'}).status_code == 502
+    assert client.post('/analyze/url', json={'url': 'notaurl'}).status_code == 400
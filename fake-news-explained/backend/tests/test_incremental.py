@@ -0,0 +1,62 @@
+"""Tests for incremental re-analysis of documents under editing."""
+
+import random
+
+from utils import clean_text
+from pipeline import run_pipeline
+from incremental import IncrementalDocument, UnitSequence, create_document_store_from_env
+import app
+
+
+TEXT = ("The council met on Tuesday to discuss the road repairs. Anonymous sources say the budget "
+        "is SHOCKING!! Residents are invited to the meeting. This miracle cure works 100% of the time. ")
+
+SNIPPETS = [' ', '.', '. ', '! ', 'SHOCKING ', 'http://example.com ', 'never ', 'sources say ', '\n\n', '']
+
+
+def test_edits_match_the_pipeline():
+    rng = random.Random(7)
+    document = IncrementalDocument(TEXT * 3)
+    for _ in range(60):
+        start = rng.randint(0, len(document.text))
+        end = min(len(document.text), start + rng.choice([0, 0, 1, 5, 20]))
+        document.apply_edit(start, end, rng.choice(SNIPPETS))
+        assert document.result() == run_pipeline(clean_text(document.text))
+
+
+def test_running_totals_follow_removed_units():
+    document = IncrementalDocument(TEXT)
+    document.apply_edit(0, len(document.text), 'The council met on Tuesday.')
+    assert not any(document.entry_counts)
+    assert document.result()['trust_score'] == 100
+
+
+class _Unit:
+    def __init__(self, text, gap=1):
+        self.text = text
+        self.gap = gap
+        self.explanations = [text] if text.startswith('x') else []
+
+
+def test_unit_sequence_offsets_and_explanations():
+    units = [_Unit(text) for text in ('aa', 'xb', 'ccc', 'xd')]
+    sequence = UnitSequence(units)
+    # Offsets: aa 1-3, xb 4-6, ccc 7-10, xd 11-13
+    assert sequence.first_ending_at_or_after(5) == (1, 4)
+    assert sequence.count_starting_at_or_before(7) == 3
+    assert sequence.span(3) == (11, units[3])
+    assert sequence.explanations(5) == ['xb', 'xd']
+
+    removed = sequence.replace(1, 3, [_Unit('xe', gap=2)])
+    assert removed == units[1:3]
+    assert [unit.text for unit in sequence] == ['aa', 'xe', 'xd']
+    assert sequence.span(2) == (8, units[3])
+    assert sequence.explanations(1) == ['xe']
+
+
+def test_documents_can_be_disabled(monkeypatch):
+    monkeypatch.setenv('LIVE_DOCUMENTS', '0')
+    monkeypatch.setattr(app, 'document_store', create_document_store_from_env())
+    client = app.app.test_client()
+    assert client.post('/documents', json={'text': 'Draft'}).status_code == 503
+    assert client.patch('/documents/x', json={'revision': 0, 'edits': []}).status_code == 503
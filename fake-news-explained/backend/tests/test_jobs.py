@@ -0,0 +1,95 @@
+"""Tests for the background job queues."""
+
+import multiprocessing
+import sqlite3
+import time
+
+import pytest
+
+from jobs import STATUS_DONE, STATUS_FAILED, QueueFull, SQLiteJobQueue
+
+
+def double(value):
+    return {'value': value * 2}
+
+
+def fail():
+    raise ValueError('bad input')
+
+
+def _wait(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in (STATUS_DONE, STATUS_FAILED):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def _submit_in_child(path, results):
+    results.put(SQLiteJobQueue(path, workers=0).submit(double, 21))
+
+
+def test_jobs_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    results = multiprocessing.Queue()
+    child = multiprocessing.get_context('fork').Process(target=_submit_in_child, args=(path, results))
+    child.start()
+    child.join()
+    job_id = results.get(timeout=5)
+
+    # Another process sees the job, runs it and reports its result
+    queue = SQLiteJobQueue(path, workers=1, poll_interval=0.05)
+    job = _wait(queue, job_id)
+    assert job['status'] == STATUS_DONE
+    assert job['result'] == {'value': 42}
+
+
+def test_failures_and_capacity(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.sqlite3'), workers=1, max_queued=1, poll_interval=0.05)
+    job = _wait(queue, queue.submit(fail))
+    assert job['status'] == STATUS_FAILED
+    assert job['error'] == 'bad input'
+
+    idle = SQLiteJobQueue(str(tmp_path / 'idle.sqlite3'), workers=0, max_queued=1)
+    idle.submit(double, 1)
+    with pytest.raises(QueueFull):
+        idle.submit(double, 2)
+    assert queue.get('unknown') is None
+
+
+class _LockedOnce:
+    """Connection whose first statement starting with each prefix fails as if locked."""
+
+    def __init__(self, conn, prefixes):
+        self.conn = conn
+        self.prefixes = prefixes
+
+    def execute(self, sql, *params):
+        for prefix in self.prefixes:
+            if sql.startswith(prefix):
+                self.prefixes.remove(prefix)
+                raise sqlite3.OperationalError('database is locked')
+        return self.conn.execute(sql, *params)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+def test_worker_survives_a_locked_database(tmp_path, caplog):
+    path = str(tmp_path / 'jobs.sqlite3')
+    job_id = SQLiteJobQueue(path, workers=0).submit(double, 2)
+
+    # The worker's first claim and its first result update hit a locked database
+    queue = SQLiteJobQueue(path, workers=1, poll_interval=0.01)
+    connect = queue._connect
+    prefixes = ['BEGIN IMMEDIATE', 'UPDATE jobs SET status = ?, result = ?']
+    queue._connect = lambda: _LockedOnce(connect(), prefixes)
+
+    job = _wait(queue, job_id)
+    assert job['status'] == STATUS_DONE
+    assert job['result'] == {'value': 4}
+    assert not prefixes
+    assert 'Could not claim a job' in caplog.text
+    assert 'Could not record the outcome' in caplog.text
@@ -0,0 +1,41 @@
+"""Tests for language identification."""
+
+import pytest
+
+from language import UNDETERMINED, detect_language
+from nlp_logic import score_text
+from ruleset import route_ruleset
+
+
+HEADLINES = [
+    "BOMBSHELL: Anonymous sources confirm election fraud",
+    "Banned video: mainstream media won't tell you",
+    "SHOCKING: Doctors HATE this one weird trick",
+    "EXPOSED: The truth they don't want you to know",
+    "Deep state cover-up revealed by insider",
+]
+
+
+@pytest.mark.parametrize('headline', HEADLINES)
+def test_english_headlines_get_the_main_ruleset(headline):
+    language = detect_language(headline)
+    assert language in ('en', UNDETERMINED)
+    assert route_ruleset(language)[1]
+
+
+@pytest.mark.parametrize('headline', HEADLINES[:2])
+def test_headline_lexicons_are_scored(headline):
+    assert score_text(headline).score < 100
+
+
+@pytest.mark.parametrize('language, text', [
+    ('es', "El gobierno anunció el lunes que las nuevas medidas entrarán en vigor durante los próximos "
+           "meses, según fuentes oficiales del ministerio."),
+    ('fr', "Le gouvernement a annoncé lundi que les nouvelles mesures entreront en vigueur dans les "
+           "prochains mois, selon des sources officielles."),
+    ('de', "Die Regierung hat am Montag angekündigt, dass die neuen Maßnahmen in den kommenden Monaten "
+           "in Kraft treten werden, so offizielle Quellen."),
+    ('ru', "Правительство объявило в понедельник."),
+])
+def test_confident_detections(language, text):
+    assert detect_language(text) == language
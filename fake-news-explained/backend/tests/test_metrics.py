@@ -0,0 +1,43 @@
+"""Tests for the metrics registry shared by gunicorn workers."""
+
+import json
+import os
+import subprocess
+import sys
+
+from metrics import ARCHIVE_FILE, MetricsRegistry
+
+
+def _exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def _counter(snapshot, name):
+    return sum(value for counter, _, value in snapshot['counters'] if counter == name)
+
+
+def _write_worker(metrics_dir, pid, count):
+    worker = MetricsRegistry()
+    worker.inc('fakenews_labels_total', count, label='Likely Real')
+    with open(os.path.join(metrics_dir, f'metrics-{pid}.json'), 'w', encoding='utf-8') as f:
+        json.dump(worker.snapshot(), f)
+
+
+def test_exited_workers_are_archived(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    registry.inc('fakenews_labels_total', label='Likely Real')
+    dead = _exited_pid()
+    _write_worker(str(tmp_path), dead, 5)
+
+    assert _counter(registry.collect(), 'fakenews_labels_total') == 6
+    assert not (tmp_path / f'metrics-{dead}.json').exists()
+    assert (tmp_path / ARCHIVE_FILE).exists()
+
+    # Archived totals are counted once, and keep counting after later exits
+    assert _counter(registry.collect(), 'fakenews_labels_total') == 6
+    _write_worker(str(tmp_path), os.getppid() + 10 ** 7, 2)
+    registry.retire(os.getppid() + 10 ** 7)
+    assert _counter(registry.collect(), 'fakenews_labels_total') == 8
+    assert sorted(os.listdir(tmp_path)) == sorted([ARCHIVE_FILE, 'metrics.lock', f'metrics-{os.getpid()}.json'])
@@ -0,0 +1,67 @@
+"""Tests for reusing results of near-duplicate texts."""
+
+from cache import MemoryCacheBackend, ResultCache
+from utils import clean_text
+from pipeline import run_pipeline
+import neardup
+from neardup import NearDuplicateIndex
+import app
+
+
+ARTICLE = ("The city council approved the new budget for road repairs on Tuesday evening. "
+           "The plan covers resurfacing of the main bridge and several school crossings. "
+           "Council members said the work should start in the spring and finish by autumn. "
+           "Residents can comment on the schedule at the library until the end of the month.")
+
+
+def _analyze(text):
+    return app.analyze_cleaned(clean_text(text))
+
+
+def test_added_red_flags_are_scored():
+    app.near_duplicates = NearDuplicateIndex()
+    assert _analyze(ARTICLE)['trust_score'] == 100
+
+    flagged = ARTICLE + " SHOCKING!!! Share before it's deleted!!"
+    result = _analyze(flagged)
+    expected = run_pipeline(clean_text(flagged))
+    assert result['duplicates']['matches']
+    assert result['duplicates']['reused_from'] is None
+    assert (result['trust_score'], result['label']) == (expected['trust_score'], expected['label'])
+    assert result['trust_score'] < 100
+
+
+def test_reworded_copy_is_explained_itself():
+    # The copies share about 84% of their shingles
+    app.near_duplicates = NearDuplicateIndex(threshold=0.7)
+    article = ARTICLE + " The mayor thanked the volunteers who counted traffic at every crossing."
+    first = _analyze(article + " You won't believe what the engineers found.")
+
+    # Same penalties, but the flagged sentence is reworded and moved
+    copy = "What the engineers found, you won't believe. " + article
+    result = _analyze(copy)
+    assert result['duplicates']['reused_from'] == first['duplicates']['id']
+    expected = run_pipeline(clean_text(copy))
+    assert {key: result[key] for key in expected} == expected
+    assert [item['sentence'] for item in result['explanations']] == ["What the engineers found, you won't believe."]
+
+
+def test_signature_without_numpy(monkeypatch):
+    index = NearDuplicateIndex()
+    text = clean_text(ARTICLE).lower()
+    expected = index.signature(text)
+    monkeypatch.setattr(neardup, 'np', None)
+    assert index.signature(text) == expected
+
+
+def test_cache_hits_show_later_copies(monkeypatch):
+    monkeypatch.setattr(app, 'near_duplicates', NearDuplicateIndex())
+    monkeypatch.setattr(app, 'result_cache', ResultCache(MemoryCacheBackend()))
+    first = _analyze(ARTICLE)
+    copy = _analyze(ARTICLE.replace('Tuesday evening', 'Tuesday night'))
+
+    again = _analyze(ARTICLE)
+    assert app.result_cache.hits == 1
+    assert again['duplicates']['id'] == first['duplicates']['id']
+    assert [match['id'] for match in again['duplicates']['matches']] == [copy['duplicates']['id']]
+    assert first['duplicates']['matches'] == []
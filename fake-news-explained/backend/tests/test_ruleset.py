@@ -0,0 +1,18 @@
+"""Tests for compiling rulesets."""
+
+import copy
+
+from ruleset import Ruleset, load_ruleset_file, validate_ruleset, DEFAULT_RULESET_PATH
+from explanation_engine import classify_sentence, explain_sentences
+
+
+def test_capitalized_sentence_pattern_is_explained():
+    data = copy.deepcopy(load_ruleset_file(DEFAULT_RULESET_PATH))
+    data['sentence_patterns'].insert(0, {'type': 'reminder', 'pattern': '(Reminder|Notice)',
+                                         'reason': 'Issues a reminder'})
+    ruleset = Ruleset(validate_ruleset(data))
+
+    sentence = "This is a reminder about the river."
+    assert classify_sentence(sentence, ruleset) == ('reminder', 'Issues a reminder')
+    explained = explain_sentences(sentence, ruleset)
+    assert [(item['sentence'], item['reason']) for item in explained] == [(sentence, 'Issues a reminder')]
@@ -0,0 +1,43 @@
+"""Tests for streaming analysis of long documents."""
+
+from utils import clean_text
+from ruleset import get_ruleset
+from pipeline import run_pipeline
+from streaming import StreamingAnalyzer, analyze_stream
+
+
+SENTENCE = "Anonymous sources say this shocking miracle cure always works and everyone knows it. "
+
+
+def test_hits_stay_bounded_on_long_documents():
+    analyzer = StreamingAnalyzer()
+    sizes = []
+    for _ in range(200):
+        analyzer.feed(SENTENCE * 50)
+        sizes.append(len(analyzer.match_state))
+    assert max(sizes) < 50
+    assert all(len(items) <= 3 for items in analyzer.match_state.discarded_items.values())
+    assert analyzer.finish()['trust_score'] == run_pipeline(clean_text(SENTENCE * 10000))['trust_score']
+
+
+def test_matches_pipeline_on_small_pieces():
+    text = (SENTENCE + "The council met on Tuesday to discuss the budget. " + "ACT NOW!!! ") * 40
+    expected = run_pipeline(clean_text(text))
+    pieces = [text[i:i + 7] for i in range(0, len(text), 7)]
+    assert analyze_stream(pieces) == expected
+
+
+def test_discarded_hits_keep_counts_and_first_items():
+    matcher = get_ruleset().matcher
+    text = clean_text(SENTENCE * 30).lower()
+    expected = matcher.scan_state(text)
+
+    state = matcher.new_state()
+    for start in range(0, len(text), 100):
+        matcher.feed(state, text[max(start - 20, 0):start + 100], max(start - 20, 0))
+        matcher.discard_before(state, start + 80)
+
+    assert matcher.category_counts(state) == matcher.category_counts(expected)
+    full = matcher.results(expected)
+    assert {category: items[:3] for category, items in matcher.results(state).items()} == \
+        {category: items[:3] for category, items in full.items()}
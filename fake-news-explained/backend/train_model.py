@@ -0,0 +1,232 @@
+"""
+Train the optional statistical classifier on a labeled corpus.
+
+Reads a JSONL or CSV file of articles with a label per article, fits a
+logistic regression over hashed word n-gram TF-IDF features with NumPy
+(CPU only) and writes a model directory for MODEL_PATH.
+
+Usage:
+    python train_model.py labeled.jsonl models/news
+    python train_model.py labeled.csv models/news --text-field body --label-field verdict --fake-labels fake,satire
+
+Articles whose label is one of --fake-labels (case-insensitive) are the
+positive class; every other label counts as real. A --holdout share of
+the articles is kept out of training and used to report accuracy.
+"""
+
+import argparse
+import math
+import sys
+import time
+
+from bulk_score import read_records
+from classifier import (
+    DEFAULT_HASH_BITS, DEFAULT_NGRAM_MAX, ModelError, HashedNgrams, save_model, sigmoid, tfidf_values
+)
+from utils import clean_text
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+DEFAULT_FAKE_LABELS = 'fake,1'
+DEFAULT_EPOCHS = 200
+DEFAULT_LEARNING_RATE = 0.05
+DEFAULT_L2 = 1e-6
+DEFAULT_HOLDOUT = 0.1
+
+# Texts featurized at a time, bounding the temporary arrays
+FEATURIZE_CHUNK = 1000
+
+
+def load_corpus(path, input_format, text_field, label_field, fake_labels):
+    """
+    Read and clean a labeled corpus.
+
+    Returns:
+        tuple: (lowercased cleaned texts, array of 1 for fake and 0 for real,
+                number of skipped records)
+    """
+    texts = []
+    labels = []
+    skipped = 0
+    for record in read_records(path, input_format, text_field, label_field=label_field):
+        cleaned = clean_text(record['text']) if 'error' not in record else ''
+        if not cleaned:
+            skipped += 1
+            continue
+        texts.append(cleaned.lower())
+        labels.append(1.0 if str(record['label']).strip().lower() in fake_labels else 0.0)
+    return texts, np.array(labels), skipped
+
+
+def featurize(featurizer, texts):
+    """Count the n-grams of every text, in chunks, as one (rows, cols, counts) triple."""
+    rows, cols, counts = [], [], []
+    for start in range(0, len(texts), FEATURIZE_CHUNK):
+        chunk_rows, chunk_cols, chunk_counts = featurizer.counts(texts[start:start + FEATURIZE_CHUNK])
+        rows.append((chunk_rows + start).astype(np.int32))
+        cols.append(chunk_cols.astype(np.int32))
+        counts.append(chunk_counts.astype(np.float32))
+    if not rows:
+        return np.zeros(0, np.int32), np.zeros(0, np.int32), np.zeros(0, np.float32)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(counts)
+
+
+def train_logistic(rows, cols, values, labels, size, epochs, learning_rate, l2):
+    """
+    Fit logistic regression by full-batch gradient descent (Adam).
+
+    Both the forward pass and the gradient are sparse products computed
+    with bincount over the (row, col, value) features.
+
+    Returns:
+        tuple: (coefficients, bias)
+    """
+    n_rows = len(labels)
+    coefficients = np.zeros(size)
+    bias = 0.0
+    moments = np.zeros(size)
+    squares = np.zeros(size)
+    bias_moment = bias_square = 0.0
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    for step in range(1, epochs + 1):
+        logits = np.bincount(rows, weights=values * coefficients[cols], minlength=n_rows) + bias
+        residuals = (sigmoid(logits) - labels) / n_rows
+        gradient = np.bincount(cols, weights=values * residuals[rows], minlength=size) + l2 * coefficients
+        bias_gradient = residuals.sum()
+
+        moments = beta1 * moments + (1 - beta1) * gradient
+        squares = beta2 * squares + (1 - beta2) * gradient * gradient
+        bias_moment = beta1 * bias_moment + (1 - beta1) * bias_gradient
+        bias_square = beta2 * bias_square + (1 - beta2) * bias_gradient * bias_gradient
+        scale = learning_rate * math.sqrt(1 - beta2 ** step) / (1 - beta1 ** step)
+        coefficients -= scale * moments / (np.sqrt(squares) + epsilon)
+        bias -= scale * bias_moment / (math.sqrt(bias_square) + epsilon)
+    return coefficients, bias
+
+
+def evaluate(probabilities, labels):
+    """Accuracy and log loss of predicted fake probabilities."""
+    if not len(labels):
+        return {}
+    clipped = np.clip(probabilities, 1e-7, 1 - 1e-7)
+    return {
+        'accuracy': round(float(((probabilities >= 0.5) == (labels == 1)).mean()), 4),
+        'log_loss': round(float(-(labels * np.log(clipped) + (1 - labels) * np.log(1 - clipped)).mean()), 4)
+    }
+
+
+def train_model(input_path, output_path, input_format=None, text_field='text', label_field='label',
+                fake_labels=DEFAULT_FAKE_LABELS, hash_bits=DEFAULT_HASH_BITS, ngram_max=DEFAULT_NGRAM_MAX,
+                epochs=DEFAULT_EPOCHS, learning_rate=DEFAULT_LEARNING_RATE, l2=DEFAULT_L2,
+                holdout=DEFAULT_HOLDOUT, seed=0):
+    """
+    Train a model on a labeled corpus and save it.
+
+    Args:
+        input_path (str): JSONL or CSV corpus
+        output_path (str): Model directory to write
+        input_format (str): 'jsonl' or 'csv' (guessed from the extension if None)
+        text_field (str): Field holding the article text
+        label_field (str): Field holding the label
+        fake_labels (str): Comma-separated labels meaning fake
+        hash_bits (int): log2 of the number of feature buckets
+        ngram_max (int): Longest word n-gram
+        epochs (int): Gradient descent steps
+        learning_rate (float): Adam step size
+        l2 (float): L2 regularization strength
+        holdout (float): Share of the articles kept out for evaluation
+        seed (int): Seed of the holdout split
+
+    Returns:
+        dict: Metadata of the saved model, including holdout metrics
+    """
+    started = time.monotonic()
+    featurizer = HashedNgrams(hash_bits, ngram_max)  # Raises ModelError without NumPy
+    input_format = input_format or ('csv' if input_path.lower().endswith('.csv') else 'jsonl')
+    fake_labels = {label.strip().lower() for label in fake_labels.split(',') if label.strip()}
+    texts, labels, skipped = load_corpus(input_path, input_format, text_field, label_field, fake_labels)
+    if len(set(labels.tolist())) < 2:
+        raise ModelError('The corpus needs both fake and real articles')
+
+    order = np.random.default_rng(seed).permutation(len(texts))
+    n_holdout = int(len(texts) * holdout)
+    test, train = order[:n_holdout], order[n_holdout:]
+
+    rows, cols, counts = featurize(featurizer, [texts[i] for i in train])
+    train_labels = labels[train]
+
+    # Smoothed inverse document frequency (each (row, col) pair is one document)
+    document_frequency = np.bincount(cols, minlength=featurizer.size)
+    idf = np.log((1 + len(train)) / (1 + document_frequency)) + 1
+    values = tfidf_values(rows, cols, counts, idf, len(train))
+
+    coefficients, bias = train_logistic(rows, cols, values, train_labels, featurizer.size,
+                                        epochs, learning_rate, l2)
+
+    train_logits = np.bincount(rows, weights=values * coefficients[cols], minlength=len(train)) + bias
+    metrics = {'train': evaluate(sigmoid(train_logits), train_labels)}
+    if n_holdout:
+        test_rows, test_cols, test_counts = featurize(featurizer, [texts[i] for i in test])
+        test_values = tfidf_values(test_rows, test_cols, test_counts, idf, n_holdout)
+        test_logits = np.bincount(test_rows, weights=test_values * coefficients[test_cols],
+                                  minlength=n_holdout) + bias
+        metrics['holdout'] = evaluate(sigmoid(test_logits), labels[test])
+
+    return save_model(
+        output_path, idf, coefficients, bias, hash_bits, ngram_max,
+        documents=len(train),
+        fake_share=round(float(train_labels.mean()), 4),
+        skipped=skipped,
+        metrics=metrics,
+        training_seconds=round(time.monotonic() - started, 1)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the statistical fake news classifier.')
+    parser.add_argument('input', help='JSONL or CSV file of labeled articles')
+    parser.add_argument('output', help='Model directory to write (use it as MODEL_PATH)')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='Input format (default: from extension)')
+    parser.add_argument('--text-field', default='text', help='Field holding the article text')
+    parser.add_argument('--label-field', default='label', help='Field holding the label')
+    parser.add_argument('--fake-labels', default=DEFAULT_FAKE_LABELS, help='Comma-separated labels meaning fake')
+    parser.add_argument('--hash-bits', type=int, default=DEFAULT_HASH_BITS, help='log2 of the feature buckets')
+    parser.add_argument('--ngram-max', type=int, default=DEFAULT_NGRAM_MAX, help='Longest word n-gram')
+    parser.add_argument('--epochs', type=int, default=DEFAULT_EPOCHS, help='Gradient descent steps')
+    parser.add_argument('--learning-rate', type=float, default=DEFAULT_LEARNING_RATE, help='Adam step size')
+    parser.add_argument('--l2', type=float, default=DEFAULT_L2, help='L2 regularization strength')
+    parser.add_argument('--holdout', type=float, default=DEFAULT_HOLDOUT, help='Share kept out for evaluation')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the holdout split')
+    args = parser.parse_args(argv)
+
+    try:
+        meta = train_model(
+            args.input, args.output,
+            input_format=args.format,
+            text_field=args.text_field,
+            label_field=args.label_field,
+            fake_labels=args.fake_labels,
+            hash_bits=args.hash_bits,
+            ngram_max=args.ngram_max,
+            epochs=args.epochs,
+            learning_rate=args.learning_rate,
+            l2=args.l2,
+            holdout=args.holdout,
+            seed=args.seed
+        )
+    except ModelError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Model {meta['version']} trained on {meta['documents']} articles "
+          f"in {meta['training_seconds']}s, saved to {args.output}")
+    for split, scores in meta['metrics'].items():
+        print(f"{split}: accuracy {scores['accuracy']}, log loss {scores['log_loss']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,20 @@ Utility functions for text preprocessing and helper operations.
 
 import re
 import string
+from functools import cached_property
+
+from language import detect_language
+
+
+# Whitespace following sentence-ending punctuation
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+# Runs of whitespace and URLs removed by clean_text
+WHITESPACE = re.compile(r'\s+')
+URL_PATTERN = re.compile(r'http\S+|www\.\S+')
+
+# Longest run of non-whitespace iter_clean_text holds back waiting for its end
+MAX_TOKEN_CHARS = 4096
 
 
 def clean_text(text):
@@ -20,10 +34,10 @@ def clean_text(text):
         return ""
     
     # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
+    text = WHITESPACE.sub(' ', text)
     
     # Remove URLs
-    text = re.sub(r'http\S+|www\.\S+', '', text)
+    text = URL_PATTERN.sub('', text)
     
     # Strip leading/trailing whitespace
     text = text.strip()
@@ -31,6 +45,67 @@ def clean_text(text):
     return text
 
 
+def iter_clean_text(chunks, max_token_chars=MAX_TOKEN_CHARS):
+    """
+    Clean text that arrives in chunks, without holding all of it.
+    
+    Joining the yielded pieces gives the same result as calling
+    clean_text on the joined chunks. Only the current unfinished word is
+    buffered (up to max_token_chars, after which it is passed through
+    as is).
+    
+    Args:
+        chunks (iterable): Pieces of raw text, split anywhere
+        max_token_chars (int): Limit on buffered non-whitespace characters
+        
+    Yields:
+        str: Pieces of cleaned text
+    """
+    carry = ''            # Unfinished word at the end of the last chunk
+    gap = 0               # Separators owed before the next non-empty word
+    started = False       # Whether any text has been emitted (for stripping)
+    after_space = False   # Whether the last chunk ended in whitespace
+    
+    for chunk in chunks:
+        if after_space and not carry:
+            # Continue a whitespace run from the previous chunk
+            chunk = chunk.lstrip()
+        if not chunk:
+            continue
+        
+        words = WHITESPACE.split(carry + chunk)
+        carry = words.pop()
+        after_space = carry == ''
+        
+        pieces = []
+        for word in words:
+            word = URL_PATTERN.sub('', word)
+            if word:
+                if started:
+                    pieces.append(' ' * gap)
+                pieces.append(word)
+                started = True
+                gap = 1
+            elif started:
+                gap += 1
+        
+        if len(carry) > max_token_chars:
+            # Pass an overlong word through rather than buffering it
+            if started:
+                pieces.append(' ' * gap)
+            pieces.append(carry)
+            started = True
+            gap = 0
+            carry = ''
+        
+        if pieces:
+            yield ''.join(pieces)
+    
+    carry = URL_PATTERN.sub('', carry)
+    if carry:
+        yield (' ' * gap if started else '') + carry
+
+
 def split_into_sentences(text):
     """
     Split text into individual sentences.
@@ -42,7 +117,7 @@ def split_into_sentences(text):
         list: List of sentences
     """
     # Simple sentence splitting using punctuation
-    sentences = re.split(r'(?<=[.!?])\s+', text)
+    sentences = SENTENCE_BOUNDARY.split(text)
     
     # Filter out empty sentences
     sentences = [s.strip() for s in sentences if s.strip()]
@@ -50,6 +125,85 @@ def split_into_sentences(text):
     return sentences
 
 
+def split_sentence_spans(text):
+    """
+    Find sentence boundaries as character offsets.
+    
+    Uses the same rules as split_into_sentences, so
+    [text[start:end] for start, end in spans] equals its output.
+    
+    Args:
+        text (str): Input text
+        
+    Returns:
+        list: List of (start, end) offsets
+    """
+    spans = []
+    start = 0
+    for boundary in SENTENCE_BOUNDARY.finditer(text):
+        spans.append((start, boundary.start()))
+        start = boundary.end()
+    spans.append((start, len(text)))
+    
+    # Trim surrounding whitespace and drop empty sentences
+    trimmed = []
+    for start, end in spans:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            trimmed.append((start, end))
+    
+    return trimmed
+
+
+class AnalysisContext:
+    """
+    Shared view of one text for every analysis stage.
+    
+    Built once per request so the lowercase form, word list and sentence
+    boundaries are computed a single time and reused by scoring,
+    explanations and source suggestions. Derived forms are computed on
+    first access.
+    """
+    
+    def __init__(self, text):
+        self.text = text
+    
+    @cached_property
+    def lowercase(self):
+        """Lowercase form of the text."""
+        return self.text.lower()
+    
+    @cached_property
+    def words(self):
+        """Whitespace-separated words of the original text."""
+        return self.text.split()
+    
+    @cached_property
+    def language(self):
+        """Language code detected from the start of the text."""
+        return detect_language(self.text)
+    
+    @cached_property
+    def sentence_spans(self):
+        """(start, end) character offsets of each sentence."""
+        return split_sentence_spans(self.text)
+    
+    @cached_property
+    def sentences(self):
+        """Sentences of the original text."""
+        return [self.text[start:end] for start, end in self.sentence_spans]
+
+
+def as_context(text):
+    """Wrap text in an AnalysisContext unless it already is one."""
+    if isinstance(text, AnalysisContext):
+        return text
+    return AnalysisContext(text)
+
+
 def count_exclamation_marks(text):
     """Count exclamation marks in text."""
     return text.count('!')
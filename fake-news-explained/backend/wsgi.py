@@ -0,0 +1,15 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn wsgi:app
+
+Loads the NLP data and the ruleset at import time, so with preloading
+(see gunicorn.conf.py) it happens once in the master process.
+"""
+
+import nlp_logic
+from app import app
+
+nlp_logic.preload()
+
+__all__ = ['app']
@@ -1,11 +1,14 @@
-import React, { useState, useRef } from 'react';
-import { analyzeNews } from './api';
+import React, { useState, useRef, useEffect } from 'react';
+import { analyzeNews, createDocument, editDocument, diffText } from './api';
 import TextInput from './components/TextInput';
 import ResultBadge from './components/ResultBadge';
 import TrustScore from './components/TrustScore';
 import ExplanationBox from './components/ExplanationBox';
 import SourceLinks from './components/SourceLinks';
 
+// Pause in typing before the live score is updated
+const LIVE_DEBOUNCE_MS = 400;
+
 /**
  * VerifiNews - AI-Powered News Verification
  */
@@ -15,7 +18,73 @@ function App() {
     const [result, setResult] = useState(null);
     const [error, setError] = useState(null);
 
+    const [liveResult, setLiveResult] = useState(null);
+
     const toolRef = useRef(null);
+    // Server-side live document: { id, revision, text } as last acknowledged
+    const liveDocRef = useRef(null);
+    // Live updates are sent one at a time, in order
+    const liveQueueRef = useRef(Promise.resolve());
+    // Set when the server has live documents disabled (several workers)
+    const liveDisabledRef = useRef(false);
+
+    const syncLiveDocument = async (currentText) => {
+        if (liveDisabledRef.current) {
+            return analyzeNews(currentText);
+        }
+
+        const doc = liveDocRef.current;
+        if (!doc) {
+            let data;
+            try {
+                data = await createDocument(currentText);
+            } catch (err) {
+                // No live documents on this server: score the whole text instead
+                if (err.status === 503) {
+                    liveDisabledRef.current = true;
+                    return syncLiveDocument(currentText);
+                }
+                throw err;
+            }
+            liveDocRef.current = { id: data.document_id, revision: data.revision, text: currentText };
+            return data;
+        }
+
+        const edit = diffText(doc.text, currentText);
+        if (!edit) return null;
+
+        try {
+            const data = await editDocument(doc.id, doc.revision, edit);
+            liveDocRef.current = { ...doc, revision: data.revision, text: currentText };
+            return data;
+        } catch (err) {
+            // Expired or out of sync: start over with the full text
+            if (err.status === 404 || err.status === 409) {
+                liveDocRef.current = null;
+                return syncLiveDocument(currentText);
+            }
+            throw err;
+        }
+    };
+
+    // Live trust score while typing; only the edited sentences are re-analyzed
+    useEffect(() => {
+        if (!text.trim() && !liveDocRef.current) {
+            setLiveResult(null);
+            return undefined;
+        }
+
+        const timer = setTimeout(() => {
+            liveQueueRef.current = liveQueueRef.current
+                .then(() => syncLiveDocument(text))
+                .then((data) => {
+                    if (data) setLiveResult(text.trim() ? data : null);
+                })
+                .catch(() => setLiveResult(null));
+        }, LIVE_DEBOUNCE_MS);
+
+        return () => clearTimeout(timer);
+    }, [text]);
 
     const handleAnalyze = async () => {
         if (!text.trim()) return;
@@ -89,6 +158,7 @@ function App() {
                         onAnalyze={handleAnalyze}
                         loading={loading}
                         disabled={loading}
+                        liveResult={liveResult}
                     />
 
                     {/* Error State */}
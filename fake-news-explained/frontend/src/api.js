@@ -35,6 +35,92 @@ export async function analyzeNews(text) {
     }
 }
 
+/**
+ * Send a request for live document analysis
+ * @param {string} path - API path
+ * @param {string} method - HTTP method
+ * @param {Object} body - JSON body
+ * @returns {Promise<Object>} Document id, revision and analysis results
+ */
+async function documentRequest(path, method, body) {
+    const response = await fetch(`${API_BASE_URL}${path}`, {
+        method,
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(body),
+    });
+
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        const error = new Error(errorData.message || 'Failed to analyze text');
+        error.status = response.status;
+        throw error;
+    }
+
+    return await response.json();
+}
+
+/**
+ * Start live analysis of the text being edited
+ * @param {string} text - Current editor contents
+ * @returns {Promise<Object>} Document id, revision and analysis results
+ */
+export async function createDocument(text) {
+    return documentRequest('/documents', 'POST', { text });
+}
+
+/**
+ * Send an edit of a live document; only the touched sentences are re-analyzed
+ * @param {string} documentId - Id returned by createDocument
+ * @param {number} revision - Revision the edit was made against
+ * @param {Object} edit - { start, end, text } replacing text[start:end]
+ * @returns {Promise<Object>} New revision and analysis results
+ */
+export async function editDocument(documentId, revision, edit) {
+    return documentRequest(`/documents/${documentId}`, 'PATCH', { revision, edits: [edit] });
+}
+
+/**
+ * Describe the change from one text to another as a single edit
+ * Offsets count code points, as the backend does, not UTF-16 units.
+ * @param {string} before - Previous text
+ * @param {string} after - New text
+ * @returns {Object|null} { start, end, text } or null if unchanged
+ */
+export function diffText(before, after) {
+    if (before === after) return null;
+
+    const isHighSurrogate = (code) => code >= 0xd800 && code <= 0xdbff;
+    const isLowSurrogate = (code) => code >= 0xdc00 && code <= 0xdfff;
+
+    let prefix = 0;
+    const maxPrefix = Math.min(before.length, after.length);
+    while (prefix < maxPrefix && before[prefix] === after[prefix]) {
+        prefix++;
+    }
+    // Do not split a surrogate pair
+    if (prefix > 0 && isHighSurrogate(before.charCodeAt(prefix - 1))) {
+        prefix--;
+    }
+
+    let suffix = 0;
+    const maxSuffix = maxPrefix - prefix;
+    while (suffix < maxSuffix && before[before.length - 1 - suffix] === after[after.length - 1 - suffix]) {
+        suffix++;
+    }
+    if (suffix > 0 && isLowSurrogate(before.charCodeAt(before.length - suffix))) {
+        suffix--;
+    }
+
+    const start = Array.from(before.slice(0, prefix)).length;
+    return {
+        start,
+        end: start + Array.from(before.slice(prefix, before.length - suffix)).length,
+        text: after.slice(prefix, after.length - suffix),
+    };
+}
+
 /**
  * Check if the API is healthy
  * @returns {Promise<boolean>} True if API is healthy
@@ -48,4 +134,4 @@ export async function checkHealth() {
     }
 }
 
-export default { analyzeNews, checkHealth };
+export default { analyzeNews, createDocument, editDocument, diffText, checkHealth };
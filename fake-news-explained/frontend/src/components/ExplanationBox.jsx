@@ -1,5 +1,30 @@
 import React from 'react';
 
+/**
+ * Split a sentence into plain and highlighted parts.
+ * Highlight ranges come from the backend as [start, end] code point
+ * offsets, so the sentence is indexed by code point, not UTF-16 unit.
+ */
+function highlightParts(sentence, highlights) {
+    const chars = Array.from(sentence);
+    const parts = [];
+    let position = 0;
+    for (const [start, end] of highlights || []) {
+        if (start < position || end > chars.length || start >= end) {
+            continue;
+        }
+        if (start > position) {
+            parts.push({ text: chars.slice(position, start).join(''), marked: false });
+        }
+        parts.push({ text: chars.slice(start, end).join(''), marked: true });
+        position = end;
+    }
+    if (position < chars.length) {
+        parts.push({ text: chars.slice(position).join(''), marked: false });
+    }
+    return parts;
+}
+
 /**
  * ExplanationBox Component
  */
@@ -17,7 +42,11 @@ function ExplanationBox({ explanations }) {
                 {explanations.map((item, index) => (
                     <div key={index} className="explanation-item">
                         <span className="explanation-sentence" style={{ borderLeft: '2px solid #ef4444', paddingLeft: '12px' }}>
-                            {item.sentence}
+                            {highlightParts(item.sentence, item.highlights).map((part, partIndex) => (
+                                part.marked
+                                    ? <mark key={partIndex} className="explanation-highlight">{part.text}</mark>
+                                    : <React.Fragment key={partIndex}>{part.text}</React.Fragment>
+                            ))}
                         </span>
                         <p className="explanation-reason">
                             {item.reason}
@@ -2,9 +2,9 @@ import React from 'react';
 
 /**
  * TextInput Component
- * Premium textarea for news content
+ * Premium textarea for news content, with a live trust score while typing
  */
-function TextInput({ value, onChange, onAnalyze, loading, disabled }) {
+function TextInput({ value, onChange, onAnalyze, loading, disabled, liveResult }) {
     const handleKeyDown = (e) => {
         if ((e.ctrlKey || e.metaKey) && e.key === 'Enter') {
             e.preventDefault();
@@ -28,6 +28,11 @@ function TextInput({ value, onChange, onAnalyze, loading, disabled }) {
                 onKeyDown={handleKeyDown}
                 disabled={loading}
             />
+            {liveResult && (
+                <p className="live-score">
+                    Live trust score: <strong>{liveResult.trust_score}/100</strong> · {liveResult.label}
+                </p>
+            )}
             <button
                 className="analyze-button"
                 style={{ marginTop: '24px' }}